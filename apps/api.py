@@ -1,8 +1,9 @@
 import os
+import json
 import logging
 import sys
 from pathlib import Path
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import yaml
 from dotenv import load_dotenv
 
@@ -11,42 +12,158 @@ _root = Path(__file__).resolve().parents[1]
 if str(_root) not in sys.path:
     sys.path.insert(0, str(_root))
 
+from src import metrics, profiling  # noqa: E402
+from src.metadata_filter import FilterError  # noqa: E402
 
-def create_app(query_func=None) -> Flask:
+logger = logging.getLogger(__name__)
+
+
+def _result_json(score, item):
+    return {
+        "score": float(score),
+        "doc_id": item.get("doc_id"),
+        "chunk_id": item.get("chunk_id"),
+        "title": item.get("title"),
+        "text": item.get("text"),
+    }
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_app(query_func=None, collections=None, agent=None) -> Flask:
     load_dotenv()
     logging.basicConfig(level=logging.INFO)
     app = Flask(__name__)
 
     cfg = yaml.safe_load(open("config.yaml"))
+    prof_cfg = profiling.profiling_settings(cfg)
 
-    @app.get("/health")
-    def health():
-        return jsonify({"status": "ok"})
+    def _load_pipeline():
+        # Lazy injection to avoid heavy imports during testing
+        nonlocal query_func, collections
+        if query_func is None or collections is None:
+            from src import pipeline
 
-    @app.post("/search")
-    def search():
+            pipeline.collections.start_watchers()
+            query_func = query_func or pipeline.query_system
+            collections = collections or pipeline.collections
+
+    def _search(collection=None):
         data = request.get_json(force=True, silent=True) or {}
         q = data.get("query")
         if not q:
             return jsonify({"error": "Missing 'query'"}), 400
-        # Lazy injection to avoid heavy imports during testing
-        nonlocal query_func
         if query_func is None:
-            from src.pipeline import query_system as _query_system
-
-            query_func = _query_system
-        results = query_func(q, cfg)
-        out = [
-            {
-                "score": float(score),
-                "doc_id": item.get("doc_id"),
-                "title": item.get("title"),
-                "text": item.get("text"),
-            }
-            for score, item in results
-        ]
+            _load_pipeline()
+        kwargs = {}
+        if collection is not None:
+            if collections is None:
+                _load_pipeline()
+            if collection not in collections.names():
+                return jsonify({"error": f"Unknown collection: {collection}"}), 404
+            kwargs["collection"] = collection
+        filters = data.get("filters")
+        if filters is not None:
+            if not isinstance(filters, dict):
+                return jsonify({"error": "'filters' must be an object of field -> value(s)"}), 400
+            kwargs["filters"] = filters
+        mode = None
+        if prof_cfg["allow_request"]:
+            mode = profiling.parse_mode(
+                request.args.get("profile") or request.headers.get(profiling.HEADER)
+            )
+        sampled = mode is None and profiling.should_sample(prof_cfg["sample_rate"])
+        trace = None
+        try:
+            if mode is not None or sampled:
+                results, trace = profiling.profiled_query(
+                    query_func, q, cfg, mode=mode or "trace", top=prof_cfg["cprofile_top"], **kwargs
+                )
+            else:
+                results = query_func(q, cfg, **kwargs)
+        except FilterError as exc:
+            return jsonify({"error": str(exc)}), 400
+        out = [_result_json(score, item) for score, item in results]
+        if sampled:
+            logger.info("Sampled query trace (%s): %s", request.path, json.dumps(trace))
+        elif trace is not None:
+            return jsonify({"results": out, "profile": trace})
         return jsonify({"results": out})
 
+    def _answer_events(q):
+        from src.agentic_rag import merge_contexts
+
+        sub_queries, retrievals = [], {}
+        try:
+            for event, data in agent.retrieve(q):
+                if event == "sub_queries":
+                    sub_queries = data
+                    yield _sse("sub_queries", sub_queries)
+                else:
+                    retrievals[data["query"]] = data["results"]
+                    results = [_result_json(score, item) for score, item in data["results"]]
+                    yield _sse("retrieval", {"query": data["query"], "results": results})
+            contexts = merge_contexts(q, sub_queries, retrievals)
+            parts = []
+            for delta in agent.synthesize_answer_stream(q, contexts, sub_queries):
+                parts.append(delta)
+                yield _sse("token", {"text": delta})
+            yield _sse("done", {"answer": "".join(parts).strip(), "contexts": len(contexts)})
+        except Exception as exc:
+            logger.exception("Streaming answer failed for %r", q[:80])
+            yield _sse("error", {"error": str(exc)})
+
+    @app.route("/answer", methods=["GET", "POST"])
+    def answer():
+        nonlocal agent
+        if request.method == "POST":
+            q = (request.get_json(force=True, silent=True) or {}).get("query")
+        else:
+            q = request.args.get("query")
+        if not q:
+            return jsonify({"error": "Missing 'query'"}), 400
+        if agent is None:
+            if query_func is None:
+                _load_pipeline()
+            from src.agentic_rag import AgenticRAG
+
+            agent = AgenticRAG(cfg, query_func=query_func)
+        return Response(
+            stream_with_context(_answer_events(q)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.get("/health")
+    def health():
+        return jsonify({"status": "ok"})
+
+    @app.get("/metrics")
+    def prometheus_metrics():
+        return Response(metrics.REGISTRY.render(), mimetype=metrics.CONTENT_TYPE)
+
+    @app.after_request
+    def count_request(response):
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.HTTP_REQUESTS.inc(route=route, status=str(response.status_code))
+        return response
+
+    @app.post("/search")
+    def search():
+        return _search()
+
+    @app.post("/collections/<name>/search")
+    def collection_search(name):
+        return _search(name)
+
+    @app.get("/collections")
+    def collection_metrics():
+        if collections is None:
+            _load_pipeline()
+        return jsonify(collections.metrics())
+
     return app
 
 
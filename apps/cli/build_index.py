@@ -1,3 +1,6 @@
+import argparse
+import logging
+import os
 from pathlib import Path
 import sys
 
@@ -61,7 +64,60 @@ def _ensure_project_root_on_path() -> None:
 
 _ensure_project_root_on_path()
 
-from src.index_build import main  # noqa: E402
+from src.index_build import load_config, main as build_single  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the FAISS index.")
+    parser.add_argument(
+        "--mode",
+        default="single",
+        choices=["single", "distributed", "plan", "embed", "train", "add", "merge"],
+        help="'single' builds in one process; 'distributed' runs every phase locally with "
+        "multiprocessing; the other modes run one phase (e.g. as separate Databricks tasks).",
+    )
+    parser.add_argument("--shard", type=int, help="Shard id for the embed/add phases.")
+    parser.add_argument(
+        "--num-shards", type=int, default=0, help="Overrides distributed.num_shards."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0, help="Local processes (distributed mode)."
+    )
+    parser.add_argument(
+        "--collection", help="Build a named collection from collections.items instead."
+    )
+    args = parser.parse_args(argv)
+    if args.collection:
+        os.environ["COLLECTION"] = args.collection
+
+    if args.mode == "single":
+        build_single()
+        return
+
+    from dotenv import load_dotenv
+    from src import distributed_build as dist
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s"
+    )
+    load_dotenv()
+    cfg, project_root = load_config()
+    if args.mode in ("embed", "add") and args.shard is None:
+        parser.error(f"--shard is required for --mode {args.mode}")
+    if args.mode == "distributed":
+        index_dir = dist.run_distributed(cfg, project_root, args.num_shards, args.workers)
+        print("Index built:", index_dir)
+    elif args.mode == "plan":
+        dist.run_plan(cfg, project_root, args.num_shards)
+    elif args.mode == "embed":
+        dist.run_embed_shard(cfg, project_root, args.shard)
+    elif args.mode == "train":
+        dist.run_train(cfg, project_root)
+    elif args.mode == "add":
+        dist.run_add_shard(cfg, project_root, args.shard)
+    elif args.mode == "merge":
+        dist.run_merge(cfg, project_root)
+
 
 if __name__ == "__main__":
     main()
@@ -1,4 +1,5 @@
 import argparse
+import json
 from pathlib import Path
 import sys
 import yaml
@@ -64,17 +65,35 @@ def _ensure_project_root_on_path() -> None:
 _ensure_project_root_on_path()
 
 from src.pipeline import query_system  # noqa: E402
+from src.profiling import profiled_query, profiling_settings  # noqa: E402
 
 
 def main():
     cfg = yaml.safe_load(open("config.yaml"))
     parser = argparse.ArgumentParser()
     parser.add_argument("query", help="The query to search for.")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="trace",
+        choices=["trace", "cprofile"],
+        help="Print the stage trace to stderr; 'cprofile' adds the top functions.",
+    )
     args = parser.parse_args()
 
-    results = query_system(args.query, cfg)
+    trace = None
+    if args.profile:
+        top = profiling_settings(cfg)["cprofile_top"]
+        results, trace = profiled_query(query_system, args.query, cfg, mode=args.profile, top=top)
+    else:
+        results = query_system(args.query, cfg)
     for score, item in results:
         print(f"{score:.3f}\t{item['doc_id']}\t{item['text'][:120]}...")
+    if trace is not None:
+        cprofile_text = trace.pop("cprofile", None)
+        print(json.dumps(trace, indent=2), file=sys.stderr)
+        if cprofile_text:
+            print(cprofile_text, file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+"""Exhaustive BM25 scoring vs Block-Max WAND on long multi-term queries.
+
+Builds a synthetic Zipfian corpus (or loads a built BM25 index), runs the same
+queries through `BM25Okapi.get_scores` + top-k and through `BM25WandIndex`, checks
+the results are identical and reports latency and documents scored.
+
+    python -m benchmarks.bench_bm25_wand --docs 50000 --query-terms 8 16
+    python -m benchmarks.bench_bm25_wand --bm25-dir index_bm25
+"""
+
+import argparse
+import json
+import pickle
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+_root = Path(__file__).resolve().parents[1]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from src.bm25_wand import BM25WandIndex  # noqa: E402
+from src.sparse_retriever import top_k_positions  # noqa: E402
+
+
+def synthetic_corpus(num_docs: int, vocab: int, doc_len: int, seed: int = 0):
+    """Docs of Zipf-distributed tokens, so a few terms are common and most are rare."""
+    rng = np.random.default_rng(seed)
+    ranks = np.arange(1, vocab + 1)
+    probs = (1.0 / ranks) / (1.0 / ranks).sum()
+    lengths = rng.integers(doc_len // 2, doc_len * 3 // 2, num_docs)
+    tokens = rng.choice(vocab, size=int(lengths.sum()), p=probs)
+    corpus, start = [], 0
+    for length in lengths:
+        corpus.append([f"t{t}" for t in tokens[start : start + length]])
+        start += length
+    return corpus, probs
+
+
+def sample_queries(corpus, num_queries: int, terms: int, seed: int = 1):
+    """Queries drawn from document text, so they mix common and rare terms."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for doc in rng.choice(len(corpus), num_queries):
+        doc_tokens = corpus[doc]
+        picks = rng.choice(len(doc_tokens), min(terms, len(doc_tokens)), replace=False)
+        queries.append([doc_tokens[i] for i in picks])
+    return queries
+
+
+def run(bm25, queries_by_len, top_k: int):
+    t0 = time.perf_counter()
+    wand = BM25WandIndex.from_bm25(bm25)
+    build_ms = (time.perf_counter() - t0) * 1000
+    results = []
+    for terms, queries in queries_by_len.items():
+        exhaustive_ms, wand_ms, scored, identical = 0.0, 0.0, 0, True
+        for query in queries:
+            t0 = time.perf_counter()
+            scores = np.asarray(bm25.get_scores(query))
+            top = top_k_positions(scores, top_k)
+            exhaustive_ms += (time.perf_counter() - t0) * 1000
+            stats: Dict[str, Any] = {}
+            t0 = time.perf_counter()
+            ids, wand_scores = wand.search(query, top_k, stats=stats)
+            wand_ms += (time.perf_counter() - t0) * 1000
+            scored += stats["scored_docs"]
+            identical &= (
+                ids.tolist() == top.tolist() and wand_scores.tolist() == scores[top].tolist()
+            )
+        n = len(queries)
+        results.append(
+            {
+                "query_terms": terms,
+                "queries": n,
+                "exhaustive_ms": round(exhaustive_ms / n, 3),
+                "wand_ms": round(wand_ms / n, 3),
+                "speedup": round(exhaustive_ms / max(wand_ms, 1e-9), 1),
+                "docs_scored_fraction": round(scored / n / bm25.corpus_size, 4),
+                "identical": identical,
+            }
+        )
+    return {
+        "corpus_size": bm25.corpus_size,
+        "top_k": top_k,
+        "postings_build_ms": round(build_ms, 1),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--bm25-dir", help="Use bm25_index.pkl from a built index.")
+    parser.add_argument("--docs", type=int, default=50000, help="Synthetic corpus size.")
+    parser.add_argument("--vocab", type=int, default=50000)
+    parser.add_argument("--doc-len", type=int, default=80)
+    parser.add_argument("--query-terms", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    if args.bm25_dir:
+        with open(Path(args.bm25_dir) / "bm25_index.pkl", "rb") as fh:
+            bm25 = pickle.load(fh)
+        corpus = [[t for t, tf in freqs.items() for _ in range(tf)] for freqs in bm25.doc_freqs]
+    else:
+        corpus, _ = synthetic_corpus(args.docs, args.vocab, args.doc_len)
+        bm25 = BM25Okapi(corpus)
+    queries_by_len = {t: sample_queries(corpus, args.queries, t) for t in args.query_terms}
+    report = run(bm25, queries_by_len, args.top_k)
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
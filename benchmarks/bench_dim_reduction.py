@@ -0,0 +1,110 @@
+"""Recall impact of storing reduced-dimension vectors.
+
+Compares exact top-k neighbours in the full embedding space against exact top-k
+after PCA / Matryoshka-style truncation, so the loss comes from the reduction
+alone and not from ANN approximation.
+
+    python -m benchmarks.bench_dim_reduction --index-dir index
+    python -m benchmarks.bench_dim_reduction --synthetic 20000 --dim 1024
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+_root = Path(__file__).resolve().parents[1]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from src.dim_reduction import DimReducer  # noqa: E402
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Anisotropic vectors whose variance decays with the dimension index.
+
+    Leading dimensions carry most of the signal, as in Matryoshka-trained models,
+    so both PCA and truncation have something to preserve.
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((64, dim)) * (1.0 / np.sqrt(np.arange(1, dim + 1)))
+    assign = rng.integers(0, len(topics), n)
+    noise = rng.standard_normal((n, dim)) * (0.5 / np.sqrt(np.arange(1, dim + 1)))
+    return (topics[assign] + noise).astype("float32")
+
+
+def exact_topk(db: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    db = np.ascontiguousarray(db, dtype="float32").copy()
+    queries = np.ascontiguousarray(queries, dtype="float32").copy()
+    faiss.normalize_L2(db)
+    faiss.normalize_L2(queries)
+    index = faiss.IndexFlatIP(db.shape[1])
+    index.add(db)
+    _, ids = index.search(queries, k)
+    return ids
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def run(vecs: np.ndarray, dims, methods, k: int, num_queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    perm = rng.permutation(len(vecs))
+    queries, db = vecs[perm[:num_queries]], vecs[perm[num_queries:]]
+    truth = exact_topk(db, queries, k)
+    full_dim = vecs.shape[1]
+    results = []
+    for method in methods:
+        for dim in dims:
+            if dim >= full_dim:
+                continue
+            t0 = time.perf_counter()
+            reducer = DimReducer.train(method, db, dim)
+            train_ms = (time.perf_counter() - t0) * 1000
+            found = exact_topk(reducer.apply(db), reducer.apply(queries), k)
+            results.append(
+                {
+                    "method": method,
+                    "dim": dim,
+                    f"recall@{k}": round(recall_at_k(truth, found), 4),
+                    "bytes_per_vector": dim * 4,
+                    "memory_ratio": round(dim / full_dim, 4),
+                    "train_ms": round(train_ms, 1),
+                }
+            )
+    return {"num_vectors": len(db), "full_dim": full_dim, "k": k, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--index-dir", help="Use vectors.npy from a built (unreduced) index.")
+    parser.add_argument("--synthetic", type=int, default=20000, help="Synthetic vector count.")
+    parser.add_argument("--dim", type=int, default=1024, help="Synthetic vector dimension.")
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512])
+    parser.add_argument("--methods", nargs="+", default=["pca", "truncate"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    if args.index_dir:
+        vecs = np.load(os.path.join(args.index_dir, "vectors.npy"))
+    else:
+        vecs = synthetic_vectors(args.synthetic, args.dim)
+    report = run(vecs, args.dims, args.methods, args.k, args.queries)
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""End-to-end build/load/query benchmark on synthetic corpora, fully offline.
+
+For each corpus size, writes a synthetic corpus (`benchmarks.synthetic`), builds
+the BM25 index and one FAISS index per `--faiss-types` with the deterministic
+`stub` embedding provider, then serves each index through `src.pipeline` and
+times queries for every `--rerankers` entry. Reports build time and peak RSS per
+build, load time, resident size and RSS growth per index, and per-stage query
+latency (embed, ANN, BM25, fusion, rerank, total) as p50/p95/mean.
+
+Every build and every served index runs in a fresh process, so RSS numbers do
+not leak between runs. Output is JSON (with the git commit) for diffing.
+
+    python -m benchmarks.bench_e2e --chunks 10000 100000 --out bench.json
+    python -m benchmarks.bench_e2e --chunks 10000 --faiss-types hnsw --rerankers none crossencoder
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing as mp
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import yaml
+
+_root = Path(__file__).resolve().parents[1]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from benchmarks.synthetic import SyntheticCorpus, peak_rss_mb, rss_mb  # noqa: E402
+
+FAISS_TYPES = ("flat", "hnsw", "ivf_pq", "binary_flat", "binary_ivf")
+RERANKERS = ("none", "crossencoder", "colbert")
+STAGES = ("embed_ms", "ann_ms", "sparse_ms", "fusion_ms", "rerank_ms", "total_ms")
+
+
+def bench_config(work_dir: Path, num_chunks: int, dim: int, embed_latency_ms: float) -> Dict:
+    """Repo config with the stub embedder and paths under `work_dir`."""
+    with open(_root / "config.yaml") as fh:
+        cfg = yaml.safe_load(fh)
+    nlist = int(max(16, min(4096, 4 * np.sqrt(num_chunks))))
+    cfg.update(
+        {
+            "data_path": str(work_dir / "corpus.jsonl"),
+            "bm25_index_path": str(work_dir / "index_bm25"),
+            "versioning": {"enabled": False, "watch_seconds": 0},
+            "semantic_cache": {"enabled": False},
+            "collections": {},
+            "ingest": {**(cfg.get("ingest") or {}), "max_sentences": 3, "overlap": 1},
+            "faiss": {"nlist": nlist, "m": 32, "nbits": 8, "nprobe": 16, "rescore_factor": 10},
+        }
+    )
+    cfg["embedding"] = {
+        **(cfg.get("embedding") or {}),
+        "provider": "stub",
+        "model": f"stub-{dim}",
+        "dim": dim,
+        "stub": {"latency_ms": embed_latency_ms},
+        "reduction": {"method": "none"},
+        "checkpoint": {"keep": False},
+    }
+    return cfg
+
+
+def faiss_config(cfg: Dict, work_dir: Path, faiss_type: str) -> Dict:
+    return {
+        **cfg,
+        "index_dir": str(work_dir / f"index_{faiss_type}"),
+        "faiss": {**cfg["faiss"], "type": faiss_type},
+    }
+
+
+def _build(kind: str, cfg: Dict, work_dir: str) -> Dict[str, float]:
+    """Runs in a fresh process; returns wall time and that process's peak RSS."""
+    import logging
+
+    logging.disable(logging.INFO)
+    start = time.perf_counter()
+    # Build progress goes to stderr so stdout stays the JSON report.
+    with contextlib.redirect_stdout(sys.stderr):
+        if kind == "bm25":
+            from scripts.build_bm25_index import main as build_bm25
+
+            build_bm25(cfg, work_dir)
+        else:
+            from src.index_build import main as build_faiss
+
+            build_faiss(cfg, work_dir)
+    return {"build_s": round(time.perf_counter() - start, 2), "peak_rss_mb": peak_rss_mb()}
+
+
+def _in_fresh_process(func, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+        return pool.submit(func, *args).result()
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    arr = np.asarray(values, dtype=np.float64)
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "mean": round(float(arr.mean()), 3),
+    }
+
+
+def _serve(cfg: Dict, work_dir: str, queries: List[str], rerankers: List[str], warmup: int):
+    """Runs in a fresh process: load the index through `src.pipeline` and time queries."""
+    import logging
+
+    logging.disable(logging.INFO)
+    os.chdir(work_dir)
+    with open("config.yaml", "w") as fh:
+        yaml.safe_dump(cfg, fh)
+    # Import the pipeline's dependencies first so the RSS delta is the index itself.
+    import src.index_manager  # noqa: F401
+    import src.cross_encoder_reranker  # noqa: F401
+    import src.colbert_reranker  # noqa: F401
+
+    rss_before = rss_mb()
+    import src.pipeline as pipeline
+
+    state = pipeline.index_manager.current()
+    report: Dict[str, Any] = {
+        "load_ms": state.load_ms,
+        "resident_mb": round(state.resident_bytes / 2**20, 1),
+        "load_rss_delta_mb": round(rss_mb() - rss_before, 1),
+        "queries": [],
+    }
+    for reranker in rerankers:
+        query_cfg = {
+            **cfg,
+            "reranker": {
+                **(cfg.get("reranker") or {}),
+                "enabled": reranker != "none",
+                "type": reranker,
+                "cascade": [],
+            },
+        }
+        stages: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        try:
+            for i, query in enumerate(queries[:warmup] + queries):
+                stats: Dict[str, Any] = {}
+                start = time.perf_counter()
+                pipeline.query_system(query, query_cfg, stats=stats)
+                if i < warmup:
+                    continue
+                retrieval = stats["retrieval"]
+                for stage in ("embed_ms", "ann_ms", "sparse_ms", "fusion_ms"):
+                    stages[stage].append(retrieval[stage])
+                stages["rerank_ms"].append(sum(s["ms"] for s in stats["rerank"]))
+                stages["total_ms"].append((time.perf_counter() - start) * 1000)
+        except Exception as exc:  # e.g. reranker model not available offline
+            report["queries"].append({"reranker": reranker, "error": repr(exc)})
+            continue
+        report["queries"].append(
+            {
+                "reranker": reranker,
+                "num_queries": len(queries),
+                "stages": {stage: _percentiles(values) for stage, values in stages.items()},
+            }
+        )
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def run_scale(args, num_chunks: int) -> Dict[str, Any]:
+    work_dir = Path(args.work_dir) / f"chunks_{num_chunks}"
+    work_dir.mkdir(parents=True, exist_ok=True)
+    corpus = SyntheticCorpus(num_topics=args.topics, seed=args.seed)
+    cfg = bench_config(work_dir, num_chunks, args.dim, args.embed_latency_ms)
+
+    start = time.perf_counter()
+    corpus.write(cfg["data_path"], num_chunks)
+    result: Dict[str, Any] = {
+        "chunks": num_chunks,
+        "corpus_write_s": round(time.perf_counter() - start, 2),
+        "bm25": _in_fresh_process(_build, "bm25", cfg, str(work_dir)),
+        "faiss": [],
+    }
+    queries = corpus.queries(args.queries)
+    for faiss_type in args.faiss_types:
+        type_cfg = faiss_config(cfg, work_dir, faiss_type)
+        entry = {"type": faiss_type}
+        entry["build"] = _in_fresh_process(_build, "faiss", type_cfg, str(work_dir))
+        entry.update(
+            _in_fresh_process(_serve, type_cfg, str(work_dir), queries, args.rerankers, args.warmup)
+        )
+        result["faiss"].append(entry)
+        print(f"chunks={num_chunks} faiss={faiss_type} done", file=sys.stderr)
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=_root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--faiss-types", nargs="+", default=list(FAISS_TYPES), choices=FAISS_TYPES)
+    parser.add_argument("--rerankers", nargs="+", default=["none"], choices=RERANKERS)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--dim", type=int, default=256, help="Stub embedding dimension.")
+    parser.add_argument(
+        "--embed-latency-ms", type=float, default=0.0, help="Simulated embedding API latency."
+    )
+    parser.add_argument("--topics", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="Keep corpora and indexes here (default: temp dir).")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    tmp = None
+    if not args.work_dir:
+        tmp = tempfile.TemporaryDirectory(prefix="bench_e2e_")
+        args.work_dir = tmp.name
+    report = {
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "work_dir")},
+        "runs": [run_scale(args, n) for n in args.chunks],
+    }
+    if tmp is not None:
+        tmp.cleanup()
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
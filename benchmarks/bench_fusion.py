@@ -0,0 +1,105 @@
+"""Latency of dict-based vs NumPy rank fusion.
+
+Simulates several retrievers returning overlapping ranked lists drawn from one
+corpus and times the original string-keyed dict RRF against `src.fusion.fuse`
+on integer row ids.
+
+    python -m benchmarks.bench_fusion --candidates 2000 --retrievers 2 3 4
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+_root = Path(__file__).resolve().parents[1]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from src.fusion import fuse  # noqa: E402
+
+
+def dict_rrf(results_list: List[List[Tuple[str, float]]], k: int = 60) -> Dict[str, float]:
+    """The pipeline's previous fusion: dict accumulate, then sort everything."""
+    fused_scores: Dict[str, float] = {}
+    for results in results_list:
+        for i, (doc_id, _score) in enumerate(results):
+            fused_scores[doc_id] = fused_scores.get(doc_id, 0.0) + 1.0 / (k + i + 1)
+    return dict(sorted(fused_scores.items(), key=lambda item: item[1], reverse=True))
+
+
+def ranked_lists(corpus_size: int, candidates: int, retrievers: int, seed: int = 0):
+    """Lists that share a hot head of ids so fusion sees realistic overlap."""
+    rng = np.random.default_rng(seed)
+    hot = rng.choice(corpus_size, candidates, replace=False)
+    lists = []
+    for _ in range(retrievers):
+        pool = np.concatenate([hot, rng.choice(corpus_size, candidates, replace=False)])
+        ids = rng.permutation(np.unique(pool))[:candidates]
+        lists.append((ids.astype(np.int64), np.sort(rng.random(candidates))[::-1]))
+    return lists
+
+
+def _time_ms(fn, repeats: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t0) * 1000 / repeats
+
+
+def run(corpus_size: int, candidates: int, retrievers_list, top_k: int, repeats: int):
+    results = []
+    for retrievers in retrievers_list:
+        lists = ranked_lists(corpus_size, candidates, retrievers)
+        id_lists = [ids for ids, _ in lists]
+        score_lists = [scores for _, scores in lists]
+        str_lists = [
+            [(f"doc_{i}::chunk_0000", float(s)) for i, s in zip(ids, scores)]
+            for ids, scores in lists
+        ]
+        baseline = list(dict_rrf(str_lists))[:top_k]
+        ids, _ = fuse(id_lists, top_k=top_k)
+        agree = baseline == [f"doc_{i}::chunk_0000" for i in ids]
+        row = {
+            "retrievers": retrievers,
+            "candidates_per_list": candidates,
+            "dict_rrf_ms": round(_time_ms(lambda: dict_rrf(str_lists), repeats), 3),
+            "numpy_rrf_ms": round(_time_ms(lambda: fuse(id_lists, top_k=top_k), repeats), 3),
+            "numpy_combsum_ms": round(
+                _time_ms(
+                    lambda: fuse(id_lists, score_lists, method="combsum", top_k=top_k), repeats
+                ),
+                3,
+            ),
+            "top_k_matches_dict_rrf": agree,
+        }
+        row["speedup"] = round(row["dict_rrf_ms"] / max(row["numpy_rrf_ms"], 1e-9), 1)
+        results.append(row)
+    return {"corpus_size": corpus_size, "top_k": top_k, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--corpus-size", type=int, default=1_000_000)
+    parser.add_argument("--candidates", type=int, default=2000, help="Ids per retriever list.")
+    parser.add_argument("--retrievers", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    report = run(args.corpus_size, args.candidates, args.retrievers, args.top_k, args.repeats)
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Offline retrieval quality and latency per retrieval configuration, with qrels.
+
+Builds the BM25 and FAISS indexes for `--data` (default: the repo corpus), then
+runs every labelled query in `--qrels` (default: `eval/qrels.jsonl`) through
+`src.pipeline.query_system` under each configuration:
+
+- `dense`, `bm25`: one retriever (fusion weight 0 for the other);
+- `hybrid`: the configured fusion over both;
+- `hybrid+crossencoder`, `hybrid+colbert`: hybrid followed by that reranker.
+
+Results are aggregated to documents and scored with recall@k, nDCG@k and MRR
+(`eval.ir_metrics`), overall and per query tag, next to per-stage latency
+(p50/p95/mean). `path_ms` is the latency of the stages a configuration needs;
+single-retriever configurations are emulated, so `total_ms` still includes the
+other branch.
+
+No network is used: embeddings come from the deterministic `stub` provider, or
+from a locally cached sentence-transformers model with `--embedder local`.
+With the stub, dense scores reflect shared words rather than semantics. The
+reranker configurations need their models in the local Hugging Face cache.
+
+    python -m benchmarks.bench_ir --out ir.json
+    python -m benchmarks.bench_ir --embedder local --configs dense hybrid hybrid+crossencoder
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+_root = Path(__file__).resolve().parents[1]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from benchmarks.bench_e2e import (  # noqa: E402
+    FAISS_TYPES,
+    _build,
+    _git_commit,
+    _in_fresh_process,
+    _percentiles,
+    bench_config,
+)
+from eval.ir_metrics import evaluate_ranking, load_qrels, mean_metrics  # noqa: E402
+
+CONFIGS = ("dense", "bm25", "hybrid", "hybrid+crossencoder", "hybrid+colbert")
+STAGES = ("embed_ms", "ann_ms", "sparse_ms", "fusion_ms", "rerank_ms", "path_ms", "total_ms")
+
+
+def ir_config(args, work_dir: Path) -> Dict[str, Any]:
+    with open(args.data) as fh:
+        num_docs = sum(1 for line in fh if line.strip())
+    cfg = bench_config(work_dir, num_docs, args.dim, 0.0)
+    cfg["data_path"] = str(Path(args.data).resolve())
+    cfg["index_dir"] = str(work_dir / "index")
+    cfg["faiss"]["type"] = args.faiss_type
+    if args.embedder == "local":
+        cfg["embedding"].update(
+            {"provider": "local", "model": args.local_model, "local": {"model": args.local_model}}
+        )
+    return cfg
+
+
+def variant(cfg: Dict[str, Any], name: str, max_k: int) -> Dict[str, Any]:
+    """`cfg` set up for one retrieval configuration, returning `max_k` documents."""
+    fusion = dict(cfg.get("fusion") or {})
+    if name == "dense":
+        fusion["weights"] = [1.0, 0.0]
+    elif name == "bm25":
+        fusion["weights"] = [0.0, 1.0]
+    reranker = dict(cfg.get("reranker") or {})
+    reranker.update({"enabled": "+" in name, "cascade": [], "reranker_k": max_k})
+    if "+" in name:
+        reranker["type"] = name.split("+", 1)[1]
+    return {
+        **cfg,
+        "fusion": fusion,
+        "reranker": reranker,
+        "retrieval": {**(cfg.get("retrieval") or {}), "aggregate": "doc", "top_k": max_k},
+    }
+
+
+def _path_ms(name: str, stats: Dict[str, Any]) -> float:
+    retrieval = stats["retrieval"]
+    if name == "dense":
+        retrieval_ms = retrieval["embed_ms"] + retrieval["ann_ms"]
+    elif name == "bm25":
+        retrieval_ms = retrieval["sparse_ms"]
+    else:
+        retrieval_ms = retrieval["total_ms"]
+    rerank_ms = sum(s["ms"] for s in stats["rerank"])
+    return retrieval_ms + retrieval["fusion_ms"] + rerank_ms
+
+
+def _evaluate(cfg: Dict, work_dir: str, qrels: List[Dict], configs: List[str], ks: List[int]):
+    """Runs in a fresh process: score and time every query under every configuration."""
+    import logging
+
+    logging.disable(logging.INFO)
+    os.chdir(work_dir)
+    import yaml
+
+    with open("config.yaml", "w") as fh:
+        yaml.safe_dump(cfg, fh)
+    import src.pipeline as pipeline
+
+    report: List[Dict[str, Any]] = []
+    for name in configs:
+        query_cfg = variant(cfg, name, max(ks))
+        per_query: List[Dict[str, Any]] = []
+        per_tag: Dict[str, List[Dict[str, float]]] = {}
+        stages: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        try:
+            pipeline.query_system(qrels[0]["query"], query_cfg)  # warm-up (model load)
+            for item in qrels:
+                stats: Dict[str, Any] = {}
+                start = time.perf_counter()
+                results = pipeline.query_system(item["query"], query_cfg, stats=stats)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                ranking = [chunk["doc_id"] for _score, chunk in results]
+                metrics = evaluate_ranking(ranking, item["relevant"], ks)
+                per_query.append({"qid": item.get("qid"), "ranking": ranking, **metrics})
+                for tag in item.get("tags", []):
+                    per_tag.setdefault(tag, []).append(metrics)
+                retrieval = stats["retrieval"]
+                for stage in ("embed_ms", "ann_ms", "sparse_ms", "fusion_ms"):
+                    stages[stage].append(retrieval[stage])
+                stages["rerank_ms"].append(sum(s["ms"] for s in stats["rerank"]))
+                stages["path_ms"].append(_path_ms(name, stats))
+                stages["total_ms"].append(elapsed_ms)
+        except Exception as exc:  # e.g. reranker model not in the local cache
+            report.append({"config": name, "error": repr(exc)})
+            continue
+        scores = [{k: v for k, v in q.items() if k not in ("qid", "ranking")} for q in per_query]
+        report.append(
+            {
+                "config": name,
+                "metrics": mean_metrics(scores),
+                "by_tag": {tag: mean_metrics(m) for tag, m in sorted(per_tag.items())},
+                "latency_ms": {stage: _percentiles(values) for stage, values in stages.items()},
+                "queries": per_query,
+            }
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--qrels", default=str(_root / "eval" / "qrels.jsonl"))
+    parser.add_argument("--data", default=str(_root / "data" / "sample_docs.jsonl"))
+    parser.add_argument(
+        "--configs", nargs="+", default=["dense", "bm25", "hybrid"], choices=CONFIGS
+    )
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--embedder", choices=["stub", "local"], default="stub")
+    parser.add_argument("--local-model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--dim", type=int, default=256, help="Stub embedding dimension.")
+    parser.add_argument("--faiss-type", default="flat", choices=FAISS_TYPES)
+    parser.add_argument("--work-dir", help="Keep indexes here (default: temp dir).")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    tmp = None
+    if not args.work_dir:
+        tmp = tempfile.TemporaryDirectory(prefix="bench_ir_")
+        args.work_dir = tmp.name
+    work_dir = Path(args.work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    cfg = ir_config(args, work_dir)
+    qrels = load_qrels(args.qrels)
+    ks = sorted(set(args.k))
+    report = {
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "work_dir")},
+        "num_queries": len(qrels),
+        "build": {
+            "bm25": _in_fresh_process(_build, "bm25", cfg, str(work_dir)),
+            "faiss": _in_fresh_process(_build, "faiss", cfg, str(work_dir)),
+        },
+        "configs": _in_fresh_process(_evaluate, cfg, str(work_dir), qrels, args.configs, ks),
+    }
+    if tmp is not None:
+        tmp.cleanup()
+    for entry in report["configs"]:
+        summary = entry.get("metrics") or entry.get("error")
+        path = entry.get("latency_ms", {}).get("path_ms", {}).get("p50")
+        print(f"{entry['config']:>20}: {summary} path p50={path} ms", file=sys.stderr)
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""BM25 index size, query latency and recall: whitespace split vs `src.tokenizer`.
+
+Chunks a JSONL corpus the same way as the index builds, then builds one BM25
+index per tokenizer. Queries are a few words sampled from a chunk and typed the
+way users do (lowercase, no punctuation); recall@k counts how often that chunk
+comes back.
+
+    python -m benchmarks.bench_tokenizer --data data/sample_docs.jsonl
+"""
+
+import argparse
+import json
+import pickle
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+_root = Path(__file__).resolve().parents[1]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from src.chunking import chunk_documents, chunk_search_text  # noqa: E402
+from src.sparse_retriever import top_k_positions, whitespace_tokenize  # noqa: E402
+from src.tokenizer import Tokenizer, Vocabulary  # noqa: E402
+
+
+def user_queries(texts, num_queries: int, words: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    queries = []
+    for target in rng.choice(len(texts), num_queries):
+        tokens = re.findall(r"\w+", texts[target].lower())
+        if len(tokens) < words:
+            continue
+        start = int(rng.integers(0, len(tokens) - words + 1))
+        queries.append((int(target), " ".join(tokens[start : start + words])))
+    return queries
+
+
+def evaluate(name, tokenize_doc, tokenize_query, texts, queries, k: int):
+    t0 = time.perf_counter()
+    tokenized = [tokenize_doc(t) for t in texts]
+    vocab = None
+    if name != "whitespace":
+        vocab = Vocabulary.build(tokenized)
+        tokenized = [vocab.encode(t) for t in tokenized]
+    bm25 = BM25Okapi(tokenized)
+    build_ms = (time.perf_counter() - t0) * 1000
+    size = len(pickle.dumps(bm25)) + (len(json.dumps(vocab.tokens)) if vocab else 0)
+
+    hits, query_ms = 0, 0.0
+    for target, query in queries:
+        t0 = time.perf_counter()
+        terms = tokenize_query(query) if vocab is None else vocab.encode(tokenize_query(query))
+        top = top_k_positions(np.asarray(bm25.get_scores(terms)), k)
+        query_ms += (time.perf_counter() - t0) * 1000
+        hits += int(target in top)
+    return {
+        "tokenizer": name,
+        "vocab_size": len(bm25.idf),
+        "postings": int(sum(len(f) for f in bm25.doc_freqs)),
+        "index_bytes": size,
+        "build_ms": round(build_ms, 1),
+        "query_ms": round(query_ms / max(len(queries), 1), 3),
+        f"recall@{k}": round(hits / max(len(queries), 1), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--data", default=str(_root / "data" / "sample_docs.jsonl"))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--words", type=int, default=4, help="Words per sampled query.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    docs = [json.loads(line) for line in open(args.data) if line.strip()]
+    texts = [chunk_search_text(c) for c in chunk_documents(docs)]
+    queries = user_queries(texts, args.queries, args.words)
+    results = [
+        evaluate("whitespace", whitespace_tokenize, whitespace_tokenize, texts, queries, args.k)
+    ]
+    for stemmer in ("none", "light"):
+        tok = Tokenizer(stemmer=stemmer)
+        results.append(
+            evaluate(f"tokenizer/{stemmer}", tok.tokenize, tok.tokenize, texts, queries, args.k)
+        )
+    report = {"chunks": len(texts), "queries": len(queries), "results": results}
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
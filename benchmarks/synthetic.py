@@ -0,0 +1,125 @@
+"""Deterministic synthetic corpora for scale benchmarks.
+
+Documents are written in the `data_path` JSONL format with exactly three
+sentences each, so the default chunker (`ingest.max_sentences: 3`) yields one
+chunk per document and `--chunks` is the indexed corpus size. Each document
+belongs to a topic: sentences mix that topic's key terms with Zipfian
+background words, so BM25 and the stub embedder both have signal to rank on.
+
+    python -m benchmarks.synthetic --chunks 100000 --out /tmp/corpus.jsonl
+"""
+
+import argparse
+import json
+import resource
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+SENTENCES_PER_DOC = 3
+_BATCH = 10_000
+
+
+def _word(i: int) -> str:
+    """Pronounceable pseudo-word for vocabulary id `i` (unique per id)."""
+    consonants, vowels = "bdfgklmnprstvz", "aeiou"
+    out = []
+    i += 1
+    while i:
+        i, r = divmod(i, len(consonants) * len(vowels))
+        out.append(consonants[r % len(consonants)] + vowels[r // len(consonants)])
+    return "".join(out)
+
+
+class SyntheticCorpus:
+    def __init__(
+        self,
+        num_topics: int = 1000,
+        vocab: int = 50_000,
+        topic_terms: int = 20,
+        words_per_sentence: int = 12,
+        seed: int = 0,
+    ):
+        self.seed = seed
+        self.words_per_sentence = words_per_sentence
+        self.words = [_word(i) for i in range(vocab)]
+        rng = np.random.default_rng(seed)
+        self.topics = rng.choice(vocab, size=(num_topics, topic_terms))
+        ranks = np.arange(1, vocab + 1)
+        self.background = (1.0 / ranks) / (1.0 / ranks).sum()
+
+    def _sentence(self, topic_words: np.ndarray, background: np.ndarray) -> str:
+        words = [self.words[w] for w in np.concatenate([topic_words, background])]
+        return " ".join(words).capitalize() + "."
+
+    def docs(self, num_docs: int) -> Iterator[Dict[str, str]]:
+        rng = np.random.default_rng(self.seed + 1)
+        n_topic = self.words_per_sentence // 3
+        n_background = self.words_per_sentence - n_topic
+        for start in range(0, num_docs, _BATCH):
+            size = min(_BATCH, num_docs - start)
+            topics = rng.integers(len(self.topics), size=size)
+            picks = rng.integers(self.topics.shape[1], size=(size, SENTENCES_PER_DOC, n_topic))
+            background = rng.choice(
+                len(self.words), size=(size, SENTENCES_PER_DOC, n_background), p=self.background
+            )
+            for i in range(size):
+                topic = topics[i]
+                sentences = [
+                    self._sentence(self.topics[topic][picks[i, s]], background[i, s])
+                    for s in range(SENTENCES_PER_DOC)
+                ]
+                yield {
+                    "doc_id": f"syn_{start + i:09d}",
+                    "title": f"topic {topic}",
+                    "text": " ".join(sentences),
+                }
+
+    def queries(self, num_queries: int, terms: int = 4) -> List[str]:
+        """Queries of a topic's key terms, so each has many relevant documents."""
+        rng = np.random.default_rng(self.seed + 2)
+        out = []
+        for topic in rng.integers(len(self.topics), size=num_queries):
+            picks = rng.choice(self.topics.shape[1], size=terms, replace=False)
+            out.append(" ".join(self.words[w] for w in self.topics[topic][picks]))
+        return out
+
+    def write(self, path: str, num_docs: int) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            for doc in self.docs(num_docs):
+                fh.write(json.dumps(doc) + "\n")
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+        return round(pages * resource.getpagesize() / 2**20, 1)
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--chunks", type=int, default=10_000)
+    parser.add_argument("--topics", type=int, default=1000)
+    parser.add_argument("--vocab", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="JSONL file to write.")
+    args = parser.parse_args()
+    corpus = SyntheticCorpus(num_topics=args.topics, vocab=args.vocab, seed=args.seed)
+    corpus.write(args.out, args.chunks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Concurrent LLM-judge evaluation with a persistent judgment cache.
+
+Same metrics and report format as `eval/run_evaluation.py` (groundedness,
+average context relevance over the top 5 contexts, answer relevance), but:
+
+- judge calls go through `AsyncOpenAI` with at most `--concurrency` requests in
+  flight; the client retries rate limits and transient errors with backoff;
+- every judgment with a score is stored in SQLite (default `eval/judgments.db`, next to
+  `eval/tru.db`) keyed on (judge model, SHA-256 of the prompt), so a re-run only
+  pays for new (question, text) pairs, and identical prompts that are in flight
+  at the same time share one request;
+- questions are answered `--app-concurrency` at a time on worker threads
+  (retrieval and generation are blocking) and judged as soon as each answer is
+  ready, so answering and judging overlap.
+
+    python -m eval.async_runner --app rag --questions questions.jsonl --concurrency 32
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import yaml
+
+# Ensure project root is in path for imports
+root = Path(__file__).resolve().parents[1]
+if str(root) not in sys.path:
+    sys.path.insert(0, str(root))
+
+from eval.feedback import (  # noqa: E402
+    JUDGE_MODEL,
+    groundedness_prompt,
+    has_score,
+    parse_score,
+    relevance_prompt,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "eval/judgments.db"
+CONTEXTS_JUDGED = 5
+
+AnswerFn = Callable[[str], Tuple[List[str], str]]
+
+
+class JudgmentCache:
+    """Judge replies and scores in SQLite, keyed on (model, prompt hash)."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS judgments (
+                model TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                reply TEXT NOT NULL,
+                score REAL NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (model, prompt_hash)
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, model: str, prompt_hash: str) -> Optional[float]:
+        row = self._conn.execute(
+            "SELECT score FROM judgments WHERE model = ? AND prompt_hash = ?",
+            (model, prompt_hash),
+        ).fetchone()
+        return None if row is None else float(row[0])
+
+    def put(self, model: str, prompt_hash: str, reply: str, score: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO judgments VALUES (?, ?, ?, ?, ?)",
+            (model, prompt_hash, reply, score, time.time()),
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM judgments").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class AsyncJudge:
+    """Scores judge prompts concurrently, through the cache when one is given.
+
+    `client` is any object with an async `chat.completions.create` (default: an
+    `AsyncOpenAI` created on first use). Create the judge inside the event loop
+    that uses it.
+    """
+
+    def __init__(
+        self,
+        model: str = JUDGE_MODEL,
+        cache: Optional[JudgmentCache] = None,
+        concurrency: int = 16,
+        client: Any = None,
+        max_retries: int = 5,
+    ):
+        self.model = model
+        self.cache = cache
+        self._client = client
+        self._max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"cache_hits": 0, "api_calls": 0, "deduplicated": 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(max_retries=self._max_retries)
+        return self._client
+
+    async def score(self, prompt: str) -> float:
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        if self.cache is not None:
+            cached = self.cache.get(self.model, key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return cached
+        if key in self._inflight:
+            self.stats["deduplicated"] += 1
+            return await asyncio.shield(self._inflight[key])
+        task = asyncio.ensure_future(self._call(prompt, key))
+        self._inflight[key] = task
+        try:
+            return await task
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _call(self, prompt: str, key: str) -> float:
+        async with self._semaphore:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.0,
+                max_tokens=5,
+            )
+        self.stats["api_calls"] += 1
+        reply = (response.choices[0].message.content or "") if response.choices else ""
+        score = parse_score(reply)
+        # A reply without a number scores 0.0 now but is retried on the next run.
+        if self.cache is not None and has_score(reply):
+            self.cache.put(self.model, key, reply, score)
+        return score
+
+    async def groundedness(self, source: str, statement: str) -> float:
+        return await self.score(groundedness_prompt(source, statement))
+
+    async def relevance(self, question: str, text: str) -> float:
+        return await self.score(relevance_prompt(question, text))
+
+
+async def evaluate_answer(
+    judge: AsyncJudge, question: str, answer: str, contexts: Sequence[str]
+) -> Dict[str, float]:
+    """The metrics `run_evaluation` reports, with all judge calls issued at once."""
+    grounded, answer_relevance, *ctx_scores = await asyncio.gather(
+        judge.groundedness("\n\n".join(contexts), answer),
+        judge.relevance(question, answer),
+        *(judge.relevance(question, ctx) for ctx in contexts[:CONTEXTS_JUDGED]),
+    )
+    return {
+        "groundedness": grounded,
+        "context_relevance_avg": sum(ctx_scores) / len(ctx_scores) if ctx_scores else 0.0,
+        "answer_relevance": answer_relevance,
+    }
+
+
+async def evaluate_questions(
+    answer_fn: AnswerFn,
+    questions: Sequence[str],
+    judge: AsyncJudge,
+    app_concurrency: int = 4,
+) -> List[Dict[str, Any]]:
+    """Answer (on threads) and judge every question; results keep the input order.
+
+    A question whose answering or judging fails gets an "error" entry instead of
+    metrics, so one bad question does not abort the run.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max(1, app_concurrency))
+
+    async def one(question: str) -> Dict[str, Any]:
+        try:
+            contexts, answer = await loop.run_in_executor(executor, answer_fn, question)
+            metrics = await evaluate_answer(judge, question, answer, contexts)
+        except Exception as exc:
+            logger.warning("Evaluation failed for %r: %s", question[:80], exc)
+            return {"question": question, "error": repr(exc)}
+        return {"question": question, "answer": answer, "metrics": metrics, "contexts": contexts}
+
+    try:
+        return list(await asyncio.gather(*(one(q) for q in questions)))
+    finally:
+        executor.shutdown(wait=False)
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    scored = [r["metrics"] for r in results if "metrics" in r]
+    means = {
+        name: round(sum(m[name] for m in scored) / len(scored), 4) if scored else 0.0
+        for name in ("groundedness", "context_relevance_avg", "answer_relevance")
+    }
+    return {"questions": len(results), "errors": len(results) - len(scored), "mean": means}
+
+
+def load_questions(path: str, limit: int = 0) -> List[str]:
+    """JSONL with a "question" (or "query") field, or plain text, one question per line."""
+    questions = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line.startswith("{"):
+                record = json.loads(line)
+                line = record.get("question") or record.get("query") or ""
+            if line:
+                questions.append(line)
+    return questions[:limit] if limit else questions
+
+
+async def run_app(app, questions: List[str], args) -> Dict[str, Any]:
+    cache = None if args.no_cache else JudgmentCache(args.cache)
+    judge = AsyncJudge(model=args.judge_model, cache=cache, concurrency=args.concurrency)
+    start = time.perf_counter()
+    try:
+        results = await evaluate_questions(app.answer, questions, judge, args.app_concurrency)
+    finally:
+        if cache is not None:
+            cache.close()
+    summary = summarize(results)
+    summary.update(
+        {
+            "judge_model": args.judge_model,
+            "elapsed_s": round(time.perf_counter() - start, 2),
+            **judge.stats,
+        }
+    )
+    return {"summary": summary, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--app", choices=["rag", "agentic", "both"], default="both")
+    parser.add_argument("--questions", help="Question file (default: the built-in questions).")
+    parser.add_argument("--limit", type=int, default=0, help="Evaluate only the first N.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Judge requests in flight.")
+    parser.add_argument(
+        "--app-concurrency", type=int, default=4, help="Questions answered in parallel."
+    )
+    parser.add_argument("--judge-model", default=os.getenv("JUDGE_MODEL", JUDGE_MODEL))
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="SQLite judgment cache.")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the judge.")
+    parser.add_argument("--out-dir", default="eval/reports")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    # Imported here: loading the pipeline loads the index.
+    from eval.run_evaluation import EVAL_QUESTIONS, AgenticRAGApp, RAGApp
+
+    config = yaml.safe_load(open("config.yaml"))
+    questions = load_questions(args.questions, args.limit) if args.questions else EVAL_QUESTIONS
+    apps = {"rag": [RAGApp], "agentic": [AgenticRAGApp], "both": [RAGApp, AgenticRAGApp]}
+    os.makedirs(args.out_dir, exist_ok=True)
+    for app_class in apps[args.app]:
+        report = asyncio.run(run_app(app_class(config), questions, args))
+        out_path = os.path.join(args.out_dir, f"{app_class.__name__.lower()}_summary.yaml")
+        with open(out_path, "w") as fh:
+            yaml.safe_dump(report, fh, indent=2, sort_keys=False)
+        print(f"{app_class.__name__}: {json.dumps(report['summary'])}")
+        print(f"Wrote summary to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
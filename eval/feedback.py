@@ -1,18 +1,27 @@
 import re
+from typing import Optional
+
 from openai import OpenAI
 from dotenv import load_dotenv
 
 # Load environment variables from .env file to instantiate the client
 load_dotenv()
 
-client = OpenAI()
+JUDGE_MODEL = "gpt-4o-mini"
 
+_client: Optional[OpenAI] = None
 
-def groundedness_score(source: str, statement: str) -> float:
-    """
-    Computes groundedness of a statement given a source, scaled to 0-1.
-    """
-    prompt = f"""You are a fact-checking expert. Given the SOURCE text, determine if the STATEMENT is entirely supported by the information in the SOURCE.
+
+def get_client() -> OpenAI:
+    """OpenAI client, created on first use so importing this module needs no API key."""
+    global _client
+    if _client is None:
+        _client = OpenAI()
+    return _client
+
+
+def groundedness_prompt(source: str, statement: str) -> str:
+    return f"""You are a fact-checking expert. Given the SOURCE text, determine if the STATEMENT is entirely supported by the information in the SOURCE.
 Respond with a single number from 0 to 10, where 0 means 'not grounded' and 10 means 'perfectly grounded'.
 
 SOURCE:
@@ -23,31 +32,10 @@ STATEMENT:
 
 SCORE (0-10):
 """
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.0,
-        max_tokens=5,
-    )
-
-    try:
-        score_str = response.choices[0].message.content.strip()
-        # Find the first number in the response string
-        match = re.search(r"\d+\.?\d*", score_str)
-        if match:
-            score = float(match.group())
-            return min(max(score / 10.0, 0.0), 1.0)  # Scale to 0-1
-    except (ValueError, IndexError):
-        return 0.0
-    return 0.0
 
 
-def relevance_score(question: str, text: str) -> float:
-    """
-    Computes relevance of a text to a question, scaled to 0-1.
-    Used for both context relevance and answer relevance.
-    """
-    prompt = f"""You are a relevance-scoring expert. Given the QUESTION, determine how relevant the TEXT is to answering the question.
+def relevance_prompt(question: str, text: str) -> str:
+    return f"""You are a relevance-scoring expert. Given the QUESTION, determine how relevant the TEXT is to answering the question.
 Respond with a single number from 0 to 10, where 0 means 'not relevant' and 10 means 'perfectly relevant'.
 
 QUESTION:
@@ -58,19 +46,49 @@ TEXT:
 
 SCORE (0-10):
 """
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.0,
-        max_tokens=5,
-    )
 
+
+def has_score(score_str: Optional[str]) -> bool:
+    """Whether a judge reply contains a number (an empty or cut-off reply does not)."""
+    return re.search(r"\d", score_str or "") is not None
+
+
+def parse_score(score_str: Optional[str]) -> float:
+    """First number in a judge reply, scaled from 0-10 to 0-1 (0.0 if there is none)."""
     try:
-        score_str = response.choices[0].message.content.strip()
-        match = re.search(r"\d+\.?\d*", score_str)
+        # Find the first number in the response string
+        match = re.search(r"\d+\.?\d*", (score_str or "").strip())
         if match:
             score = float(match.group())
             return min(max(score / 10.0, 0.0), 1.0)  # Scale to 0-1
-    except (ValueError, IndexError):
+    except ValueError:
         return 0.0
     return 0.0
+
+
+def _judge(prompt: str) -> float:
+    response = get_client().chat.completions.create(
+        model=JUDGE_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.0,
+        max_tokens=5,
+    )
+    try:
+        return parse_score(response.choices[0].message.content)
+    except IndexError:
+        return 0.0
+
+
+def groundedness_score(source: str, statement: str) -> float:
+    """
+    Computes groundedness of a statement given a source, scaled to 0-1.
+    """
+    return _judge(groundedness_prompt(source, statement))
+
+
+def relevance_score(question: str, text: str) -> float:
+    """
+    Computes relevance of a text to a question, scaled to 0-1.
+    Used for both context relevance and answer relevance.
+    """
+    return _judge(relevance_prompt(question, text))
@@ -0,0 +1,62 @@
+"""LLM-free retrieval metrics over graded relevance labels (qrels).
+
+A qrels file is JSONL, one query per line:
+
+    {"qid": "q001", "query": "...", "relevant": {"doc_000017": 2, "doc_000001": 1}, "tags": [...]}
+
+Grades are 0 (not relevant) or higher (more relevant); unlisted docs are 0.
+Rankings are doc_id lists, best first, without duplicates. Recall and MRR count
+any grade > 0 as relevant; nDCG uses the grades as gains (2^grade - 1).
+"""
+
+import json
+import math
+from typing import Any, Dict, List, Mapping, Sequence
+
+
+def load_qrels(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def recall_at_k(ranking: Sequence[str], relevant: Mapping[str, int], k: int) -> float:
+    wanted = {doc for doc, grade in relevant.items() if grade > 0}
+    if not wanted:
+        return 0.0
+    return len(wanted.intersection(ranking[:k])) / len(wanted)
+
+
+def reciprocal_rank(ranking: Sequence[str], relevant: Mapping[str, int], k: int) -> float:
+    for rank, doc in enumerate(ranking[:k], start=1):
+        if relevant.get(doc, 0) > 0:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranking: Sequence[str], relevant: Mapping[str, int], k: int) -> float:
+    dcg = sum(
+        (2 ** relevant.get(doc, 0) - 1) / math.log2(rank + 1)
+        for rank, doc in enumerate(ranking[:k], start=1)
+    )
+    ideal = sorted((g for g in relevant.values() if g > 0), reverse=True)[:k]
+    idcg = sum((2**g - 1) / math.log2(rank + 1) for rank, g in enumerate(ideal, start=1))
+    return dcg / idcg if idcg else 0.0
+
+
+def evaluate_ranking(
+    ranking: Sequence[str], relevant: Mapping[str, int], ks: Sequence[int]
+) -> Dict[str, float]:
+    """recall@k and ndcg@k for every k, plus MRR cut off at the largest k."""
+    out = {f"mrr@{max(ks)}": reciprocal_rank(ranking, relevant, max(ks))}
+    for k in ks:
+        out[f"recall@{k}"] = recall_at_k(ranking, relevant, k)
+        out[f"ndcg@{k}"] = ndcg_at_k(ranking, relevant, k)
+    return out
+
+
+def mean_metrics(per_query: Sequence[Mapping[str, float]]) -> Dict[str, float]:
+    if not per_query:
+        return {}
+    return {
+        name: round(sum(m[name] for m in per_query) / len(per_query), 4) for name in per_query[0]
+    }
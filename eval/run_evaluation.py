@@ -2,7 +2,7 @@ import os
 import sys
 from pathlib import Path
 import yaml
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from dotenv import load_dotenv
 from openai import OpenAI
 
@@ -16,6 +16,11 @@ from src.pipeline import query_system  # noqa: E402
 from eval.feedback import groundedness_score, relevance_score  # noqa: E402
 from src.agentic_rag import AgenticRAG  # noqa: E402
 
+EVAL_QUESTIONS = [
+    "Compare and contrast ColBERT with traditional cross-encoder and bi-encoder models, highlighting its unique mechanism.",
+    "How does the FAISS IVFPQ index work, and what are the trade-offs compared to a Flat index?",
+]
+
 # --- App components ---
 
 
@@ -45,6 +50,11 @@ class RAGApp:
         )
         return resp.choices[0].message.content.strip()
 
+    def answer(self, query: str) -> Tuple[List[str], str]:
+        """(contexts, answer) for one query; safe to call from several threads."""
+        contexts = self.retrieve(query)
+        return contexts, self.synthesize(query, contexts)
+
 
 class AgenticRAGApp:
     def __init__(self, config):
@@ -71,6 +81,12 @@ class AgenticRAGApp:
         self._run_agent_if_needed(query)
         return self._last_run_results.get("final_answer", "")
 
+    def answer(self, query: str) -> Tuple[List[str], str]:
+        """(contexts, answer) for one query; unlike retrieve/synthesize, keeps no shared state."""
+        result = self.agent.run(query)
+        contexts = [c["text"] for c in result.get("retrieved_contexts", [])]
+        return contexts, result.get("final_answer", "")
+
 
 # --- Evaluation Runner ---
 
@@ -82,10 +98,7 @@ def run_evaluation(app_class):
 
     rag_app = app_class(config)
 
-    eval_questions = [
-        "Compare and contrast ColBERT with traditional cross-encoder and bi-encoder models, highlighting its unique mechanism.",
-        "How does the FAISS IVFPQ index work, and what are the trade-offs compared to a Flat index?",
-    ]
+    eval_questions = EVAL_QUESTIONS
 
     results: List[Dict[str, Any]] = []
 
@@ -99,6 +99,14 @@ bm25_dir = Path(cfg.get("bm25_index_path", PROJECT_ROOT / "index_bm25"))
 if not bm25_dir.is_absolute():
     bm25_dir = PROJECT_ROOT / bm25_dir
 
+from src.index_versions import bm25_dir as paired_bm25_dir, resolve_index_dir  # noqa: E402
+
+# Versioned roots keep the live files under versions/<CURRENT>/, BM25 in its bm25/.
+bm25_cfg = {"bm25_index_path": str(bm25_dir)}
+index_root = index_dir
+index_dir = Path(resolve_index_dir(str(index_root)))
+bm25_dir = Path(paired_bm25_dir(bm25_cfg, str(index_dir)))
+
 print("FAISS index dir:", index_dir)
 print("BM25 index dir:", bm25_dir)
 print("FAISS files:", list(index_dir.glob("*")))
@@ -108,6 +116,8 @@ print("BM25 files:", list(bm25_dir.glob("*")))
 from scripts.build_bm25_index import main as build_bm25  # noqa: E402
 
 build_bm25()
+index_dir = Path(resolve_index_dir(str(index_root)))
+bm25_dir = Path(paired_bm25_dir(bm25_cfg, str(index_dir)))
 
 # COMMAND ----------
 # BM25 sample query using SparseRetriever  # noqa: E402
@@ -117,8 +127,8 @@ bm25 = SparseRetriever(str(bm25_dir))
 query = "What is ColBERT?"
 results = bm25.search(query, top_k=5)
 print("BM25 results:")
-for doc_id, score in results:
-    print(f"{score:.3f}\t{doc_id}")
+for chunk_id, score in results:
+    print(f"{score:.3f}\t{chunk_id}")
 
 # COMMAND ----------
 # FAISS sample query using Voyage embeddings  # noqa: E402
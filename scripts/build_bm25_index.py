@@ -1,8 +1,8 @@
 import json
-import pickle
+import os
+import sys
 from pathlib import Path
 import yaml
-from rank_bm25 import BM25Okapi
 
 
 def _detect_project_root() -> Path:
@@ -49,39 +49,61 @@ def _detect_project_root() -> Path:
     return candidates[0].parent if candidates else Path.cwd()
 
 
-def main():
-    """Builds and saves a BM25 index from the project's documents."""
-    project_root = _detect_project_root()
-    cfg_path = project_root / "config.yaml"
-    if not cfg_path.exists():
-        # Additional fallback: try CWD
-        alt_cfg = Path.cwd() / "config.yaml"
-        if alt_cfg.exists():
-            cfg_path = alt_cfg
-        else:
-            # Try workspace search one more time
-            ws_root = Path("/Workspace/Users")
-            found_cfg = None
-            if ws_root.exists():
-                for user_dir in ws_root.iterdir():
-                    if not user_dir.is_dir():
-                        continue
-                    for repo_dir in user_dir.iterdir():
-                        candidate = repo_dir / "config.yaml"
-                        if candidate.exists():
-                            found_cfg = candidate
-                            break
-                    if found_cfg:
-                        break
-            if found_cfg:
-                cfg_path = found_cfg
+def main(cfg=None, project_root=None):
+    """Builds and saves a BM25 index from the project's documents.
+
+    `cfg` defaults to the project's config.yaml; relative paths resolve against
+    `project_root`. With versioning enabled, BM25 lives inside the dense index
+    version: this publishes a new version re-indexing the current one's chunks.
+    """
+    project_root = Path(project_root) if project_root else _detect_project_root()
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from src.bm25_build import build_bm25, rebuild_bm25_version
+    from src.chunking import chunk_documents
+    from src.collection_registry import collection_config
+    from src.index_versions import versioning_settings
+    from src.parallel import ingest_settings
+
+    if cfg is None:
+        cfg_path = project_root / "config.yaml"
+        if not cfg_path.exists():
+            # Additional fallback: try CWD
+            alt_cfg = Path.cwd() / "config.yaml"
+            if alt_cfg.exists():
+                cfg_path = alt_cfg
             else:
-                raise FileNotFoundError(
-                    f"config.yaml not found near {project_root} or {Path.cwd()}"
-                )
+                # Try workspace search one more time
+                ws_root = Path("/Workspace/Users")
+                found_cfg = None
+                if ws_root.exists():
+                    for user_dir in ws_root.iterdir():
+                        if not user_dir.is_dir():
+                            continue
+                        for repo_dir in user_dir.iterdir():
+                            candidate = repo_dir / "config.yaml"
+                            if candidate.exists():
+                                found_cfg = candidate
+                                break
+                        if found_cfg:
+                            break
+                if found_cfg:
+                    cfg_path = found_cfg
+                else:
+                    raise FileNotFoundError(
+                        f"config.yaml not found near {project_root} or {Path.cwd()}"
+                    )
+
+        print(f"Using config: {cfg_path}")
+        cfg = collection_config(yaml.safe_load(open(cfg_path, "r")), os.getenv("COLLECTION"))
+    if versioning_settings(cfg)["enabled"]:
+        index_root = Path(cfg.get("index_dir", project_root / "index"))
+        if not index_root.is_absolute():
+            index_root = project_root / index_root
+        out_dir = rebuild_bm25_version(str(index_root), cfg)
+        print(f"BM25 index rebuilt into {out_dir}")
+        return
 
-    print(f"Using config: {cfg_path}")
-    cfg = yaml.safe_load(open(cfg_path, "r"))
     # Read from config if relative path; otherwise use absolute
     data_path = Path(cfg.get("data_path", project_root / "data" / "sample_docs.jsonl"))
     if not data_path.is_absolute():
@@ -89,29 +111,14 @@ def main():
     index_dir = Path(cfg.get("bm25_index_path", project_root / "index_bm25"))
     if not index_dir.is_absolute():
         index_dir = project_root / index_dir
-    index_dir.mkdir(exist_ok=True)
 
     print(f"Loading documents from {data_path}...")
-    docs = [json.loads(line) for line in open(data_path)]
-    corpus = [doc["text"] for doc in docs]
-    doc_ids = [doc["doc_id"] for doc in docs]
-
-    # Simple whitespace tokenizer
-    tokenized_corpus = [doc.split(" ") for doc in corpus]
-
+    docs = [json.loads(line) for line in open(data_path) if line.strip()]
+    # Index the same chunks as the FAISS build so both retrievers return chunk_ids.
+    chunks = chunk_documents(docs, **ingest_settings(cfg))
     print("Building BM25 index...")
-    bm25 = BM25Okapi(tokenized_corpus)
-
-    # Save the index and the doc_ids mapping
-    index_path = index_dir / "bm25_index.pkl"
-    with open(index_path, "wb") as f:
-        pickle.dump(bm25, f)
-
-    ids_path = index_dir / "bm25_doc_ids.pkl"
-    with open(ids_path, "wb") as f:
-        pickle.dump(doc_ids, f)
-
-    print(f"BM25 index with {len(doc_ids)} documents saved to {index_dir}")
+    stats = build_bm25(str(index_dir), chunks, cfg)
+    print(f"BM25 index with {stats['num_chunks']} chunks saved to {index_dir}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,203 @@
+"""Calibrate `reranker.adaptive` thresholds by replaying a query log.
+
+Every logged query is run through `src.pipeline.query_system` with the configured
+rerank stages: once in full (the reference), once without reranking (what
+`skip` returns) and once per `--shrink-top-n` size. The query embedding is
+computed once and reused across runs. Each policy on the threshold grid is then
+scored offline (`src.adaptive_rerank.evaluate_policy`) by its agreement with the
+full rerank's top `reranker_k` (quality kept) and the rerank time it avoids (CPU
+saved). The recommendation is the policy that saves the most while keeping mean
+agreement >= `--min-agreement`.
+
+    python scripts/calibrate_adaptive_rerank.py --queries queries.jsonl --out calib.json
+
+The query log is JSONL with a "query" (or "question") field, or plain text with
+one query per line.
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import yaml
+
+_root = Path(__file__).resolve().parents[1]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from src.adaptive_rerank import adaptive_settings, evaluate_policy  # noqa: E402
+
+OVERLAP_GRID = (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+MARGIN_QUANTILES = (0.5, 0.75, 0.9, 0.95)
+
+
+def load_queries(path: str, limit: int = 0) -> List[str]:
+    queries = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                line = record.get("query") or record.get("question") or ""
+            if line:
+                queries.append(line)
+    return queries[:limit] if limit else queries
+
+
+class _MemoEmbedder:
+    """Embeds each distinct text once, so replays do not repeat the embedding call."""
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self._cache: Dict[str, np.ndarray] = {}
+
+    def embed(self, texts):
+        missing = [t for t in texts if t not in self._cache]
+        if missing:
+            for text, vec in zip(missing, self.embedder.embed(missing)):
+                self._cache[text] = np.asarray(vec, dtype=np.float32)
+        return np.vstack([self._cache[t] for t in texts])
+
+
+def _ids(results) -> List[str]:
+    return [chunk["chunk_id"] for _score, chunk in results]
+
+
+def _agreement(results, reference: List[str]) -> float:
+    if not reference:
+        return 1.0
+    return len(set(_ids(results)) & set(reference)) / len(reference)
+
+
+def replay(pipeline, cfg: Dict[str, Any], queries: List[str], shrink_sizes: List[int]):
+    """One record per query in the format `evaluate_policy` expects."""
+    base = copy.deepcopy(cfg)
+    base["semantic_cache"] = {"enabled": False}
+    reranker_k = int(base["reranker"].get("reranker_k", 10))
+    # Adaptive on with every rule off: always "full", but the signals are recorded.
+    base["reranker"]["adaptive"] = {
+        **(base["reranker"].get("adaptive") or {}),
+        "enabled": True,
+        "skip_overlap": 0,
+        "skip_margin": 0,
+        "shrink_overlap": 0,
+    }
+    no_rerank = copy.deepcopy(base)
+    no_rerank["reranker"]["enabled"] = False
+    no_rerank.setdefault("retrieval", {})["top_k"] = reranker_k
+
+    records = []
+    for i, query in enumerate(queries):
+        stats: Dict[str, Any] = {}
+        reference = _ids(pipeline.query_system(query, base, stats=stats))
+        if "adaptive" not in stats:  # empty result set or a filtered-out query
+            continue
+        record = {
+            "query": query,
+            "overlap": stats["adaptive"]["overlap"],
+            "margin": stats["adaptive"]["margin"],
+            "full_ms": sum(s["ms"] for s in stats["rerank"]),
+            "skip": _agreement(pipeline.query_system(query, no_rerank), reference),
+            "shrink": {},
+        }
+        for size in shrink_sizes:
+            shrunk_cfg = copy.deepcopy(base)
+            shrunk_cfg["reranker"]["rerank_top_n"] = size
+            stats = {}
+            results = pipeline.query_system(query, shrunk_cfg, stats=stats)
+            record["shrink"][size] = {
+                "agreement": _agreement(results, reference),
+                "ms": sum(s["ms"] for s in stats["rerank"]),
+            }
+        records.append(record)
+        print(f"[{i + 1}/{len(queries)}] {query[:60]}", file=sys.stderr)
+    return records
+
+
+def policy_grid(records: List[Dict[str, Any]], shrink_sizes: List[int], overlap_k: int):
+    """Candidate `reranker.adaptive` settings; 0 disables a rule."""
+    margins = [rec["margin"] for rec in records]
+    margin_grid = sorted({round(float(np.quantile(margins, q)), 4) for q in MARGIN_QUANTILES})
+    for skip_overlap, skip_margin, shrink_overlap, top_n in itertools.product(
+        (0.0,) + OVERLAP_GRID, [0.0] + margin_grid, (0.0,) + OVERLAP_GRID, shrink_sizes
+    ):
+        if shrink_overlap and skip_overlap and shrink_overlap >= skip_overlap:
+            continue
+        if not shrink_overlap and top_n != shrink_sizes[0]:
+            continue  # shrink rule off: the size does not matter
+        yield {
+            "enabled": True,
+            "overlap_k": overlap_k,
+            "skip_overlap": skip_overlap,
+            "skip_margin": skip_margin,
+            "shrink_overlap": shrink_overlap,
+            "shrink_top_n": top_n,
+        }
+
+
+def calibrate(records, shrink_sizes: List[int], overlap_k: int, min_agreement: float):
+    results = [
+        {"settings": settings, **evaluate_policy(records, settings)}
+        for settings in policy_grid(records, shrink_sizes, overlap_k)
+    ]
+    # Pareto front: no other policy both agrees at least as well and saves more.
+    results.sort(key=lambda r: (-r["saved_fraction"], -r["mean_agreement"]))
+    front, best_agreement = [], -1.0
+    for result in results:
+        if result["mean_agreement"] > best_agreement:
+            front.append(result)
+            best_agreement = result["mean_agreement"]
+    eligible = [r for r in front if r["mean_agreement"] >= min_agreement]
+    return (eligible[0] if eligible else None), front
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--queries", required=True, help="Query log (JSONL or one per line).")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N queries.")
+    parser.add_argument("--shrink-top-n", type=int, nargs="+", default=[10, 20, 30, 50])
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    cfg = yaml.safe_load(open("config.yaml"))
+    if not (cfg.get("reranker", {}) or {}).get("enabled", False):
+        parser.error("reranker.enabled is false; nothing to calibrate")
+    import src.pipeline as pipeline
+
+    pipeline.voyage_client = _MemoEmbedder(pipeline.voyage_client)
+    queries = load_queries(args.queries, args.limit)
+    records = replay(pipeline, cfg, queries, args.shrink_top_n)
+    overlap_k = adaptive_settings(cfg)["overlap_k"]
+    recommended, front = calibrate(records, args.shrink_top_n, overlap_k, args.min_agreement)
+    report = {
+        "queries": len(records),
+        "reranker_k": int(cfg["reranker"].get("reranker_k", 10)),
+        "full_rerank_ms": round(sum(rec["full_ms"] for rec in records), 2),
+        "min_agreement": args.min_agreement,
+        "recommended": recommended,
+        "pareto_front": front,
+        "records": records,
+    }
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(payload + "\n")
+    else:
+        print(payload)
+    if recommended is not None:
+        print(
+            "reranker.adaptive:\n"
+            + yaml.safe_dump(recommended["settings"], sort_keys=False, indent=2),
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
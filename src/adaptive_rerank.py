@@ -0,0 +1,108 @@
+"""Per-query decision to skip, shrink or fully run the rerank stage.
+
+When dense and BM25 retrieval agree on their top results, or the fused ranking
+has a clear winner, reranking rarely changes the answer. Two signals are
+computed from the retrieval output, before any reranker runs:
+
+- overlap: |dense top-k ∩ sparse top-k| / k, with k = `overlap_k`;
+- margin: relative fused-score gap between ranks 1 and 2, (s1 - s2) / s1.
+
+`skip` returns the fused ranking as is; `shrink` reranks only the first
+`shrink_top_n` fused candidates; `full` runs the configured stages unchanged.
+Thresholds are calibrated offline on a query log with
+`scripts/calibrate_adaptive_rerank.py`.
+"""
+
+from typing import Any, Dict, List, Sequence, Union
+
+import numpy as np
+
+ACTIONS = ("full", "shrink", "skip")
+
+# Row ids / scores as lists or as the pipeline's numpy arrays.
+Rows = Union[Sequence[int], np.ndarray]
+Scores = Union[Sequence[float], np.ndarray]
+
+
+def adaptive_settings(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """`reranker.adaptive:` block with defaults; a threshold of 0 disables that rule."""
+    adaptive_cfg = (cfg.get("reranker", {}) or {}).get("adaptive", {}) or {}
+    return {
+        "enabled": bool(adaptive_cfg.get("enabled", False)),
+        "overlap_k": int(adaptive_cfg.get("overlap_k", 10)),
+        "skip_overlap": float(adaptive_cfg.get("skip_overlap", 0.0) or 0.0),
+        "skip_margin": float(adaptive_cfg.get("skip_margin", 0.0) or 0.0),
+        "shrink_overlap": float(adaptive_cfg.get("shrink_overlap", 0.0) or 0.0),
+        "shrink_top_n": int(adaptive_cfg.get("shrink_top_n", 20)),
+    }
+
+
+def top_overlap(dense_rows: Rows, sparse_rows: Rows, k: int) -> float:
+    if k <= 0:
+        return 0.0
+    return len(set(dense_rows[:k]) & set(sparse_rows[:k])) / k
+
+
+def score_margin(fused_scores: Scores) -> float:
+    if len(fused_scores) < 2 or fused_scores[0] <= 0:
+        return 0.0
+    return float((fused_scores[0] - fused_scores[1]) / fused_scores[0])
+
+
+def choose_action(overlap: float, margin: float, settings: Dict[str, Any]) -> str:
+    skip_overlap, skip_margin = settings["skip_overlap"], settings["skip_margin"]
+    if (skip_overlap and overlap >= skip_overlap) or (skip_margin and margin >= skip_margin):
+        return "skip"
+    if settings["shrink_overlap"] and overlap >= settings["shrink_overlap"]:
+        return "shrink"
+    return "full"
+
+
+def decide(
+    dense_rows: Rows,
+    sparse_rows: Rows,
+    fused_scores: Scores,
+    settings: Dict[str, Any],
+) -> Dict[str, Any]:
+    """{"action", "overlap", "margin"} plus "top_n" (candidates to rerank) for `shrink`."""
+    overlap = round(top_overlap(dense_rows, sparse_rows, settings["overlap_k"]), 4)
+    margin = round(score_margin(fused_scores), 4)
+    action = choose_action(overlap, margin, settings)
+    decision = {"action": action, "overlap": overlap, "margin": margin}
+    if action == "shrink":
+        decision["top_n"] = settings["shrink_top_n"]
+    return decision
+
+
+def evaluate_policy(records: List[Dict[str, Any]], settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Replay recorded queries under `settings`.
+
+    Each record holds the query's `overlap` and `margin`, the full rerank's
+    `full_ms`, the `agreement` (fraction of the full rerank's top results kept)
+    of the unreranked fused ranking under "skip", and per shrink size
+    {"agreement", "ms"} under "shrink". Returns mean/worst agreement with the
+    full rerank, rerank time spent and saved, and how often each action fires.
+    """
+    agreements, spent = [], 0.0
+    full_ms = sum(rec["full_ms"] for rec in records)
+    actions = dict.fromkeys(ACTIONS, 0)
+    for rec in records:
+        action = choose_action(rec["overlap"], rec["margin"], settings)
+        actions[action] += 1
+        if action == "skip":
+            agreements.append(rec["skip"])
+        elif action == "shrink":
+            shrunk = rec["shrink"][settings["shrink_top_n"]]
+            agreements.append(shrunk["agreement"])
+            spent += shrunk["ms"]
+        else:
+            agreements.append(1.0)
+            spent += rec["full_ms"]
+    n = max(len(records), 1)
+    return {
+        "mean_agreement": round(sum(agreements) / n, 4),
+        "min_agreement": round(min(agreements, default=1.0), 4),
+        "rerank_ms": round(spent, 2),
+        "saved_fraction": round(1 - spent / full_ms, 4) if full_ms else 0.0,
+        "actions": {action: round(count / n, 4) for action, count in actions.items()},
+    }
@@ -1,24 +1,132 @@
 import os
 import json
-from typing import List, Dict, Any
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 from openai import OpenAI
+from openai.types.chat import ChatCompletionChunk, ChatCompletionMessageParam
+
+from src.llm_cache import LLMCache, llm_cache_settings, request_key
+
+# Runs the original query's retrieval and the decomposition call side by side.
+_speculative_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-retrieval")
+
+
+def agentic_settings(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    agentic_cfg = cfg.get("agentic", {}) or {}
+    return {
+        "speculative_retrieval": bool(agentic_cfg.get("speculative_retrieval", True)),
+        "duplicate_jaccard": float(agentic_cfg.get("duplicate_jaccard", 0.8)),
+    }
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation folded, for cache keys only."""
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+
+def is_near_duplicate(candidate: str, query: str, threshold: float) -> bool:
+    """True if `candidate` normalizes to `query` or their word sets overlap by >= `threshold`
+    (Jaccard); 0 disables the word-overlap test."""
+    if normalize_query(candidate) == normalize_query(query):
+        return True
+    if not threshold:
+        return False
+    a = set(re.findall(r"\w+", candidate.lower()))
+    b = set(re.findall(r"\w+", query.lower()))
+    return bool(a | b) and len(a & b) / len(a | b) >= threshold
+
+
+def parse_sub_queries(content: Optional[str]) -> List[str]:
+    """Sub-queries from a decomposition reply; raises ValueError if it holds no JSON list."""
+    if not content:
+        return []
+    # The LLM often returns a JSON object with a key, like {"questions": [...]}.
+    # We need to find the list within that object.
+    data = json.loads(content)
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        # Find the first value in the JSON dict that is a list
+        for value in data.values():
+            if isinstance(value, list):
+                return value
+    raise ValueError("No list found in the JSON response.")
+
+
+def _parses_as_sub_queries(content: str) -> bool:
+    try:
+        parse_sub_queries(content)
+    except ValueError:
+        return False
+    return True
+
+
+def merge_contexts(
+    query: str, sub_queries: List[str], retrievals: Dict[str, List[Tuple[float, Dict[str, Any]]]]
+) -> List[Dict[str, Any]]:
+    """Unique contexts from `retrievals` (query -> results), original query first, then
+    sub-queries in order, so the synthesis prompt does not depend on completion order."""
+    all_contexts: Dict[str, Dict[str, Any]] = {}  # Use dict to handle duplicates
+    for q in dict.fromkeys([query, *sub_queries]):
+        for _, context_dict in retrievals.get(q, []):
+            all_contexts[context_dict.get("chunk_id", context_dict["doc_id"])] = context_dict
+    return list(all_contexts.values())
 
-from src.pipeline import query_system
 
 # --- Agent Components ---
 
 
 class AgenticRAG:
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], query_func=None, client=None):
         """
         Initializes the Agentic RAG system.
 
         Args:
             config: The application configuration dictionary.
+            query_func: Retrieval function (default: `src.pipeline.query_system`).
+            client: Chat completions client (default: `OpenAI()`).
         """
+        if query_func is None:
+            # Imported here: loading the pipeline loads the index.
+            from src.pipeline import query_system as query_func
         self.config = config
-        self.client = OpenAI()
+        self.query_func = query_func
+        self.settings = agentic_settings(config)
+        self.client = client or OpenAI()
         self.model = os.getenv("TRULENS_MODEL", "gpt-4o-mini")
+        self.llm_cache = LLMCache.from_config(config)
+        self.cache_synthesis = llm_cache_settings(config)["synthesis"]
+
+    def _complete(
+        self,
+        prompt: str,
+        cache: bool,
+        key_prompt: Optional[str] = None,
+        accept: Optional[Callable[[str], bool]] = None,
+        **params,
+    ):
+        """Chat completion text for one user prompt, through the LLM cache when `cache`.
+
+        With the cache, only replies that pass `accept` are stored.
+        """
+        messages: List[ChatCompletionMessageParam] = [{"role": "user", "content": prompt}]
+        if cache and self.llm_cache is not None:
+            key_messages: Optional[List[ChatCompletionMessageParam]] = None
+            if key_prompt:
+                key_messages = [{"role": "user", "content": key_prompt}]
+            return self.llm_cache.complete(
+                self.client,
+                self.model,
+                messages,
+                key_messages=key_messages,
+                accept=accept,
+                **params,
+            )
+        response = self.client.chat.completions.create(
+            model=self.model, messages=messages, **params
+        )
+        return response.choices[0].message.content
 
     def decompose_query(self, query: str) -> List[str]:
         """
@@ -30,7 +138,27 @@ class AgenticRAG:
         Returns:
             A list of sub-queries.
         """
-        prompt = f"""
+        prompt = self._decomposition_prompt(query)
+        content = self._complete(
+            prompt,
+            cache=True,
+            key_prompt=self._decomposition_prompt(normalize_query(query)),
+            # A bad reply would otherwise pin every variant of the question to the fallback.
+            accept=_parses_as_sub_queries,
+            temperature=0.0,
+            response_format={"type": "json_object"},
+        )
+
+        try:
+            return parse_sub_queries(content)
+        except ValueError as e:
+            print(f"Error parsing LLM response for query decomposition: {e}")
+            # Fallback to using the original query if decomposition fails
+            return [query]
+
+    @staticmethod
+    def _decomposition_prompt(query: str) -> str:
+        return f"""
         You are a helpful research assistant. A user has asked the following complex question:
         "{query}"
 
@@ -44,50 +172,12 @@ class AgenticRAG:
         JSON Sub-questions:
         """
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.0,
-            response_format={"type": "json_object"},
-        )
-
-        try:
-            # The response object holds the content in a string, which needs to be parsed.
-            content = response.choices[0].message.content
-            if content:
-                # The LLM often returns a JSON object with a key, like {"questions": [...]}.
-                # We need to find the list within that object.
-                data = json.loads(content)
-                # Find the first value in the JSON dict that is a list
-                for value in data.values():
-                    if isinstance(value, list):
-                        return value
-                # Fallback if the structure is unexpected but contains a list
-                raise ValueError("No list found in the JSON response.")
-            return []
-        except (json.JSONDecodeError, ValueError, KeyError) as e:
-            print(f"Error parsing LLM response for query decomposition: {e}")
-            # Fallback to using the original query if decomposition fails
-            return [query]
-
-    def synthesize_answer(
-        self, query: str, contexts: List[Dict[str, Any]], sub_queries: List[str]
-    ) -> str:
-        """
-        Synthesizes a final answer based on the original query and retrieved contexts.
-
-        Args:
-            query: The user's original query.
-            contexts: A list of context dictionaries, each with a 'text' key.
-            sub_queries: The list of sub-queries that were executed.
-
-        Returns:
-            The synthesized final answer as a string.
-        """
+    @staticmethod
+    def _synthesis_prompt(query: str, contexts: List[Dict[str, Any]], sub_queries: List[str]):
         context_str = "\n\n---\n\n".join([c["text"] for c in contexts])
         sub_queries_str = "\n- ".join(sub_queries)
 
-        prompt = f"""
+        return f"""
         You are an expert research assistant. Provide an answer using ONLY the provided context.
 
         Original Question: "{query}"
@@ -108,12 +198,82 @@ class AgenticRAG:
         Final Answer:
         """
 
-        resp = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1,
+    def synthesize_answer(
+        self, query: str, contexts: List[Dict[str, Any]], sub_queries: List[str]
+    ) -> str:
+        """
+        Synthesizes a final answer based on the original query and retrieved contexts.
+
+        Args:
+            query: The user's original query.
+            contexts: A list of context dictionaries, each with a 'text' key.
+            sub_queries: The list of sub-queries that were executed.
+
+        Returns:
+            The synthesized final answer as a string.
+        """
+        prompt = self._synthesis_prompt(query, contexts, sub_queries)
+        return self._complete(prompt, cache=self.cache_synthesis, temperature=0.1).strip()
+
+    def synthesize_answer_stream(
+        self, query: str, contexts: List[Dict[str, Any]], sub_queries: List[str]
+    ) -> Iterator[str]:
+        """
+        Same answer as `synthesize_answer`, yielded as text deltas while the model generates.
+
+        A cached answer (with `llm_cache.synthesis`) is yielded in one piece; a streamed
+        answer is stored under the same key as the non-streaming call.
+        """
+        prompt = self._synthesis_prompt(query, contexts, sub_queries)
+        messages: List[ChatCompletionMessageParam] = [{"role": "user", "content": prompt}]
+        key = None
+        if self.cache_synthesis and self.llm_cache is not None:
+            key = request_key(self.model, messages, temperature=0.1)
+            cached = self.llm_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        stream: Iterable[ChatCompletionChunk] = self.client.chat.completions.create(
+            model=self.model, messages=messages, temperature=0.1, stream=True
         )
-        return resp.choices[0].message.content.strip()
+        parts = []
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+        if key is not None and parts:
+            self.llm_cache.put(key, "".join(parts))
+
+    def retrieve(self, query: str) -> Iterator[Tuple[str, Any]]:
+        """
+        Decomposes `query` and retrieves for it and its sub-queries, yielding events as they
+        complete: ("sub_queries", list) once, and ("retrieval", {"query", "results"}) per
+        retrieval.
+
+        With `agentic.speculative_retrieval`, the original query is retrieved while the
+        decomposition call runs (its results usually arrive first), and sub-queries that
+        repeat it are not retrieved again.
+        """
+        if self.settings["speculative_retrieval"]:
+            speculative = _speculative_pool.submit(self.query_func, query, self.config)
+            decomposition = _speculative_pool.submit(self.decompose_query, query)
+            for future in as_completed([speculative, decomposition]):
+                if future is speculative:
+                    yield "retrieval", {"query": query, "results": future.result()}
+                else:
+                    sub_queries = future.result()
+                    yield "sub_queries", sub_queries
+            pending = [
+                q
+                for q in sub_queries
+                if not is_near_duplicate(q, query, self.settings["duplicate_jaccard"])
+            ]
+        else:
+            sub_queries = pending = self.decompose_query(query)
+            yield "sub_queries", sub_queries
+        for sub_q in dict.fromkeys(pending):
+            yield "retrieval", {"query": sub_q, "results": self.query_func(sub_q, self.config)}
 
     def run(self, query: str) -> Dict[str, Any]:
         """
@@ -126,18 +286,17 @@ class AgenticRAG:
             A dictionary containing the final answer and intermediate steps.
         """
         print(f"\nOriginal Query: {query}")
-        sub_queries = self.decompose_query(query)
-        print(f"Decomposed Sub-queries: {sub_queries}")
-
-        # Retrieve context for each sub-query and collect unique results
-        all_contexts: Dict[str, Dict[str, Any]] = {}  # Use dict to handle duplicates
-        for sub_q in sub_queries:
-            print(f"  > Retrieving for: '{sub_q}'")
-            retrieved = query_system(sub_q, self.config)
-            for _, context_dict in retrieved:
-                all_contexts[context_dict["doc_id"]] = context_dict
-
-        contexts_list = list(all_contexts.values())
+        sub_queries: List[str] = []
+        retrievals: Dict[str, List[Tuple[float, Dict[str, Any]]]] = {}
+        for event, data in self.retrieve(query):
+            if event == "sub_queries":
+                sub_queries = data
+                print(f"Decomposed Sub-queries: {sub_queries}")
+            else:
+                print(f"  > Retrieved for: '{data['query']}'")
+                retrievals[data["query"]] = data["results"]
+
+        contexts_list = merge_contexts(query, sub_queries, retrievals)
         print(f"Retrieved {len(contexts_list)} unique contexts.")
 
         final_answer = self.synthesize_answer(query, contexts_list, sub_queries)
@@ -0,0 +1,29 @@
+"""Crash-safe file writes shared by embedding checkpoints and index versions."""
+
+import os
+from typing import Any, Callable
+
+
+def fsync_dir(path: str) -> None:
+    """Persist directory entries (new or renamed files); a no-op where unsupported."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: str, write: Callable[[Any], None]) -> None:
+    """Write `path` through a synced temp file and rename, so readers never see it partial."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        write(fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(os.path.dirname(path))
@@ -0,0 +1,120 @@
+import logging
+import os
+from typing import Any, Dict, Tuple
+
+import faiss
+import numpy as np
+
+BINARY_INDEX_NAME = "voyage_binary.faiss"
+BINARY_TYPES = ("binary_flat", "binary_ivf")
+
+
+def binarize(vecs: np.ndarray) -> np.ndarray:
+    """Sign-quantize float vectors to packed bits (1 bit per dimension)."""
+    if vecs.shape[1] % 8:
+        raise ValueError(f"binary index needs a dimension divisible by 8, got {vecs.shape[1]}")
+    return np.packbits(vecs > 0, axis=1)
+
+
+def build_binary_index(index_dir: str, vecs: np.ndarray, index_cfg: Dict[str, Any]):
+    """Build and persist a Hamming index over the sign bits of `vecs`."""
+    logger = logging.getLogger(__name__)
+    os.makedirs(index_dir, exist_ok=True)
+    d = vecs.shape[1]
+    codes = binarize(vecs)
+    index_type = index_cfg.get("type", "binary_flat")
+    index: faiss.IndexBinary
+    if index_type == "binary_ivf":
+        nlist = int(index_cfg.get("nlist", 4096))
+        if len(codes) < nlist * 4:
+            print(
+                f"Warning: only {len(codes)} vectors available but binary IVF (nlist={nlist}) "
+                f"requires at least {nlist * 4} training points; falling back to binary flat index"
+            )
+            index = faiss.IndexBinaryFlat(d)
+        else:
+            index = faiss.IndexBinaryIVF(faiss.IndexBinaryFlat(d), d, nlist)
+            index.nprobe = int(index_cfg.get("nprobe", 16))
+            index.train(codes)
+    elif index_type == "binary_flat":
+        index = faiss.IndexBinaryFlat(d)
+    else:
+        raise ValueError(f"Unknown binary faiss.type: {index_type}")
+    index.add(codes)
+    index_path = os.path.join(index_dir, BINARY_INDEX_NAME)
+    faiss.write_index_binary(index, index_path)
+    logger.info(
+        "Binary FAISS index written to %s (type=%s, dim=%s, size=%s, %s bytes/vector)",
+        index_path,
+        index_type,
+        d,
+        len(codes),
+        codes.shape[1],
+    )
+    return index
+
+
+class BinaryRescoreIndex:
+    """Hamming first pass over sign bits, then exact cosine rescoring.
+
+    Float vectors are read from a memory-mapped `vectors.npy`, so only the rows
+    of the candidate pool are paged in. Exposes the `search`/`ntotal` subset of
+    the `faiss.Index` interface used by the pipeline.
+    """
+
+    def __init__(self, binary_index, vectors: np.ndarray, rescore_factor: int = 10):
+        self.binary_index = binary_index
+        self.vectors = vectors
+        self.rescore_factor = max(1, int(rescore_factor))
+
+    @property
+    def ntotal(self) -> int:
+        return int(self.binary_index.ntotal)
+
+    @property
+    def d(self) -> int:
+        return int(self.binary_index.d)
+
+    def rescore(
+        self, query: np.ndarray, candidates: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact cosine scores for `candidates` (row ids); returns the top `k`, padded with -1."""
+        out_d = np.full(k, -np.inf, dtype="float32")
+        out_i = np.full(k, -1, dtype="int64")
+        candidates = candidates[candidates >= 0]
+        if len(candidates) == 0:
+            return out_d, out_i
+        # Sorted row order turns the mmap gather into a forward scan.
+        candidates = np.sort(candidates)
+        cand_vecs = np.asarray(self.vectors[candidates], dtype="float32")
+        norms = np.linalg.norm(cand_vecs, axis=1)
+        norms[norms == 0] = 1.0
+        q = query / (np.linalg.norm(query) or 1.0)
+        scores = cand_vecs @ q / norms
+        n = min(k, len(scores))
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        out_d[:n] = scores[top]
+        out_i[:n] = candidates[top]
+        return out_d, out_i
+
+    def search(self, queries: np.ndarray, k: int, params=None) -> Tuple[np.ndarray, np.ndarray]:
+        """`params` (e.g. an ID selector) is applied to the Hamming pass."""
+        queries = np.asarray(queries, dtype="float32")
+        pool = min(self.ntotal, k * self.rescore_factor)
+        _, cand = self.binary_index.search(binarize(queries), max(pool, 1), params=params)
+        scores = np.empty((len(queries), k), dtype="float32")
+        ids = np.empty((len(queries), k), dtype="int64")
+        for row, query in enumerate(queries):
+            scores[row], ids[row] = self.rescore(query, cand[row], k)
+        return scores, ids
+
+
+def load_binary_index(index_dir: str, index_cfg: Dict[str, Any]) -> BinaryRescoreIndex:
+    binary_index = faiss.read_index_binary(os.path.join(index_dir, BINARY_INDEX_NAME))
+    if hasattr(binary_index, "nprobe"):
+        binary_index.nprobe = int(index_cfg.get("nprobe", binary_index.nprobe))
+    vectors = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r")
+    return BinaryRescoreIndex(
+        binary_index, vectors, rescore_factor=int(index_cfg.get("rescore_factor", 10))
+    )
@@ -0,0 +1,100 @@
+"""BM25 index over the same chunks as the dense index.
+
+Versioned builds write it into the `bm25/` subdirectory of the dense version, so
+one `CURRENT` pointer publishes a matching (FAISS, BM25) pair. A BM25-only rebuild
+starts a new version that links the current dense files and re-indexes their chunks.
+"""
+
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+from typing import Any, Dict, List
+
+from rank_bm25 import BM25Okapi
+
+from src.chunking import chunk_search_text
+from src.index_versions import (
+    BM25_DIR,
+    MANIFEST_NAME,
+    abort_build,
+    begin_build,
+    finish_build,
+    read_current,
+    read_manifest,
+    version_dir,
+)
+from src.parallel import ingest_settings, parallel_map
+from src.tokenizer import Tokenizer, Vocabulary
+
+
+def build_bm25(out_dir: str, chunks: List[Dict[str, Any]], cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Index `chunks` into `out_dir`; returns the manifest entry describing the index."""
+    os.makedirs(out_dir, exist_ok=True)
+    ingest = ingest_settings(cfg)
+    corpus = [chunk_search_text(c) for c in chunks]
+    chunk_ids = [c["chunk_id"] for c in chunks]
+
+    tokenizer = Tokenizer.from_config(cfg)
+    t0 = time.perf_counter()
+    tokenized_corpus = parallel_map(
+        tokenizer.tokenize, corpus, workers=ingest["workers"], batch_size=ingest["batch_size"]
+    )
+    # Intern tokens as ints: smaller pickles and faster hashing in the BM25 term dicts.
+    vocab = Vocabulary.build(tokenized_corpus)
+    encoded_corpus = [vocab.encode(tokens) for tokens in tokenized_corpus]
+    logging.getLogger(__name__).info(
+        "Tokenized %s chunks in %.1f ms (workers=%s, %s); vocabulary: %s terms",
+        len(corpus),
+        (time.perf_counter() - t0) * 1000,
+        ingest["workers"],
+        tokenizer.settings(),
+        len(vocab),
+    )
+    bm25 = BM25Okapi(encoded_corpus)
+
+    # Save the index, the chunk_ids mapping and the vocabulary (with tokenizer settings)
+    with open(os.path.join(out_dir, "bm25_index.pkl"), "wb") as fh:
+        pickle.dump(bm25, fh)
+    with open(os.path.join(out_dir, "bm25_chunk_ids.pkl"), "wb") as fh:
+        pickle.dump(chunk_ids, fh)
+    vocab.save(out_dir, tokenizer)
+    return {
+        "num_chunks": len(chunk_ids),
+        "vocab_size": len(vocab),
+        "tokenizer": tokenizer.settings(),
+    }
+
+
+def read_meta(index_dir: str) -> List[Dict[str, Any]]:
+    with open(os.path.join(index_dir, "meta.jsonl"), "r") as fh:
+        return [json.loads(line) for line in fh]
+
+
+def rebuild_bm25_version(index_root: str, cfg: Dict[str, Any]) -> str:
+    """Publish a new version with the current dense files and a fresh BM25 over their chunks."""
+    current = read_current(index_root)
+    if current is None:
+        raise FileNotFoundError(f"No published index version under {index_root}; build it first")
+    source_dir = version_dir(index_root, current)
+    manifest = read_manifest(source_dir)
+    out_dir, version = begin_build(index_root, cfg)
+    try:
+        for name in os.listdir(source_dir):
+            path = os.path.join(source_dir, name)
+            if name != MANIFEST_NAME and os.path.isfile(path):
+                try:
+                    os.link(path, os.path.join(out_dir, name))
+                except OSError:
+                    shutil.copy2(path, os.path.join(out_dir, name))
+        stats = build_bm25(os.path.join(out_dir, BM25_DIR), read_meta(source_dir), cfg)
+    except BaseException:
+        abort_build(index_root, version)
+        raise
+    for key in ("version", "created_at", "files"):
+        manifest.pop(key, None)
+    return finish_build(
+        index_root, version, cfg, {**manifest, "bm25": stats, "dense_version": current}
+    )
@@ -0,0 +1,214 @@
+"""Top-k BM25 with block-max dynamic pruning over an inverted index.
+
+`BM25Okapi.get_scores` scores every document for every query term. This engine
+inverts the same fitted `BM25Okapi` into per-term postings (doc positions and
+precomputed BM25 term impacts) with a max impact per term and per block of 128
+postings, and only scores documents that can still enter the top-k:
+
+- Terms are visited from the shortest postings list to the longest. After each
+  term, `theta` is the k-th best exact score seen so far.
+- Once the summed upper bounds of the unvisited terms fall below `theta`, no
+  document containing only those terms can enter the top-k, so traversal stops
+  (the MaxScore / WAND pivot argument).
+- Before scoring a term's new documents, each gets a bound from the block maxima
+  of every query term (as in Block-Max WAND); documents whose bound is below
+  `theta` are skipped.
+
+Each step is a handful of NumPy passes (searchsorted over postings) rather than a
+per-posting Python loop.
+
+Scores are bit-identical to `get_scores`: impacts use the same float expression,
+and each document's impacts are summed in query-token order, as `get_scores`
+does. Ties are broken by lower document position.
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+BLOCK_SIZE = 128
+# Bounds are summed in a different order than scores; the slack keeps a bound from
+# rounding below the score it is supposed to cap.
+_BOUND_SLACK = 1.0 + 1e-9
+
+
+class BM25WandIndex:
+    def __init__(
+        self,
+        term_ids: Dict[str, int],
+        offsets: np.ndarray,
+        docs: np.ndarray,
+        impacts: np.ndarray,
+        block_offsets: np.ndarray,
+        block_last: np.ndarray,
+        block_max: np.ndarray,
+        corpus_size: int,
+    ):
+        self.term_ids = term_ids
+        self.offsets = offsets
+        self.docs = docs
+        self.impacts = impacts
+        self.block_offsets = block_offsets
+        self.block_last = block_last
+        self.block_max = block_max
+        self.corpus_size = corpus_size
+
+    @classmethod
+    def from_bm25(cls, bm25, block_size: int = BLOCK_SIZE) -> "BM25WandIndex":
+        """Invert a fitted `rank_bm25.BM25Okapi` (its `doc_freqs`, `idf` and length stats)."""
+        logger = logging.getLogger(__name__)
+        t0 = time.perf_counter()
+        term_ids: Dict[str, int] = {}
+        tids: List[int] = []
+        tfs: List[int] = []
+        doc_counts = np.empty(len(bm25.doc_freqs), dtype=np.int64)
+        for doc, freqs in enumerate(bm25.doc_freqs):
+            doc_counts[doc] = len(freqs)
+            for term, tf in freqs.items():
+                tids.append(term_ids.setdefault(term, len(term_ids)))
+                tfs.append(tf)
+        tid_arr = np.asarray(tids, dtype=np.int64)
+        doc_arr = np.repeat(np.arange(len(doc_counts), dtype=np.int64), doc_counts)
+        order = np.lexsort((doc_arr, tid_arr))
+        tid_arr, doc_arr = tid_arr[order], doc_arr[order]
+        tf = np.asarray(tfs, dtype=np.int64)[order]
+
+        idf = np.zeros(len(term_ids), dtype=np.float64)
+        for term, tid in term_ids.items():
+            idf[tid] = bm25.idf.get(term) or 0
+        doc_len = np.array(bm25.doc_len)
+        k1, b, avgdl = bm25.k1, bm25.b, bm25.avgdl
+        # Same expression (and evaluation order) as BM25Okapi.get_scores.
+        impacts = idf[tid_arr] * (
+            tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len[doc_arr] / avgdl))
+        )
+
+        lengths = np.bincount(tid_arr, minlength=len(term_ids))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        blocks_per_term = (lengths + block_size - 1) // block_size
+        block_offsets = np.concatenate([[0], np.cumsum(blocks_per_term)])
+        block_rank = np.arange(block_offsets[-1]) - np.repeat(block_offsets[:-1], blocks_per_term)
+        block_starts = np.repeat(offsets[:-1], blocks_per_term) + block_rank * block_size
+        block_ends = np.minimum(block_starts + block_size, np.repeat(offsets[1:], blocks_per_term))
+        block_max = np.maximum(np.maximum.reduceat(impacts, block_starts), 0.0)
+        logger.info(
+            "Built BM25 postings for %s terms over %s docs in %.1f ms",
+            len(term_ids),
+            bm25.corpus_size,
+            (time.perf_counter() - t0) * 1000,
+        )
+        return cls(
+            term_ids,
+            offsets,
+            doc_arr.astype(np.int32),
+            impacts,
+            block_offsets,
+            doc_arr[block_ends - 1].astype(np.int32),
+            block_max,
+            bm25.corpus_size,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (
+            self.offsets,
+            self.docs,
+            self.impacts,
+            self.block_offsets,
+            self.block_last,
+            self.block_max,
+        )
+        return int(sum(a.nbytes for a in arrays))
+
+    def _postings(self, tid: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.offsets[tid], self.offsets[tid + 1]
+        return self.docs[start:end], self.impacts[start:end]
+
+    def _blocks(self, tid: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.block_offsets[tid], self.block_offsets[tid + 1]
+        return self.block_last[start:end], self.block_max[start:end]
+
+    def _lookup(self, tid: int, cand: np.ndarray) -> np.ndarray:
+        """Impact of term `tid` for each (sorted) candidate doc, 0.0 where absent."""
+        docs, impacts = self._postings(tid)
+        pos = np.minimum(np.searchsorted(docs, cand), len(docs) - 1)
+        return np.where(docs[pos] == cand, impacts[pos], 0.0)
+
+    def _score(self, query_tids: List[int], cand: np.ndarray) -> np.ndarray:
+        score = np.zeros(len(cand))
+        for tid in query_tids:
+            score += self._lookup(tid, cand)
+        return score
+
+    def _block_bound(self, weights: Dict[int, int], cand: np.ndarray) -> np.ndarray:
+        """Per-candidate upper bound from the block maxima of every query term."""
+        bound = np.zeros(len(cand))
+        for t, weight in weights.items():
+            block_last, block_max = self._blocks(t)
+            blk = np.searchsorted(block_last, cand)
+            inside = blk < len(block_last)
+            bound += np.where(inside, block_max[np.minimum(blk, len(block_max) - 1)], 0.0) * weight
+        return bound
+
+    def search(
+        self,
+        query: Sequence[str],
+        top_k: int,
+        mask: Optional[np.ndarray] = None,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-`top_k` (positions, scores) with score > 0, best first.
+
+        `mask` (bool per position) restricts the result to set positions. If
+        `stats` is given it receives the number of documents whose exact score was
+        computed.
+        """
+        stats = stats if stats is not None else {}
+        stats["scored_docs"] = 0
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        query_tids = [self.term_ids[t] for t in query if t in self.term_ids]
+        if top_k <= 0 or not query_tids:
+            return empty
+        weights: Dict[int, int] = {}
+        for tid in query_tids:
+            weights[tid] = weights.get(tid, 0) + 1
+        # Rare (short, high-idf) terms first: they raise theta fastest for the least work.
+        terms = sorted(weights, key=lambda t: self.offsets[t + 1] - self.offsets[t])
+        ub = [weights[t] * self._blocks(t)[1].max() * _BOUND_SLACK for t in terms]
+
+        seen = np.zeros(self.corpus_size, dtype=bool)
+        if mask is not None:
+            seen |= ~mask
+        cand_parts: List[np.ndarray] = []
+        score_parts: List[np.ndarray] = []
+        theta = 0.0
+        for i, t in enumerate(terms):
+            if sum(ub[i:]) < theta:
+                # Documents containing only unvisited terms cannot reach theta.
+                break
+            docs = self._postings(t)[0]
+            docs = docs[~seen[docs]]
+            seen[docs] = True
+            if theta > 0 and len(docs):
+                docs = docs[self._block_bound(weights, docs) * _BOUND_SLACK >= theta]
+            scores = self._score(query_tids, docs)
+            stats["scored_docs"] += len(docs)
+            cand_parts.append(docs)
+            score_parts.append(scores)
+            pool = np.concatenate(score_parts)
+            if len(pool) >= top_k:
+                theta = float(np.partition(pool, len(pool) - top_k)[-top_k])
+
+        cand = np.concatenate(cand_parts) if cand_parts else np.empty(0, dtype=np.int32)
+        scores = np.concatenate(score_parts) if score_parts else np.empty(0)
+        keep = scores > 0
+        cand, scores = cand[keep], scores[keep]
+        n = min(top_k, len(scores))
+        if n == 0:
+            return empty
+        kth = scores[np.argpartition(-scores, n - 1)[:n]].min()
+        top = np.flatnonzero(scores >= kth)
+        top = top[np.lexsort((cand[top], -scores[top]))][:n]
+        return cand[top].astype(np.int64), scores[top]
@@ -1,12 +1,20 @@
 import re
+from functools import partial
 from typing import List, Dict, Any
 
+from src.parallel import parallel_map
+
 
 def simple_sentence_split(text: str) -> List[str]:
     parts = re.split(r"(?<=[.!?])\s+", text.strip())
     return [p for p in parts if p]
 
 
+def chunk_search_text(chunk: Dict[str, Any]) -> str:
+    """Text a chunk is embedded, BM25-indexed and reranked by (title as context)."""
+    return f"{chunk['title']}\n{chunk['text']}".strip()
+
+
 def make_chunks_with_context(
     doc: Dict[str, Any], max_sentences: int = 3, overlap: int = 1
 ) -> List[Dict[str, Any]]:
@@ -31,3 +39,20 @@ def make_chunks_with_context(
             break
         i += max_sentences - overlap
     return chunks
+
+
+def chunk_documents(
+    docs: List[Dict[str, Any]],
+    max_sentences: int = 3,
+    overlap: int = 1,
+    workers: int = 1,
+    batch_size: int = 64,
+) -> List[Dict[str, Any]]:
+    """Chunk many docs, optionally across a process pool.
+
+    Output order (doc order, then chunk order) and chunk_ids are identical to
+    chunking the docs one by one, regardless of `workers`.
+    """
+    chunker = partial(make_chunks_with_context, max_sentences=max_sentences, overlap=overlap)
+    per_doc = parallel_map(chunker, docs, workers=workers, batch_size=batch_size)
+    return [chunk for doc_chunks in per_doc for chunk in doc_chunks]
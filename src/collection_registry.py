@@ -0,0 +1,195 @@
+"""Named collections (one index/BM25 pair per tenant) served from one process.
+
+Collections are declared under `collections.items`; each entry overrides
+top-level config keys (`index_dir`, `bm25_index_path`, `data_path`, `faiss`, ...)
+and defaults its directories to `<collections.root>/<name>/index` and
+`.../index_bm25`. The top-level pair is always available as `default`.
+
+Collections load on first use. When the resident size of all loaded collections
+exceeds `collections.memory_budget_mb`, the least recently used ones are unloaded
+(FAISS index, BM25 and metadata) until the rest fits; the collection being
+served is never evicted, and `default` is pinned. Collections share the
+top-level embedding model, so they may not override `embedding`.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.index_manager import IndexManager, IndexState
+from src.index_versions import versioning_settings
+
+DEFAULT_COLLECTION = "default"
+
+
+def collection_settings(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    coll_cfg = cfg.get("collections", {}) or {}
+    return {
+        "root": coll_cfg.get("root", "./collections"),
+        "memory_budget_mb": float(coll_cfg.get("memory_budget_mb", 0) or 0),
+        "items": coll_cfg.get("items", {}) or {},
+    }
+
+
+def collection_config(cfg: Dict[str, Any], name: Optional[str]) -> Dict[str, Any]:
+    """Effective config for collection `name` (the top-level config for `default`/None).
+
+    Raises KeyError for collections that are not configured, and ValueError for
+    an `embedding` override: queries are embedded once, with the top-level model.
+    """
+    if name in (None, "", DEFAULT_COLLECTION):
+        return cfg
+    settings = collection_settings(cfg)
+    if name not in settings["items"]:
+        raise KeyError(f"Unknown collection: {name}")
+    if "embedding" in (settings["items"][name] or {}):
+        raise ValueError(
+            f"Collection {name!r} overrides 'embedding'; all collections share the "
+            "top-level embedding model"
+        )
+    base = os.path.join(settings["root"], name)
+    return {
+        **cfg,
+        "index_dir": os.path.join(base, "index"),
+        "bm25_index_path": os.path.join(base, "index_bm25"),
+        **(settings["items"][name] or {}),
+    }
+
+
+class CollectionRegistry:
+    def __init__(self, cfg: Dict[str, Any], default: Optional[IndexManager] = None):
+        settings = collection_settings(cfg)
+        self.cfg = cfg
+        self.budget_bytes = int(settings["memory_budget_mb"] * 1024 * 1024)
+        self._managers: Dict[str, IndexManager] = {DEFAULT_COLLECTION: default or IndexManager(cfg)}
+        for name in settings["items"]:
+            self._managers[name] = IndexManager(collection_config(cfg, name))
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        self._metrics: Dict[str, Dict[str, Any]] = {
+            name: {"loads": 0, "evictions": 0, "requests": 0, "last_used": None}
+            for name in self._managers
+        }
+        if self._managers[DEFAULT_COLLECTION].loaded() is not None:
+            self._lru[DEFAULT_COLLECTION] = None
+            self._metrics[DEFAULT_COLLECTION]["loads"] = 1
+        self._lock = threading.Lock()
+        # Chosen for eviction and being unloaded outside the lock.
+        self._evicting: Set[str] = set()
+        self._watch = versioning_settings(cfg)["watch_seconds"] > 0
+        self._watching = False
+
+    def names(self) -> List[str]:
+        return list(self._managers)
+
+    def config(self, name: str) -> Dict[str, Any]:
+        return self._manager(name).cfg
+
+    def _manager(self, name: str) -> IndexManager:
+        try:
+            return self._managers[name]
+        except KeyError:
+            raise KeyError(f"Unknown collection: {name}") from None
+
+    def start_watchers(self) -> None:
+        """Hot-reload loaded collections; collections loaded later start watching on load."""
+        self._watching = self._watch
+        if self._watching:
+            for name in list(self._lru):
+                self._managers[name].start_watcher()
+
+    def get(self, name: str = DEFAULT_COLLECTION) -> IndexState:
+        """Loaded state for `name`, loading it (and evicting cold collections) if needed.
+
+        Victims are chosen under the lock but unloaded after releasing it, since
+        unloading joins the collection's watcher (which may be mid-reload).
+        """
+        manager = self._manager(name)
+        state = manager.current()
+        with self._lock:
+            metrics = self._metrics[name]
+            metrics["requests"] += 1
+            metrics["last_used"] = time.time()
+            if manager.loaded() is None or name in self._evicting:
+                # Evicted by a concurrent request since `current()`; this request keeps
+                # its reference and the next one reloads.
+                return state
+            if name not in self._lru:
+                metrics["loads"] += 1
+                if self._watching:
+                    manager.start_watcher()
+            self._lru[name] = None
+            self._lru.move_to_end(name)
+            victims = self._pick_victims(keep=name)
+        self._unload(victims)
+        return state
+
+    def _resident_bytes(self) -> int:
+        total = 0
+        for name in self._lru:
+            state = self._managers[name].loaded()
+            total += state.resident_bytes if state is not None else 0
+        return total
+
+    def _pick_victims(self, keep: str) -> List[Tuple[str, int]]:
+        """Least recently used collections to drop (with their sizes); call under the lock."""
+        if self.budget_bytes <= 0:
+            return []
+        victims = []
+        for name in list(self._lru):
+            if self._resident_bytes() <= self.budget_bytes:
+                break
+            if name in (keep, DEFAULT_COLLECTION):
+                continue
+            state = self._managers[name].loaded()
+            victims.append((name, state.resident_bytes if state is not None else 0))
+            del self._lru[name]
+            self._evicting.add(name)
+            self._metrics[name]["evictions"] += 1
+        if self._resident_bytes() > self.budget_bytes:
+            logging.getLogger(__name__).warning(
+                "Collections %s exceed the %.0f MB budget on their own",
+                list(self._lru),
+                self.budget_bytes / 2**20,
+            )
+        return victims
+
+    def _unload(self, victims: List[Tuple[str, int]]) -> None:
+        for name, resident_bytes in victims:
+            self._managers[name].unload()
+            with self._lock:
+                self._evicting.discard(name)
+            logging.getLogger(__name__).info(
+                "Evicted collection %s (%.1f MB) to stay under the %.0f MB budget",
+                name,
+                resident_bytes / 2**20,
+                self.budget_bytes / 2**20,
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-collection load/resident-size metrics plus the budget totals."""
+        collections = {}
+        with self._lock:
+            for name, manager in self._managers.items():
+                state = manager.loaded()
+                collections[name] = {
+                    "loaded": state is not None,
+                    "load_ms": state.load_ms if state is not None else None,
+                    "loaded_at": state.loaded_at if state is not None else None,
+                    "chunks": len(state.meta) if state is not None else 0,
+                    "resident_bytes": state.resident_bytes if state is not None else 0,
+                    "version": state.version if state is not None else None,
+                    "semantic_cache": (
+                        state.semantic_cache.metrics()
+                        if state is not None and state.semantic_cache is not None
+                        else None
+                    ),
+                    **self._metrics[name],
+                }
+            return {
+                "budget_bytes": self.budget_bytes,
+                "resident_bytes": sum(c["resident_bytes"] for c in collections.values()),
+                "collections": collections,
+            }
@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+REDUCER_META_NAME = "reducer.json"
+REDUCER_PCA_NAME = "reducer_pca.faiss"
+REDUCTION_METHODS = ("pca", "truncate")
+
+
+class DimReducer:
+    """Maps embeddings to a lower dimension, identically at build and query time.
+
+    `pca` applies a trained `faiss.PCAMatrix`; `truncate` keeps the leading
+    dimensions (for Matryoshka-trained models). Both re-normalize to unit length,
+    so inner-product indexes rank reduced vectors by cosine similarity.
+    """
+
+    def __init__(self, method: str, in_dim: int, out_dim: int, pca=None):
+        if method not in REDUCTION_METHODS:
+            raise ValueError(f"Unknown reduction method: {method}")
+        if out_dim > in_dim:
+            raise ValueError(f"Cannot reduce {in_dim}-dim vectors to {out_dim} dims")
+        self.method = method
+        self.in_dim = in_dim
+        self.out_dim = out_dim
+        self.pca = pca
+
+    @classmethod
+    def train(cls, method: str, vecs: np.ndarray, out_dim: int, max_samples: int = 100000):
+        in_dim = int(vecs.shape[1])
+        pca = None
+        if method == "pca":
+            picks = np.random.choice(len(vecs), min(max_samples, len(vecs)), replace=False)
+            sample = np.ascontiguousarray(vecs[np.sort(picks)], dtype="float32")
+            pca = faiss.PCAMatrix(in_dim, out_dim)
+            pca.train(sample)
+        return cls(method, in_dim, out_dim, pca)
+
+    def apply(self, vecs: np.ndarray) -> np.ndarray:
+        vecs = np.ascontiguousarray(vecs, dtype="float32")
+        if vecs.shape[1] != self.in_dim:
+            raise ValueError(f"Reducer expects {self.in_dim}-dim vectors, got {vecs.shape[1]}")
+        if self.method == "pca":
+            out = np.ascontiguousarray(self.pca.apply(vecs), dtype="float32")
+        else:
+            out = np.ascontiguousarray(vecs[:, : self.out_dim])
+        faiss.normalize_L2(out)
+        return out
+
+    def save(self, index_dir: str) -> None:
+        meta = {"method": self.method, "in_dim": self.in_dim, "out_dim": self.out_dim}
+        with open(os.path.join(index_dir, REDUCER_META_NAME), "w") as fh:
+            json.dump(meta, fh)
+        if self.pca is not None:
+            faiss.write_VectorTransform(self.pca, os.path.join(index_dir, REDUCER_PCA_NAME))
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["DimReducer"]:
+        """Load the reducer persisted with an index, or None if vectors are stored unreduced."""
+        meta_path = os.path.join(index_dir, REDUCER_META_NAME)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r") as fh:
+            meta = json.load(fh)
+        pca = None
+        if meta["method"] == "pca":
+            pca = faiss.read_VectorTransform(os.path.join(index_dir, REDUCER_PCA_NAME))
+        return cls(meta["method"], int(meta["in_dim"]), int(meta["out_dim"]), pca)
+
+
+def remove_reducer(index_dir: str) -> None:
+    """Drop a reducer left behind by a previous build into the same directory."""
+    for name in (REDUCER_META_NAME, REDUCER_PCA_NAME):
+        path = os.path.join(index_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def train_reducer(vecs: np.ndarray, cfg: Dict[str, Any]) -> Optional[DimReducer]:
+    """Train the reducer configured under `embedding.reduction`, if any."""
+    logger = logging.getLogger(__name__)
+    emb_cfg = cfg.get("embedding", {}) or {}
+    expected_dim = emb_cfg.get("dim")
+    if expected_dim and int(expected_dim) != vecs.shape[1]:
+        logger.warning(
+            "embedding.dim is %s but the model returned %s-dim vectors", expected_dim, vecs.shape[1]
+        )
+    red_cfg = emb_cfg.get("reduction", {}) or {}
+    method = red_cfg.get("method", "none")
+    if method in (None, "none"):
+        return None
+    out_dim = int(red_cfg["dim"])
+    if out_dim >= vecs.shape[1]:
+        logger.warning("reduction.dim %s >= vector dim %s; skipping", out_dim, vecs.shape[1])
+        return None
+    reducer = DimReducer.train(method, vecs, out_dim)
+    logger.info("Trained %s reducer: %s -> %s dims", method, vecs.shape[1], out_dim)
+    return reducer
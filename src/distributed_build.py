@@ -0,0 +1,351 @@
+"""Coordinator/worker FAISS build.
+
+The corpus file is split into contiguous byte ranges (shards). Every phase reads
+and writes only files under a shared work directory, so phases can run in
+separate processes on one machine or as separate tasks on a Databricks cluster:
+
+    plan   (coordinator)  split the data file into shard byte ranges
+    embed  (worker i)     chunk + embed shard i (checkpointed) -> vectors.npy, meta.jsonl
+    train  (coordinator)  train one quantizer on a sample drawn from all shards
+    add    (worker i)     add shard i's vectors into a copy of the trained index
+    merge  (coordinator)  merge_from() the shard indexes, concatenate metadata, build BM25
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from multiprocessing import Pool
+from typing import Any, Dict, List, Tuple
+
+import faiss
+import numpy as np
+
+from src.binary_index import BINARY_TYPES, build_binary_index
+from src.bm25_build import build_bm25, read_meta
+from src.chunking import chunk_documents
+from src.dim_reduction import DimReducer, remove_reducer, train_reducer
+from src.embedding_providers import embedding_model_id
+from src.index_versions import BM25_DIR, abort_build, begin_build, finish_build
+from src.index_build import (
+    data_path_from_config,
+    embed_chunks,
+    make_embedder,
+    resolve_path,
+    sample_training_vectors,
+    train_faiss,
+    write_meta,
+)
+from src.parallel import ingest_settings
+
+PLAN_NAME = "plan.json"
+TRAIN_NAME = "train.json"
+TRAINED_INDEX_NAME = "trained.faiss"
+FINGERPRINT_NAME = "fingerprint.json"
+
+
+def distributed_settings(cfg: Dict[str, Any], project_root: str) -> Dict[str, Any]:
+    dist_cfg = cfg.get("distributed", {}) or {}
+    index_dir = resolve_path(project_root, cfg.get("index_dir", "index"))
+    work_dir = dist_cfg.get("work_dir") or os.path.join(index_dir, ".build_work")
+    return {
+        "num_shards": int(dist_cfg.get("num_shards", 4)),
+        "work_dir": resolve_path(project_root, work_dir),
+        "index_dir": index_dir,
+        "keep_work_dir": bool(dist_cfg.get("keep_work_dir", False)),
+    }
+
+
+def shard_dir(work_dir: str, shard: int) -> str:
+    return os.path.join(work_dir, f"shard_{shard:05d}")
+
+
+def _write_json(path: str, obj: Any) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(obj, fh, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Any:
+    with open(path, "r") as fh:
+        return json.load(fh)
+
+
+def split_byte_ranges(path: str, num_shards: int) -> List[Tuple[int, int]]:
+    """Split a JSONL file into `num_shards` contiguous, line-aligned byte ranges."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as fh:
+        for i in range(1, num_shards):
+            target = max(size * i // num_shards, bounds[-1])
+            fh.seek(target)
+            if target > 0:
+                fh.readline()  # advance to the start of the next line
+            bounds.append(min(max(fh.tell(), bounds[-1]), size))
+    bounds.append(size)
+    return [(bounds[i], bounds[i + 1]) for i in range(num_shards)]
+
+
+def read_docs_range(path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    docs = []
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while fh.tell() < end:
+            line = fh.readline()
+            if not line:
+                break
+            line = line.strip()
+            if line:
+                docs.append(json.loads(line))
+    return docs
+
+
+def run_plan(cfg: Dict[str, Any], project_root: str, num_shards: int = 0) -> Dict[str, Any]:
+    settings = distributed_settings(cfg, project_root)
+    num_shards = num_shards or settings["num_shards"]
+    data_path = data_path_from_config(cfg, project_root)
+    os.makedirs(settings["work_dir"], exist_ok=True)
+    stat = os.stat(data_path)
+    plan = {
+        "data_path": data_path,
+        # Identifies the corpus version, so shards embedded from an older file are redone.
+        "data_size": stat.st_size,
+        "data_mtime_ns": stat.st_mtime_ns,
+        "shards": [
+            {"shard": i, "byte_start": start, "byte_end": end}
+            for i, (start, end) in enumerate(split_byte_ranges(data_path, num_shards))
+        ],
+    }
+    _write_json(os.path.join(settings["work_dir"], PLAN_NAME), plan)
+    logging.getLogger(__name__).info("Planned %s shards in %s", num_shards, settings["work_dir"])
+    return plan
+
+
+def shard_fingerprint(cfg: Dict[str, Any], plan: Dict[str, Any], shard: int) -> Dict[str, Any]:
+    """What a shard's vectors depend on: the plan (corpus file and version), the shard's
+    byte range, the chunking settings and the embedding model."""
+    spec = plan["shards"][shard]
+    ingest = ingest_settings(cfg)
+    plan_json = json.dumps(plan, sort_keys=True).encode("utf-8")
+    return {
+        "plan_sha256": hashlib.sha256(plan_json).hexdigest(),
+        "byte_start": spec["byte_start"],
+        "byte_end": spec["byte_end"],
+        "max_sentences": ingest["max_sentences"],
+        "overlap": ingest["overlap"],
+        "embedding_model": embedding_model_id(cfg),
+    }
+
+
+def run_embed_shard(cfg: Dict[str, Any], project_root: str, shard: int) -> int:
+    """Chunk and embed one shard; idempotent once the shard's vectors exist.
+
+    Output (or a checkpoint) left by a run with a different fingerprint, e.g. an
+    older corpus or another embedding model, is discarded and the shard redone.
+    """
+    logger = logging.getLogger(__name__)
+    settings = distributed_settings(cfg, project_root)
+    plan = _read_json(os.path.join(settings["work_dir"], PLAN_NAME))
+    spec = plan["shards"][shard]
+    out_dir = shard_dir(settings["work_dir"], shard)
+    vectors_path = os.path.join(out_dir, "vectors.npy")
+    fingerprint_path = os.path.join(out_dir, FINGERPRINT_NAME)
+    fingerprint = shard_fingerprint(cfg, plan, shard)
+    if os.path.exists(out_dir):
+        stored = _read_json(fingerprint_path) if os.path.exists(fingerprint_path) else None
+        if stored != fingerprint:
+            logger.info("Shard %s output is from a different build; re-embedding", shard)
+            shutil.rmtree(out_dir)
+        elif os.path.exists(vectors_path):
+            logger.info("Shard %s already embedded; skipping", shard)
+            return int(np.load(vectors_path, mmap_mode="r").shape[0])
+    os.makedirs(out_dir, exist_ok=True)
+    # Written first, so a resumed run can trust the checkpoint it finds.
+    _write_json(fingerprint_path, fingerprint)
+
+    docs = read_docs_range(plan["data_path"], spec["byte_start"], spec["byte_end"])
+    ingest = ingest_settings(cfg)
+    # Each worker is already one process of a pool; chunk serially inside it.
+    chunks = chunk_documents(
+        docs, ingest["max_sentences"], ingest["overlap"], workers=1, batch_size=ingest["batch_size"]
+    )
+    t0 = time.perf_counter()
+    if chunks:
+        vecs = embed_chunks(cfg, make_embedder(cfg), chunks, os.path.join(out_dir, "ckpt"))
+    else:
+        vecs = np.zeros((0, 0), dtype="float32")
+    write_meta(os.path.join(out_dir, "meta.jsonl"), chunks)
+    tmp_path = os.path.join(out_dir, "vectors.tmp.npy")
+    np.save(tmp_path, vecs)
+    os.replace(tmp_path, vectors_path)
+    shutil.rmtree(os.path.join(out_dir, "ckpt"), ignore_errors=True)
+    logger.info(
+        "Shard %s: %s docs, %s chunks embedded in %.1f ms",
+        shard,
+        len(docs),
+        len(chunks),
+        (time.perf_counter() - t0) * 1000,
+    )
+    return len(chunks)
+
+
+def _shard_vectors(work_dir: str, num_shards: int) -> List[np.ndarray]:
+    return [
+        np.load(os.path.join(shard_dir(work_dir, i), "vectors.npy"), mmap_mode="r")
+        for i in range(num_shards)
+    ]
+
+
+def run_train(cfg: Dict[str, Any], project_root: str, max_samples: int = 20000) -> Dict[str, Any]:
+    """Train the shared quantizer on a sample drawn proportionally from every shard."""
+    settings = distributed_settings(cfg, project_root)
+    work_dir = settings["work_dir"]
+    plan = _read_json(os.path.join(work_dir, PLAN_NAME))
+    shards = [v for v in _shard_vectors(work_dir, len(plan["shards"])) if len(v)]
+    if not shards:
+        raise RuntimeError("No embedded vectors found in any shard")
+    total = sum(len(v) for v in shards)
+    d = int(shards[0].shape[1])
+    sample = np.vstack(
+        [sample_training_vectors(v, max(1, max_samples * len(v) // total)) for v in shards]
+    )
+    reducer = train_reducer(sample, cfg)
+    if reducer is not None:
+        sample = reducer.apply(sample)
+        d = reducer.out_dim
+        reducer.save(work_dir)
+    faiss_cfg = cfg.get("faiss", {})
+    # HNSW graphs cannot be merged and binary indexes are trained on the sign codes of
+    # every vector; for those the coordinator builds the index from the merged vectors.
+    index_type = faiss_cfg.get("type", "ivf_pq")
+    mergeable = index_type != "hnsw" and index_type not in BINARY_TYPES
+    normalize = False
+    if index_type not in BINARY_TYPES:
+        index, normalize = train_faiss(d, sample, total, faiss_cfg)
+        faiss.write_index(index, os.path.join(work_dir, TRAINED_INDEX_NAME))
+    info = {"dim": d, "num_vectors": total, "normalize": normalize, "mergeable": mergeable}
+    _write_json(os.path.join(work_dir, TRAIN_NAME), info)
+    return info
+
+
+def run_add_shard(cfg: Dict[str, Any], project_root: str, shard: int) -> None:
+    settings = distributed_settings(cfg, project_root)
+    work_dir = settings["work_dir"]
+    info = _read_json(os.path.join(work_dir, TRAIN_NAME))
+    if not info["mergeable"]:
+        return
+    out_dir = shard_dir(work_dir, shard)
+    vecs = np.load(os.path.join(out_dir, "vectors.npy"))
+    index = faiss.read_index(os.path.join(work_dir, TRAINED_INDEX_NAME))
+    if len(vecs):
+        vecs = np.ascontiguousarray(vecs, dtype="float32")
+        reducer = DimReducer.load(work_dir)
+        if reducer is not None:
+            vecs = reducer.apply(vecs)
+        if info["normalize"]:
+            faiss.normalize_L2(vecs)
+        index.add(vecs)
+    faiss.write_index(index, os.path.join(out_dir, "index.faiss"))
+
+
+def run_merge(cfg: Dict[str, Any], project_root: str) -> str:
+    """Merge shard indexes, vectors and metadata (in shard order) into a new index version."""
+    logger = logging.getLogger(__name__)
+    settings = distributed_settings(cfg, project_root)
+    work_dir = settings["work_dir"]
+    plan = _read_json(os.path.join(work_dir, PLAN_NAME))
+    info = _read_json(os.path.join(work_dir, TRAIN_NAME))
+    num_shards = len(plan["shards"])
+    index_dir, version = begin_build(settings["index_dir"], cfg)
+    try:
+        with open(os.path.join(index_dir, "meta.jsonl"), "w") as out:
+            for i in range(num_shards):
+                with open(os.path.join(shard_dir(work_dir, i), "meta.jsonl"), "r") as fh:
+                    shutil.copyfileobj(fh, out)
+
+        vectors = np.lib.format.open_memmap(
+            os.path.join(index_dir, "vectors.npy"),
+            mode="w+",
+            dtype="float32",
+            shape=(info["num_vectors"], info["dim"]),
+        )
+        reducer = DimReducer.load(work_dir)
+        offset = 0
+        for part in _shard_vectors(work_dir, num_shards):
+            for start in range(0, len(part), 65536):
+                block = part[start : start + 65536]
+                vectors[offset : offset + len(block)] = (
+                    reducer.apply(block) if reducer is not None else block
+                )
+                offset += len(block)
+        vectors.flush()
+        if reducer is not None:
+            reducer.save(index_dir)
+        else:
+            remove_reducer(index_dir)
+
+        if info["mergeable"]:
+            index = faiss.read_index(os.path.join(work_dir, TRAINED_INDEX_NAME))
+            for i in range(num_shards):
+                shard_index = faiss.read_index(os.path.join(shard_dir(work_dir, i), "index.faiss"))
+                # Flat indexes have implicit ids; IVF ids are shifted past what is already merged.
+                add_id = 0 if isinstance(index, faiss.IndexFlatCodes) else index.ntotal
+                index.merge_from(shard_index, add_id)
+        elif cfg.get("faiss", {}).get("type") in BINARY_TYPES:
+            index = build_binary_index(index_dir, np.asarray(vectors), cfg.get("faiss", {}))
+        else:
+            index = faiss.read_index(os.path.join(work_dir, TRAINED_INDEX_NAME))
+            vecs = np.array(vectors, dtype="float32")
+            if info["normalize"]:
+                faiss.normalize_L2(vecs)
+            index.add(vecs)
+        if not isinstance(index, faiss.IndexBinary):
+            faiss.write_index(index, os.path.join(index_dir, "voyage.faiss"))
+        bm25_stats = None
+        if version is not None:
+            bm25_stats = build_bm25(os.path.join(index_dir, BM25_DIR), read_meta(index_dir), cfg)
+    except BaseException:
+        abort_build(settings["index_dir"], version)
+        raise
+    index_dir = finish_build(
+        settings["index_dir"],
+        version,
+        cfg,
+        {
+            "kind": "faiss",
+            "faiss_type": cfg.get("faiss", {}).get("type", "ivf_pq"),
+            "num_chunks": info["num_vectors"],
+            "dim": info["dim"],
+            "embedding_model": embedding_model_id(cfg),
+            "num_shards": num_shards,
+            "bm25": bm25_stats,
+        },
+    )
+    if not settings["keep_work_dir"]:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    logger.info("Merged %s shards into %s (num_chks=%s)", num_shards, index_dir, index.ntotal)
+    return index_dir
+
+
+def _embed_task(args: Tuple[Dict[str, Any], str, int]) -> int:
+    return run_embed_shard(*args)
+
+
+def _add_task(args: Tuple[Dict[str, Any], str, int]) -> None:
+    run_add_shard(*args)
+
+
+def run_distributed(
+    cfg: Dict[str, Any], project_root: str, num_shards: int = 0, workers: int = 0
+) -> str:
+    """Run every phase locally, fanning shard phases out over a process pool."""
+    plan = run_plan(cfg, project_root, num_shards)
+    tasks = [(cfg, project_root, spec["shard"]) for spec in plan["shards"]]
+    with Pool(processes=workers or len(tasks)) as pool:
+        pool.map(_embed_task, tasks)
+        run_train(cfg, project_root)
+        pool.map(_add_task, tasks)
+    return run_merge(cfg, project_root)
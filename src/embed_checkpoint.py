@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from tqdm import tqdm
+
+from src.atomic_io import atomic_write_bytes
+
+MANIFEST_NAME = "manifest.json"
+
+
+def corpus_fingerprint(model: str, chunk_ids: Sequence[str], texts: Sequence[str]) -> str:
+    """Hash of everything that determines the vectors; a mismatch invalidates checkpoints."""
+    h = hashlib.sha256(model.encode("utf-8"))
+    for chunk_id, text in zip(chunk_ids, texts):
+        h.update(chunk_id.encode("utf-8"))
+        h.update(b"\0")
+        h.update(text.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class EmbeddingCheckpoint:
+    """Durable segments of embedded vectors plus a manifest describing them.
+
+    Each segment covers a contiguous range of chunks `[start, end)` and is only
+    listed in the manifest after its `.npy` file is fully written, so a crash can
+    lose at most the segment that was in flight.
+    """
+
+    def __init__(self, ckpt_dir: str, fingerprint: str, num_chunks: int):
+        self.ckpt_dir = ckpt_dir
+        self.fingerprint = fingerprint
+        self.num_chunks = num_chunks
+        self.segments: List[Dict[str, Any]] = []
+        self.dim: Optional[int] = None
+        os.makedirs(ckpt_dir, exist_ok=True)
+        self._load()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.ckpt_dir, MANIFEST_NAME)
+
+    @property
+    def completed(self) -> int:
+        """Number of leading chunks already embedded."""
+        return self.segments[-1]["end"] if self.segments else 0
+
+    def _load(self) -> None:
+        logger = logging.getLogger(__name__)
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, "r") as fh:
+            manifest = json.load(fh)
+        if (
+            manifest.get("fingerprint") != self.fingerprint
+            or manifest.get("num_chunks") != self.num_chunks
+        ):
+            logger.info(
+                "Embedding checkpoint in %s is for another corpus; discarding", self.ckpt_dir
+            )
+            self.reset()
+            return
+        expected_start = 0
+        for seg in manifest.get("segments", []):
+            seg_path = os.path.join(self.ckpt_dir, seg["file"])
+            if seg["start"] != expected_start or not os.path.exists(seg_path):
+                break
+            self.segments.append(seg)
+            expected_start = seg["end"]
+        self.dim = manifest.get("dim")
+        logger.info(
+            "Resuming embeddings from checkpoint: %s/%s chunks done",
+            self.completed,
+            self.num_chunks,
+        )
+
+    def reset(self) -> None:
+        shutil.rmtree(self.ckpt_dir, ignore_errors=True)
+        os.makedirs(self.ckpt_dir, exist_ok=True)
+        self.segments = []
+        self.dim = None
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "fingerprint": self.fingerprint,
+            "num_chunks": self.num_chunks,
+            "dim": self.dim,
+            "segments": self.segments,
+        }
+        payload = json.dumps(manifest, indent=2).encode("utf-8")
+        atomic_write_bytes(self.manifest_path, lambda fh: fh.write(payload))
+
+    def append(self, start: int, vecs: np.ndarray, chunk_ids: Sequence[str]) -> None:
+        if start != self.completed:
+            raise ValueError(f"segment starts at {start}, expected {self.completed}")
+        end = start + len(vecs)
+        name = f"segment_{len(self.segments):06d}.npy"
+        atomic_write_bytes(
+            os.path.join(self.ckpt_dir, name),
+            lambda fh: np.save(fh, np.ascontiguousarray(vecs, dtype=np.float32)),
+        )
+        self.dim = int(vecs.shape[1])
+        self.segments.append(
+            {
+                "file": name,
+                "start": start,
+                "end": end,
+                "first_chunk_id": chunk_ids[start],
+                "last_chunk_id": chunk_ids[end - 1],
+            }
+        )
+        self._write_manifest()
+
+    def assemble(self) -> np.ndarray:
+        """Read segments sequentially into a single (num_chunks, dim) float32 array."""
+        if self.completed != self.num_chunks:
+            raise RuntimeError(
+                f"checkpoint incomplete: {self.completed}/{self.num_chunks} chunks embedded"
+            )
+        out = np.empty((self.num_chunks, self.dim or 0), dtype=np.float32)
+        for seg in self.segments:
+            part = np.load(os.path.join(self.ckpt_dir, seg["file"]), mmap_mode="r")
+            out[seg["start"] : seg["end"]] = part
+        return out
+
+
+def embed_with_checkpoints(
+    embed_fn: Callable[[List[str]], np.ndarray],
+    texts: List[str],
+    chunk_ids: List[str],
+    ckpt_dir: str,
+    model: str,
+    batch_size: int = 16,
+    segment_size: int = 4096,
+) -> np.ndarray:
+    """Embed `texts` in batches, persisting a segment every `segment_size` chunks.
+
+    A restarted call with the same model, chunk ids and texts skips every segment
+    already on disk and only pays for the remainder.
+    """
+    fingerprint = corpus_fingerprint(model, chunk_ids, texts)
+    ckpt = EmbeddingCheckpoint(ckpt_dir, fingerprint, len(texts))
+    # Segments hold whole batches so a resumed run issues the same requests.
+    segment_size = max(batch_size, (segment_size // batch_size) * batch_size)
+    total_batches = (len(texts) + batch_size - 1) // batch_size
+    with tqdm(
+        total=total_batches, initial=ckpt.completed // batch_size, desc="Embedding batches"
+    ) as bar:
+        for seg_start in range(ckpt.completed, len(texts), segment_size):
+            seg_end = min(seg_start + segment_size, len(texts))
+            parts = []
+            for i in range(seg_start, seg_end, batch_size):
+                parts.append(embed_fn(texts[i : min(i + batch_size, seg_end)]).astype("float32"))
+                bar.update(1)
+            ckpt.append(seg_start, np.vstack(parts), chunk_ids)
+    return ckpt.assemble()
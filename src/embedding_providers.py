@@ -0,0 +1,91 @@
+"""Embedding client selection (`embedding.provider`).
+
+`voyage` calls the Voyage API. `local` runs a sentence-transformers bi-encoder
+in-process (`src.local_embedder`, imported only when selected). `stub` is a deterministic offline embedder for
+benchmarks and tests: each token maps to a fixed pseudo-random vector (seeded by
+a hash of the token) and a text embeds as the normalized sum of its tokens, so
+texts that share words land close together and runs are reproducible.
+"""
+
+import os
+import re
+import time
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+from src.voyage_client import VoyageClient
+
+EMBEDDING_PROVIDERS = ("voyage", "local", "stub")
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class StubEmbedder:
+    def __init__(self, dim: int = 1024, seed: int = 0, latency_ms: float = 0.0):
+        self.dim = int(dim)
+        self.seed = int(seed)
+        self.latency_ms = float(latency_ms)
+        self.model = f"stub-{self.dim}"
+        self._token_vector = lru_cache(maxsize=200_000)(self._make_token_vector)
+
+    def _make_token_vector(self, token: str) -> np.ndarray:
+        rng = np.random.default_rng([self.seed, zlib.crc32(token.encode("utf-8"))])
+        return rng.standard_normal(self.dim).astype(np.float32)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Unit-norm float32 vectors, one row per text; sleeps `latency_ms` per call."""
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN_RE.findall(text.lower()) or [text]
+            out[row] = np.sum([self._token_vector(token) for token in tokens], axis=0)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+def embedding_model_id(cfg: Dict[str, Any]) -> str:
+    """Identifies the vectors `make_embedder(cfg)` produces (checkpoints, index manifests)."""
+    emb_cfg = cfg.get("embedding", {}) or {}
+    provider = emb_cfg.get("provider", "voyage")
+    if provider == "local":
+        local_cfg = emb_cfg.get("local", {}) or {}
+        return "local:" + local_cfg.get("model", "sentence-transformers/all-MiniLM-L6-v2")
+    if provider == "stub":
+        return f"stub:{emb_cfg.get('dim', 1024)}:{(emb_cfg.get('stub', {}) or {}).get('seed', 0)}"
+    return emb_cfg.get("model", "voyage-context-3")
+
+
+def make_embedder(cfg: Dict[str, Any]):
+    """Embedding client for `cfg["embedding"]`; anything with `embed(texts) -> ndarray`."""
+    emb_cfg = cfg.get("embedding", {}) or {}
+    provider = emb_cfg.get("provider", "voyage")
+    if provider == "voyage":
+        api_key = os.getenv(emb_cfg.get("api_key_env", "VOYAGE_API_KEY"), "")
+        return VoyageClient(api_key, model=emb_cfg.get("model", "voyage-context-3"))
+    if provider == "local":
+        from src.local_embedder import LocalEmbedder
+
+        local_cfg = emb_cfg.get("local", {}) or {}
+        return LocalEmbedder(
+            model_name=local_cfg.get("model", "sentence-transformers/all-MiniLM-L6-v2"),
+            device=local_cfg.get("device") or cfg.get("device") or None,
+            batch_size=int(local_cfg.get("batch_size", 64)),
+            threads=int(local_cfg.get("threads", 0)),
+            backend=local_cfg.get("backend", "torch"),
+            normalize=bool(local_cfg.get("normalize", True)),
+            max_seq_length=local_cfg.get("max_seq_length"),
+        )
+    if provider == "stub":
+        stub_cfg = emb_cfg.get("stub", {}) or {}
+        return StubEmbedder(
+            dim=int(emb_cfg.get("dim", 1024)),
+            seed=int(stub_cfg.get("seed", 0)),
+            latency_ms=float(stub_cfg.get("latency_ms", 0.0)),
+        )
+    raise ValueError(
+        f"Unknown embedding.provider: {provider} (expected one of {EMBEDDING_PROVIDERS})"
+    )
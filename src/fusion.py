@@ -0,0 +1,102 @@
+"""Rank fusion over integer id arrays.
+
+Every retriever contributes an array of integer ids (e.g. FAISS row ids) in rank
+order, optionally with its raw scores. Fusion runs as a handful of NumPy passes
+over the concatenated candidates: `np.unique` maps ids to a compact range,
+`np.bincount` scatter-adds the per-list contributions, and `np.argpartition`
+picks the top-k without sorting the whole pool.
+
+Ties are broken by first appearance (earlier list, then better rank), which
+matches a stable sort over a dict filled in list order.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+FUSION_METHODS = ("rrf", "combsum", "combmnz")
+NORMALIZATIONS = ("minmax", "zscore", "none")
+
+
+def _top_k(scores: np.ndarray, first_pos: np.ndarray, top_k: Optional[int]) -> np.ndarray:
+    """Positions of the `top_k` best scores, ordered by (score desc, first_pos asc)."""
+    n = len(scores)
+    if top_k is None or top_k >= n:
+        return np.lexsort((first_pos, -scores))
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    part = np.argpartition(-scores, top_k - 1)[:top_k]
+    # Include every item tied with the k-th score so the tie-break is exact.
+    cand = np.flatnonzero(scores >= scores[part].min())
+    return cand[np.lexsort((first_pos[cand], -scores[cand]))][:top_k]
+
+
+def _normalize(scores: np.ndarray, how: str) -> np.ndarray:
+    scores = scores.astype(np.float64, copy=False)
+    if how == "none" or len(scores) == 0:
+        return scores
+    if how == "minmax":
+        lo, hi = scores.min(), scores.max()
+        return np.ones_like(scores) if hi == lo else (scores - lo) / (hi - lo)
+    if how == "zscore":
+        std = scores.std()
+        return np.zeros_like(scores) if std == 0 else (scores - scores.mean()) / std
+    raise ValueError(f"Unknown normalization: {how}")
+
+
+def fuse(
+    id_lists: Sequence[np.ndarray],
+    score_lists: Optional[Sequence[np.ndarray]] = None,
+    method: str = "rrf",
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None,
+    normalize: str = "minmax",
+    top_k: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse ranked id lists from any number of retrievers.
+
+    Args:
+        id_lists: One int array per retriever, best first. Negative ids are ignored.
+        score_lists: Raw scores aligned with `id_lists` (required for combsum/combmnz).
+        method: `rrf` sums w / (k + rank); `combsum` sums w * normalized score;
+            `combmnz` is combsum multiplied by the number of lists containing the id.
+        k: RRF constant.
+        weights: Per-retriever weights (default 1.0 each).
+        normalize: Per-list score normalization for combsum/combmnz.
+        top_k: Number of fused results to return (default: all).
+
+    Returns:
+        (ids, scores) sorted by fused score, best first.
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method: {method}")
+    if weights is None:
+        weights = [1.0] * len(id_lists)
+    if len(weights) != len(id_lists):
+        raise ValueError(f"{len(weights)} weights for {len(id_lists)} result lists")
+    if method != "rrf" and score_lists is None:
+        raise ValueError(f"{method} fusion needs score_lists")
+
+    ids_parts, contrib_parts = [], []
+    for list_no, ids in enumerate(id_lists):
+        ids = np.asarray(ids, dtype=np.int64)
+        valid = ids >= 0
+        if method == "rrf":
+            ranks = np.arange(1, len(ids) + 1, dtype=np.float64)
+            contrib = weights[list_no] / (k + ranks)
+        else:
+            raw = np.asarray(score_lists[list_no], dtype=np.float64)
+            contrib = np.zeros(len(ids), dtype=np.float64)
+            contrib[valid] = weights[list_no] * _normalize(raw[valid], normalize)
+        ids_parts.append(ids[valid])
+        contrib_parts.append(contrib[valid])
+
+    if not ids_parts or sum(len(p) for p in ids_parts) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    all_ids = np.concatenate(ids_parts)
+    unique_ids, first_pos, inverse = np.unique(all_ids, return_index=True, return_inverse=True)
+    fused = np.bincount(inverse, weights=np.concatenate(contrib_parts), minlength=len(unique_ids))
+    if method == "combmnz":
+        fused = fused * np.bincount(inverse, minlength=len(unique_ids))
+    order = _top_k(fused, first_pos, top_k)
+    return unique_ids[order], fused[order]
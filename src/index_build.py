@@ -5,12 +5,19 @@ import yaml
 import numpy as np
 import faiss
 import logging
+import shutil
 import time
-from tqdm import tqdm
 from dotenv import load_dotenv
 
-from src.voyage_client import VoyageClient
-from src.chunking import make_chunks_with_context
+from src.binary_index import BINARY_TYPES, build_binary_index
+from src.bm25_build import build_bm25
+from src.dim_reduction import remove_reducer, train_reducer
+from src.chunking import chunk_documents, chunk_search_text
+from src.collection_registry import collection_config
+from src.embed_checkpoint import embed_with_checkpoints
+from src.embedding_providers import embedding_model_id, make_embedder
+from src.index_versions import BM25_DIR, abort_build, begin_build, finish_build
+from src.parallel import ingest_settings
 
 
 def load_docs(path):
@@ -24,58 +31,71 @@ def load_docs(path):
     return docs
 
 
-def build_faiss(index_dir, vecs, index_cfg):
-    logger = logging.getLogger(__name__)
-    os.makedirs(index_dir, exist_ok=True)
-    d = vecs.shape[1]
+def sample_training_vectors(vecs, max_samples=20000):
+    """Random rows of `vecs` (a copy, so callers may normalize it in place)."""
+    picks = np.random.choice(len(vecs), min(max_samples, len(vecs)), replace=False)
+    return np.asarray(vecs[np.sort(picks)], dtype="float32")
+
+
+def train_faiss(d, train_vecs, num_vectors, index_cfg):
+    """Create an empty index for `num_vectors` vectors, trained on `train_vecs` if needed.
+
+    Returns the index and whether vectors must be L2-normalized before `add`.
+    """
     index_type = index_cfg.get("type", "ivf_pq")
     if index_type == "flat":
-        index = faiss.IndexFlatIP(d)
-        index.add(vecs)
-    elif index_type == "hnsw":
+        return faiss.IndexFlatIP(d), False
+    if index_type == "hnsw":
         index = faiss.IndexHNSWFlat(d, 32)
         faiss.ParameterSpace().set_index_parameter(index, "efSearch", 128)
         faiss.ParameterSpace().set_index_parameter(index, "efConstruction", 200)
         index.hnsw.efSearch = 128
-        index.add(vecs)
-    elif index_type == "ivf_pq":
+        return index, False
+    if index_type == "ivf_pq":
         nlist = int(index_cfg.get("nlist", 4096))
         m = int(index_cfg.get("m", 32))
         nbits = int(index_cfg.get("nbits", 8))
         quantizer = faiss.IndexFlatIP(d)
         min_train_needed = max(int(nlist * 4), 2**nbits)
-        if len(vecs) < min_train_needed:
+        if num_vectors < min_train_needed:
             print(
-                f"Warning: only {len(vecs)} vectors available but IVFPQ (nlist={nlist}, m={m}, nbits={nbits}) "
+                f"Warning: only {num_vectors} vectors available but IVFPQ (nlist={nlist}, m={m}, nbits={nbits}) "
                 f"requires at least {min_train_needed} training points; falling back to flat index"
             )
-            index = faiss.IndexFlatIP(d)
-            faiss.normalize_L2(vecs)
-            index.add(vecs)
-            faiss.write_index(index, os.path.join(index_dir, "voyage.faiss"))
-            return index
+            return faiss.IndexFlatIP(d), True
         index = faiss.IndexIVFPQ(quantizer, d, nlist, m, nbits, faiss.METRIC_INNER_PRODUCT)
         index.nprobe = int(index_cfg.get("nprobe", 16))
-        train_samples = vecs[np.random.choice(len(vecs), min(20000, len(vecs)), replace=False)]
+        train_samples = sample_training_vectors(train_vecs)
         faiss.normalize_L2(train_samples)
         index.train(train_samples)
+        return index, True
+    raise ValueError("Unknown faiss.type")
+
+
+def build_faiss(index_dir, vecs, index_cfg):
+    logger = logging.getLogger(__name__)
+    os.makedirs(index_dir, exist_ok=True)
+    if index_cfg.get("type") in BINARY_TYPES:
+        return build_binary_index(index_dir, vecs, index_cfg)
+    d = vecs.shape[1]
+    index, normalize = train_faiss(d, vecs, len(vecs), index_cfg)
+    if normalize:
         faiss.normalize_L2(vecs)
-        index.add(vecs)
-    else:
-        raise ValueError("Unknown faiss.type")
+    index.add(vecs)
     index_path = os.path.join(index_dir, "voyage.faiss")
     faiss.write_index(index, index_path)
     logger.info(
-        "FAISS index written to %s (type=%s, dim=%s, size=%s)", index_path, index_type, d, len(vecs)
+        "FAISS index written to %s (type=%s, dim=%s, size=%s)",
+        index_path,
+        index_cfg.get("type", "ivf_pq"),
+        d,
+        len(vecs),
     )
     return index
 
 
-def main():
-    logging.basicConfig(
-        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s"
-    )
-    load_dotenv()
+def load_config():
+    """Load config.yaml from the project root; returns (cfg, project_root)."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
     config_path = os.path.join(project_root, "config.yaml")
@@ -83,49 +103,123 @@ def main():
         raise FileNotFoundError(f"config.yaml not found at {config_path}")
     with open(config_path, "r") as fh:
         cfg = yaml.safe_load(fh)
-    api_key = os.getenv(cfg["embedding"]["api_key_env"], "")
-    vc = VoyageClient(api_key, model=cfg["embedding"]["model"])
+    # COLLECTION=<name> (or build_index --collection) builds a named collection.
+    return collection_config(cfg, os.getenv("COLLECTION")), project_root
+
+
+def resolve_path(project_root, path):
+    return path if os.path.isabs(path) else os.path.join(project_root, path)
 
+
+def data_path_from_config(cfg, project_root):
     data_path = cfg.get("data_path")
     if not data_path:
         raise ValueError("config.yaml missing 'data_path' entry")
-    if not os.path.isabs(data_path):
-        data_path = os.path.join(project_root, data_path)
+    data_path = resolve_path(project_root, data_path)
     if not os.path.exists(data_path):
         raise FileNotFoundError(f"data file not found: {data_path}")
-    docs = load_docs(data_path)
+    return data_path
+
 
-    all_chunks = []
-    for d in docs:
-        all_chunks.extend(make_chunks_with_context(d, max_sentences=3, overlap=1))
+def chunk_texts(chunks):
+    """Text sent to the embedder for each chunk."""
+    return [chunk_search_text(c) for c in chunks]
 
-    texts = [f"{c['title']}\n{c['text']}".strip() for c in all_chunks]
-    if not texts:
+
+def embed_chunks(cfg, embedder, chunks, ckpt_dir):
+    """Embed chunks through a resumable checkpoint in `ckpt_dir`."""
+    emb_cfg = cfg.get("embedding", {})
+    ckpt_cfg = emb_cfg.get("checkpoint", {}) or {}
+    per_request = min(int(emb_cfg.get("batch_size", 16)), 1000)
+    return embed_with_checkpoints(
+        embedder.embed,
+        chunk_texts(chunks),
+        [c["chunk_id"] for c in chunks],
+        ckpt_dir,
+        model=embedding_model_id(cfg),
+        batch_size=per_request,
+        segment_size=int(ckpt_cfg.get("segment_size", 4096)),
+    )
+
+
+def write_meta(path, chunks):
+    with open(path, "w") as f:
+        for c in chunks:
+            f.write(json.dumps(c) + "\n")
+
+
+def main(cfg=None, project_root=None):
+    """Build the FAISS index for `cfg` (default: config.yaml at the project root)."""
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s"
+    )
+    load_dotenv()
+    if cfg is None:
+        cfg, project_root = load_config()
+    vc = make_embedder(cfg)
+    docs = load_docs(data_path_from_config(cfg, project_root))
+
+    ingest = ingest_settings(cfg)
+    t0 = time.perf_counter()
+    all_chunks = chunk_documents(docs, **ingest)
+    logging.getLogger(__name__).info(
+        "Chunked %s docs into %s chunks in %.1f ms (workers=%s)",
+        len(docs),
+        len(all_chunks),
+        (time.perf_counter() - t0) * 1000,
+        ingest["workers"],
+    )
+
+    if not all_chunks:
         print("No chunks to embed; exiting.")
         return
-    conf_bs = int(cfg.get("embedding", {}).get("batch_size", 16))
-    per_request = min(conf_bs, 1000)
-    batches = [texts[i : i + per_request] for i in range(0, len(texts), per_request)]
-    vecs_parts = []
+    index_dir = resolve_path(project_root, cfg.get("index_dir", "index"))
+    ckpt_cfg = cfg.get("embedding", {}).get("checkpoint", {}) or {}
+    ckpt_dir = resolve_path(
+        project_root, ckpt_cfg.get("dir") or os.path.join(index_dir, ".embed_checkpoint")
+    )
+
     t0 = time.perf_counter()
-    for b in tqdm(batches, desc="Embedding batches"):
-        part = vc.embed(b).astype("float32")
-        vecs_parts.append(part)
-    vecs = np.vstack(vecs_parts)
+    vecs = embed_chunks(cfg, vc, all_chunks, ckpt_dir)
     embed_ms = (time.perf_counter() - t0) * 1000
-    logging.getLogger(__name__).info("Embedded %s chunks in %.1f ms", len(texts), embed_ms)
+    logging.getLogger(__name__).info("Embedded %s chunks in %.1f ms", len(all_chunks), embed_ms)
 
-    index_dir = cfg.get("index_dir", "index")
-    if not os.path.isabs(index_dir):
-        index_dir = os.path.join(project_root, index_dir)
-    os.makedirs(index_dir, exist_ok=True)
-    np.save(os.path.join(index_dir, "vectors.npy"), vecs)
-    with open(os.path.join(index_dir, "meta.jsonl"), "w") as f:
-        for c in all_chunks:
-            f.write(json.dumps(c) + "\n")
+    out_dir, version = begin_build(index_dir, cfg)
+    try:
+        reducer = train_reducer(vecs, cfg)
+        if reducer is not None:
+            vecs = reducer.apply(vecs)
+            reducer.save(out_dir)
+        else:
+            remove_reducer(out_dir)
+        np.save(os.path.join(out_dir, "vectors.npy"), vecs)
+        write_meta(os.path.join(out_dir, "meta.jsonl"), all_chunks)
 
-    build_faiss(index_dir, vecs, cfg.get("faiss", {}))
-    print("Index built:", index_dir, "num_chks=", len(all_chunks))
+        faiss_cfg = cfg.get("faiss", {})
+        build_faiss(out_dir, vecs, faiss_cfg)
+        # A version carries BM25 over the same chunks, so both publish under one pointer.
+        bm25_stats = None
+        if version is not None:
+            bm25_stats = build_bm25(os.path.join(out_dir, BM25_DIR), all_chunks, cfg)
+    except BaseException:
+        abort_build(index_dir, version)
+        raise
+    out_dir = finish_build(
+        index_dir,
+        version,
+        cfg,
+        {
+            "kind": "faiss",
+            "faiss_type": faiss_cfg.get("type", "ivf_pq"),
+            "num_chunks": len(all_chunks),
+            "dim": int(vecs.shape[1]),
+            "embedding_model": embedding_model_id(cfg),
+            "bm25": bm25_stats,
+        },
+    )
+    if not ckpt_cfg.get("keep", False):
+        shutil.rmtree(ckpt_dir, ignore_errors=True)
+    print("Index built:", out_dir, "num_chks=", len(all_chunks))
 
 
 if __name__ == "__main__":
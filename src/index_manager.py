@@ -0,0 +1,196 @@
+"""Loaded index state with background hot-reload of newly published versions.
+
+`IndexState` bundles everything a query reads (FAISS index, metadata, BM25,
+filters) for one index version and is never mutated after loading. The
+`IndexManager` holds the current state; a watcher thread polls the `CURRENT`
+pointer, loads and warms a new state off the request path, then swaps the
+reference in one assignment. Queries grab the state once, so in-flight requests
+finish on the version they started with.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from src.binary_index import BINARY_INDEX_NAME, BINARY_TYPES, load_binary_index
+from src.dim_reduction import DimReducer
+from src.index_versions import (
+    bm25_dir,
+    read_current,
+    resolve_index_dir,
+    version_dir,
+    versioning_settings,
+)
+from src.metadata_filter import MetadataFilter
+from src.semantic_cache import SemanticCache
+from src.sparse_retriever import SparseRetriever
+
+
+def load_index(cfg: Dict[str, Any], index_dir: Optional[str] = None) -> Tuple[Any, List[Dict]]:
+    logger = logging.getLogger(__name__)
+    index_dir = index_dir or resolve_index_dir(cfg["index_dir"])
+    index_cfg = cfg.get("faiss", {}) or {}
+    meta_path = os.path.join(index_dir, "meta.jsonl")
+    index: Any
+    if index_cfg.get("type") in BINARY_TYPES:
+        index = load_binary_index(index_dir, index_cfg)
+    else:
+        index = faiss.read_index(os.path.join(index_dir, "voyage.faiss"))
+    with open(meta_path, "r") as fh:
+        meta = [json.loads(line) for line in fh]
+    logger.info(f"Index loaded: {index_dir} num_chks={len(meta)}")
+    return index, meta
+
+
+def sparse_rows_for(chunk_ids: List[str], meta: List[Dict]) -> np.ndarray:
+    """Map each BM25 corpus position to its row in `meta` (-1 when unknown).
+
+    BM25 indexes built before chunk-level retrieval hold doc_ids; those map to the
+    doc's first chunk.
+    """
+    row_by_id: Dict[str, int] = {}
+    for row, item in enumerate(meta):
+        row_by_id[item["chunk_id"]] = row
+    for row, item in enumerate(meta):
+        row_by_id.setdefault(item["doc_id"], row)
+    return np.array([row_by_id.get(result_id, -1) for result_id in chunk_ids], dtype=np.int64)
+
+
+class IndexState:
+    """One loaded index version (dense and its BM25); read-only once constructed."""
+
+    def __init__(self, cfg: Dict[str, Any], index_dir: str, bm25_dir: str):
+        start = time.perf_counter()
+        self.index_dir = index_dir
+        self.bm25_dir = bm25_dir
+        self.version: Optional[str] = None
+        self.index, self.meta = load_index(cfg, index_dir)
+        self.reducer = DimReducer.load(index_dir)
+        self.metadata_filter = MetadataFilter.from_config(self.meta, cfg)
+        vectors_path = os.path.join(index_dir, "vectors.npy")
+        vectors = np.load(vectors_path, mmap_mode="r") if os.path.exists(vectors_path) else None
+        if vectors is not None and len(vectors) != len(self.meta):
+            vectors = None  # stale vectors.npy; filtered queries fall back to ID selectors
+        self.vectors = vectors
+        self.sparse_retriever = SparseRetriever(
+            index_dir=bm25_dir,
+            engine=(cfg.get("bm25", {}) or {}).get("engine", "exhaustive"),
+        )
+        self.sparse_row_map = sparse_rows_for(self.sparse_retriever.chunk_ids, self.meta)
+        # Per state, so a hot reload or eviction never serves results from another version.
+        self.semantic_cache = SemanticCache.from_config(cfg, dim=self.index.d)
+        self.resident_bytes = self._resident_bytes()
+        self.loaded_at = time.time()
+        self.load_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    @classmethod
+    def load(cls, cfg: Dict[str, Any], version: Optional[str] = None) -> "IndexState":
+        """Load `version` with the BM25 published alongside it; None means the flat layout."""
+        index_dir = version_dir(cfg["index_dir"], version)
+        state = cls(cfg, index_dir, bm25_dir(cfg, index_dir))
+        state.version = version
+        return state
+
+    def _resident_bytes(self) -> int:
+        """Approximate heap footprint of this state.
+
+        Counts the files read into memory plus the arrays built at load.
+        Memory-mapped `vectors.npy` lives in the page cache and is left out.
+        """
+        loaded_files = [
+            os.path.join(self.index_dir, name)
+            for name in ("voyage.faiss", BINARY_INDEX_NAME, "meta.jsonl")
+        ]
+        loaded_files.append(os.path.join(self.bm25_dir, "bm25_index.pkl"))
+        size = sum(os.path.getsize(path) for path in loaded_files if os.path.exists(path))
+        size += self.sparse_row_map.nbytes
+        if self.sparse_retriever.wand is not None:
+            size += self.sparse_retriever.wand.nbytes
+        return int(size)
+
+    def warm(self) -> None:
+        """Touch the index and BM25 once so the first real query does not pay page faults."""
+        if self.index.ntotal:
+            probe = np.zeros((1, self.index.d), dtype="float32")
+            probe[0, 0] = 1.0
+            self.index.search(probe, 1)
+        if self.meta:
+            self.sparse_retriever.search_ids(self.meta[0].get("text", "")[:200], top_k=1)
+
+
+class IndexManager:
+    """Hands out the current `IndexState` and swaps in new versions as they are published."""
+
+    def __init__(self, cfg: Dict[str, Any]):
+        self.cfg = cfg
+        self._state: Optional[IndexState] = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def pointer(self) -> Optional[str]:
+        return read_current(self.cfg["index_dir"])
+
+    def current(self) -> IndexState:
+        state = self._state
+        if state is None:
+            with self._load_lock:
+                if self._state is None:
+                    self._state = IndexState.load(self.cfg, self.pointer())
+                state = self._state
+        return state
+
+    def reload_if_changed(self) -> bool:
+        """Load, warm and swap in the published version if the pointer moved.
+
+        A failed load is logged and the current state keeps serving.
+        """
+        logger = logging.getLogger(__name__)
+        version = self.pointer()
+        if self._state is not None and version == self._state.version:
+            return False
+        with self._load_lock:
+            try:
+                state = IndexState.load(self.cfg, version)
+                state.warm()
+            except Exception:
+                logger.exception("Failed to load index version %s; keeping current", version)
+                return False
+            self._state = state
+        logger.info("Swapped to index version %s (load %.2f ms)", version, state.load_ms)
+        return True
+
+    def loaded(self) -> Optional[IndexState]:
+        """The current state if one is loaded, without triggering a load."""
+        return self._state
+
+    def unload(self) -> None:
+        """Drop the loaded state; requests still holding it finish normally."""
+        self.stop_watcher()
+        with self._load_lock:
+            self._state = None
+
+    def start_watcher(self) -> None:
+        interval = versioning_settings(self.cfg)["watch_seconds"]
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def _watch():
+            while not self._stop.wait(interval):
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=_watch, name="index-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
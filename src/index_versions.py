@@ -0,0 +1,178 @@
+"""Versioned index directories behind an atomic `CURRENT` pointer.
+
+A versioned index root looks like:
+
+    <root>/CURRENT                       name of the live version (one line)
+    <root>/versions/<version>/...        FAISS files + manifest.json
+    <root>/versions/<version>/bm25/...   BM25 over the same chunks
+
+Builds write a fresh version directory, then `publish_version` writes its
+manifest and atomically replaces `CURRENT`, so readers only ever see complete
+versions, and never a FAISS index paired with another build's BM25. Roots
+without `CURRENT` are served as a flat (pre-versioning) index, with BM25 read
+from `bm25_index_path`.
+"""
+
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.atomic_io import atomic_write_bytes, fsync_dir
+
+CURRENT_NAME = "CURRENT"
+VERSIONS_DIR = "versions"
+MANIFEST_NAME = "manifest.json"
+BM25_DIR = "bm25"
+
+
+def versioning_settings(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    ver_cfg = cfg.get("versioning", {}) or {}
+    return {
+        "enabled": bool(ver_cfg.get("enabled", False)),
+        "keep": int(ver_cfg.get("keep", 3)),
+        "watch_seconds": float(ver_cfg.get("watch_seconds", 5)),
+    }
+
+
+def read_current(root: str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, CURRENT_NAME), "r") as fh:
+            return fh.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def version_dir(root: str, version: Optional[str]) -> str:
+    """Directory of `version` under `root`; `root` itself for unversioned (None)."""
+    if version is None:
+        return root
+    return os.path.join(root, VERSIONS_DIR, version)
+
+
+def resolve_index_dir(root: str) -> str:
+    """Directory holding the live index files under `root`."""
+    return version_dir(root, read_current(root))
+
+
+def bm25_dir(cfg: Dict[str, Any], index_dir: str) -> str:
+    """BM25 directory paired with the dense index files in `index_dir`."""
+    paired = os.path.join(index_dir, BM25_DIR)
+    if os.path.isdir(paired):
+        return paired
+    # Flat layout (or versions built before BM25 moved into the dense version).
+    return resolve_index_dir(cfg["bm25_index_path"])
+
+
+def list_versions(root: str) -> List[str]:
+    versions_root = os.path.join(root, VERSIONS_DIR)
+    if not os.path.isdir(versions_root):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(versions_root)
+        if os.path.isfile(os.path.join(versions_root, name, MANIFEST_NAME))
+    )
+
+
+def new_version_dir(root: str) -> Tuple[str, str]:
+    """Create an empty directory for the next version; returns (version, path)."""
+    # Microsecond timestamps sort chronologically; the suffix avoids clashes between hosts.
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    version = f"{stamp}-{uuid.uuid4().hex[:6]}"
+    path = version_dir(root, version)
+    os.makedirs(path)
+    return version, path
+
+
+def begin_build(root: str, cfg: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    """Output directory for a build: a new version dir, or `root` itself when unversioned."""
+    if not versioning_settings(cfg)["enabled"]:
+        os.makedirs(root, exist_ok=True)
+        return root, None
+    version, path = new_version_dir(root)
+    return path, version
+
+
+def abort_build(root: str, version: Optional[str]) -> None:
+    """Discard the unpublished output of a failed build (unversioned builds are left as is)."""
+    if version is not None:
+        shutil.rmtree(version_dir(root, version), ignore_errors=True)
+
+
+def finish_build(
+    root: str, version: Optional[str], cfg: Dict[str, Any], manifest: Dict[str, Any]
+) -> str:
+    """Publish a build started with `begin_build`; returns the directory it was written to."""
+    if version is None:
+        return root
+    return publish_version(root, version, manifest, keep=versioning_settings(cfg)["keep"])
+
+
+def _fsync_tree(path: str) -> None:
+    for dirpath, _dirnames, filenames in os.walk(path):
+        for name in filenames:
+            with open(os.path.join(dirpath, name), "rb") as fh:
+                os.fsync(fh.fileno())
+        fsync_dir(dirpath)
+
+
+def publish_version(
+    root: str, version: str, manifest: Optional[Dict[str, Any]] = None, keep: int = 3
+) -> str:
+    """Seal `version` with a manifest, point `CURRENT` at it and prune old versions."""
+    logger = logging.getLogger(__name__)
+    out_dir = version_dir(root, version)
+    files: Dict[str, int] = {}
+    for dirpath, _dirnames, filenames in os.walk(out_dir):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            files[os.path.relpath(path, out_dir)] = os.path.getsize(path)
+    payload = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "files": dict(sorted(files.items())),
+        **(manifest or {}),
+    }
+    _fsync_tree(out_dir)
+    data = json.dumps(payload, indent=2).encode("utf-8")
+    atomic_write_bytes(os.path.join(out_dir, MANIFEST_NAME), lambda fh: fh.write(data))
+    atomic_write_bytes(
+        os.path.join(root, CURRENT_NAME), lambda fh: fh.write(f"{version}\n".encode("utf-8"))
+    )
+    logger.info("Published %s as CURRENT of %s", version, root)
+    prune_versions(root, keep)
+    return out_dir
+
+
+def prune_versions(root: str, keep: int) -> List[str]:
+    """Remove all but the newest `keep` versions; never removes CURRENT.
+
+    Servers still answering from a pruned version are unaffected: FAISS and BM25
+    structures live in memory and POSIX keeps unlinked mmapped files readable.
+    Directories without a manifest (builds that died before publishing) are
+    removed once `keep` newer versions have been published; younger ones may
+    belong to a build that is still running.
+    """
+    current = read_current(root)
+    published = list_versions(root)
+    removed = []
+    for version in published[: -max(keep, 1)]:
+        if version != current:
+            shutil.rmtree(version_dir(root, version), ignore_errors=True)
+            removed.append(version)
+    versions_root = os.path.join(root, VERSIONS_DIR)
+    if os.path.isdir(versions_root):
+        for name in sorted(set(os.listdir(versions_root)) - set(published)):
+            if sum(version > name for version in published) >= max(keep, 1):
+                shutil.rmtree(version_dir(root, name), ignore_errors=True)
+                removed.append(name)
+    return removed
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, MANIFEST_NAME), "r") as fh:
+        return json.load(fh)
@@ -0,0 +1,158 @@
+"""Chat-completion response cache keyed on model, messages and sampling parameters.
+
+Identical requests (same model, prompt and parameters such as temperature) get
+the stored reply instead of a new completion. Entries live in an in-memory LRU
+of `max_entries` and, when `path` is set, in a SQLite file shared by processes
+and restarts; a disk hit is promoted into memory. Entries older than
+`ttl_seconds` (0 = never) are ignored.
+
+Keys are SHA-256 hashes of the canonical JSON request, so any change to the
+prompt template or parameters misses. Lookups are counted in `metrics()` and in
+`src.metrics` (`rag_cache_lookups_total{cache="llm"}`).
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+from src import metrics as prom
+
+
+def llm_cache_settings(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    cache_cfg = cfg.get("llm_cache", {}) or {}
+    return {
+        "enabled": bool(cache_cfg.get("enabled", False)),
+        "max_entries": int(cache_cfg.get("max_entries", 1024)),
+        "path": cache_cfg.get("path") or None,
+        "ttl_seconds": float(cache_cfg.get("ttl_seconds", 0) or 0),
+        "synthesis": bool(cache_cfg.get("synthesis", False)),
+    }
+
+
+def request_key(model: str, messages: Sequence[Mapping[str, Any]], **params: Any) -> str:
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None, ttl_seconds: float = 0):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        # key -> (stored_at, reply); order is least recently used first.
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, reply TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> Optional["LLMCache"]:
+        settings = llm_cache_settings(cfg)
+        if not settings["enabled"]:
+            return None
+        return cls(
+            max_entries=settings["max_entries"],
+            path=settings["path"],
+            ttl_seconds=settings["ttl_seconds"],
+        )
+
+    def _live(self, stored_at: float) -> bool:
+        return not self.ttl_seconds or time.time() - stored_at <= self.ttl_seconds
+
+    def _remember(self, key: str, stored_at: float, reply: str) -> None:
+        self._entries[key] = (stored_at, reply)
+        self._entries.move_to_end(key)
+        overflow = len(self._entries) - self.max_entries
+        for _ in range(max(0, overflow)):
+            self._entries.popitem(last=False)
+            self._counts["evictions"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._live(entry[0]):
+                self._entries.move_to_end(key)
+                self._counts["hits"] += 1
+                prom.CACHE_LOOKUPS.inc(cache="llm", result="hit")
+                return entry[1]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT reply, stored_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self._live(row[1]):
+                    self._remember(key, row[1], row[0])
+                    self._counts["hits"] += 1
+                    self._counts["disk_hits"] += 1
+                    prom.CACHE_LOOKUPS.inc(cache="llm", result="hit")
+                    return row[0]
+            self._counts["misses"] += 1
+            prom.CACHE_LOOKUPS.inc(cache="llm", result="miss")
+            return None
+
+    def put(self, key: str, reply: str) -> None:
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, reply)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, reply, stored_at)
+                )
+                self._db.commit()
+
+    def complete(
+        self,
+        client,
+        model: str,
+        messages: Sequence[Mapping[str, Any]],
+        key_messages: Optional[Sequence[Mapping[str, Any]]] = None,
+        accept: Optional[Callable[[str], bool]] = None,
+        **params: Any,
+    ) -> str:
+        """Reply text of `client.chat.completions.create(...)`, served from the cache if present.
+
+        `key_messages` (default `messages`) are hashed instead of `messages`, e.g. a
+        normalized form of the prompt so trivially different requests share an entry.
+        Empty replies, and replies rejected by `accept`, are returned but not stored.
+        """
+        key = request_key(model, key_messages or messages, **params)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        response = client.chat.completions.create(model=model, messages=messages, **params)
+        reply = response.choices[0].message.content or ""
+        if reply and (accept is None or accept(reply)):
+            self.put(key, reply)
+        return reply
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"]
+            return {
+                **self._counts,
+                "entries": len(self._entries),
+                "hit_rate": round(self._counts["hits"] / lookups, 4) if lookups else 0.0,
+            }
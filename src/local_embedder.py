@@ -0,0 +1,48 @@
+from typing import Optional, Sequence
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+
+class LocalEmbedder:
+    """In-process bi-encoder (`embedding.provider: local`); same `embed` contract as VoyageClient.
+
+    `threads` > 0 calls `torch.set_num_threads`, which is process-wide and so also
+    applies to the rerankers. `backend` is passed to sentence-transformers
+    (`torch`, or `onnx`/`openvino` with sentence-transformers >= 3.2 and the
+    matching extras installed).
+    """
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        device: Optional[str] = None,
+        batch_size: int = 64,
+        threads: int = 0,
+        backend: str = "torch",
+        normalize: bool = True,
+        max_seq_length: Optional[int] = None,
+    ):
+        if threads > 0:
+            import torch
+
+            torch.set_num_threads(threads)
+        kwargs = {} if backend == "torch" else {"backend": backend}
+        self.model = SentenceTransformer(model_name, device=device, **kwargs)
+        if max_seq_length:
+            self.model.max_seq_length = int(max_seq_length)
+        self.model_name = model_name
+        self.batch_size = int(batch_size)
+        self.normalize = normalize
+        self.dim = int(self.model.get_sentence_embedding_dimension())
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """float32 vectors, one row per text (unit norm when `normalize`)."""
+        vecs = self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=self.normalize,
+            show_progress_bar=False,
+        )
+        return np.asarray(vecs, dtype=np.float32).reshape(len(texts), -1)
@@ -0,0 +1,192 @@
+"""Per-value bitmaps over chunk metadata for pre-filtered retrieval.
+
+Each filterable field maps every value to the set of meta rows carrying it. A
+value is stored as a packed bitmap when that is smaller than its row list (common
+values) and as a sorted int32 row array otherwise (e.g. one `doc_id`), the same
+trade-off roaring bitmaps make per container. A query's filters resolve to one
+boolean row mask: OR across the values of a field, AND across fields.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import faiss
+import numpy as np
+
+DEFAULT_FILTER_FIELDS = ("doc_id", "title", "context")
+
+FilterSpec = Dict[str, Union[str, Sequence[str]]]
+
+_SCALARS = (str, int, float)
+
+
+class FilterError(ValueError):
+    """A filter names an unindexed field or has a value of the wrong type."""
+
+
+class MetadataFilter:
+    def __init__(self, meta: List[Dict[str, Any]], fields: Sequence[str] = DEFAULT_FILTER_FIELDS):
+        self.num_rows = len(meta)
+        self.fields = tuple(fields)
+        self._containers: Dict[str, Dict[str, Tuple[str, np.ndarray]]] = {}
+        for field in self.fields:
+            rows_by_value: Dict[str, List[int]] = {}
+            for row, item in enumerate(meta):
+                value = item.get(field)
+                if value is not None:
+                    rows_by_value.setdefault(str(value), []).append(row)
+            self._containers[field] = {
+                value: self._container(rows) for value, rows in rows_by_value.items()
+            }
+
+    def _container(self, rows: List[int]) -> Tuple[str, np.ndarray]:
+        if len(rows) * 4 > (self.num_rows + 7) // 8:
+            mask = np.zeros(self.num_rows, dtype=bool)
+            mask[rows] = True
+            return "bitmap", np.packbits(mask)
+        return "rows", np.asarray(rows, dtype=np.int32)
+
+    @classmethod
+    def from_config(cls, meta: List[Dict[str, Any]], cfg: Dict[str, Any]) -> "MetadataFilter":
+        fields = (cfg.get("filters", {}) or {}).get("fields") or DEFAULT_FILTER_FIELDS
+        return cls(meta, fields)
+
+    def values(self, field: str) -> List[str]:
+        return sorted(self._containers.get(field, {}))
+
+    def _value_mask(self, field: str, value: str, out: np.ndarray) -> None:
+        container = self._containers[field].get(str(value))
+        if container is None:
+            return
+        kind, data = container
+        if kind == "bitmap":
+            out |= np.unpackbits(data, count=self.num_rows).astype(bool)
+        else:
+            out[data] = True
+
+    def mask(self, filters: Optional[FilterSpec]) -> Optional[np.ndarray]:
+        """Boolean mask over meta rows matching `filters`, or None when nothing is filtered.
+
+        `filters` maps a field to one value or a list of accepted values.
+        Raises FilterError for fields that were not indexed and for other value types.
+        """
+        if not filters:
+            return None
+        unknown = sorted(set(filters) - set(self.fields))
+        if unknown:
+            raise FilterError(f"Unfilterable field(s): {', '.join(unknown)}")
+        result = np.ones(self.num_rows, dtype=bool)
+        for field, accepted in filters.items():
+            if isinstance(accepted, _SCALARS):
+                accepted = [accepted]
+            elif not isinstance(accepted, (list, tuple)) or not all(
+                isinstance(value, _SCALARS) for value in accepted
+            ):
+                raise FilterError(f"Filter {field!r} must be a value or a list of values")
+            field_mask = np.zeros(self.num_rows, dtype=bool)
+            for value in accepted:
+                self._value_mask(field, value, field_mask)
+            result &= field_mask
+        return result
+
+
+def supports_selector(index) -> bool:
+    """Whether `index` can apply an ID selector during search.
+
+    Binary IVF indexes reject one, and HNSW returns no hits at all when the
+    selector excludes most of the graph, so both are filtered by other means.
+    """
+    return not isinstance(index, (faiss.IndexBinary, faiss.IndexHNSW))
+
+
+def search_params(index, mask: np.ndarray):
+    """`faiss.SearchParameters` restricting `index` to the rows set in `mask`.
+
+    The returned object keeps a reference to the packed bitmap, which must outlive
+    the search call.
+    """
+    bits = np.packbits(mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bits))
+    params: Any
+    if isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = index.nprobe
+    else:
+        params = faiss.SearchParameters()
+    params.sel = selector
+    params._bits = bits
+    params._selector = selector
+    return params
+
+
+def post_filter_search(
+    index, query: np.ndarray, mask: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-`k` hits of an unrestricted `index.search` that fall in `mask`.
+
+    Over-fetches in proportion to the filter's selectivity and doubles the fetch
+    until `k` hits pass or the whole index has been searched.
+    """
+    wanted = min(k, int(mask.sum()))
+    fetch = max(k, 2 * k * len(mask) // max(1, int(mask.sum())))
+    while True:
+        fetch = min(fetch, index.ntotal)
+        params = None
+        if isinstance(index, faiss.IndexHNSW):
+            # HNSW returns at most efSearch hits, whatever k is.
+            params = faiss.SearchParametersHNSW()  # type: ignore[attr-defined]
+            params.efSearch = max(fetch, index.hnsw.efSearch)
+        D, indices = index.search(query, fetch, params=params)
+        ids = indices[0]
+        keep = (ids >= 0) & mask[np.maximum(ids, 0)]
+        if keep.sum() >= wanted or fetch >= index.ntotal:
+            return D[0][keep][:k], ids[keep][:k]
+        fetch *= 2
+
+
+def filtered_search(
+    index,
+    vectors: Optional[np.ndarray],
+    query: np.ndarray,
+    mask: np.ndarray,
+    k: int,
+    exact_max_rows: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-`k` (scores, rows) of `index` among the rows set in `mask`.
+
+    Selective filters (at most `exact_max_rows` rows) and indexes without
+    selector support are scored exactly from `vectors`. Otherwise an ID
+    selector restricts the search; without `vectors`, indexes that cannot take a
+    selector are post-filtered.
+    """
+    rows = np.flatnonzero(mask)
+    # Binary indexes would apply the selector to their Hamming pass.
+    selector_ok = supports_selector(getattr(index, "binary_index", index))
+    if vectors is not None and (len(rows) <= exact_max_rows or not selector_ok):
+        return exact_search_rows(vectors, query[0], rows, k)
+    if not selector_ok:
+        return post_filter_search(index, query, mask, k)
+    params = search_params(getattr(index, "binary_index", index), mask)
+    D, indices = index.search(query, k, params=params)
+    return D[0], indices[0]
+
+
+def exact_search_rows(
+    vectors: np.ndarray, query: np.ndarray, rows: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact cosine top-`k` among `rows` of (memory-mapped) `vectors`.
+
+    Used when a filter leaves few rows: scoring them directly is cheaper than an
+    ANN probe that mostly visits excluded vectors, and it cannot under-fill.
+    """
+    rows = np.sort(np.asarray(rows, dtype=np.int64))
+    if len(rows) == 0 or k <= 0:
+        return np.empty(0, dtype="float32"), np.empty(0, dtype=np.int64)
+    cand = np.asarray(vectors[rows], dtype="float32")
+    norms = np.linalg.norm(cand, axis=1)
+    norms[norms == 0] = 1.0
+    query = np.asarray(query, dtype="float32").reshape(-1)
+    scores = cand @ (query / (np.linalg.norm(query) or 1.0)) / norms
+    n = min(k, len(scores))
+    top = np.argpartition(-scores, n - 1)[:n]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return scores[top], rows[top]
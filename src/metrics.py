@@ -0,0 +1,274 @@
+"""In-process metrics rendered in the Prometheus text exposition format (0.0.4).
+
+A deliberately small subset of `prometheus_client`: labelled counters, gauges
+and cumulative histograms held in a process-wide `REGISTRY`, plus collectors
+(callbacks evaluated at scrape time) for values that are cheaper to read than to
+track, such as index sizes. Metric values are updated under a lock, so they are
+safe to record from request threads.
+"""
+
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+LabelValues = Tuple[str, ...]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans sub-millisecond fusion up to multi-second reranking.
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def replace(self, values: Iterable[Tuple[Dict[str, str], float]]) -> None:
+        """Swap in a full set of label -> value pairs (stale label sets disappear)."""
+        fresh = {self._key(labels): float(value) for labels, value in values}
+        with self._lock:
+            self._values = fresh
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (non-cumulative) + overflow, sum]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        slot = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                slot = i
+                break
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[slot] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(c), s[0])) for key, (c, s) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+M = TypeVar("M", bound=_Metric)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: M) -> M:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """`collector()` runs before every render, typically to refresh gauges."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            collector()
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "rag_stage_duration_seconds",
+        "Query latency per pipeline stage (embed, ann, bm25, fusion, rerank, total).",
+        labels=("stage",),
+    )
+)
+QUERIES = REGISTRY.register(
+    Counter("rag_queries_total", "Queries answered by the pipeline.", labels=("collection",))
+)
+QUERY_ERRORS = REGISTRY.register(
+    Counter("rag_query_errors_total", "Queries that raised, by exception type.", labels=("error",))
+)
+CACHE_LOOKUPS = REGISTRY.register(
+    Counter(
+        "rag_cache_lookups_total", "Query cache lookups by outcome.", labels=("cache", "result")
+    )
+)
+CANDIDATES = REGISTRY.register(
+    Counter(
+        "rag_candidates_total",
+        "Retrieved candidates by source (dense, sparse, fused).",
+        labels=("source",),
+    )
+)
+RERANK_DECISIONS = REGISTRY.register(
+    Counter(
+        "rag_rerank_decisions_total",
+        "Adaptive rerank decisions (full, shrink, skip).",
+        labels=("action",),
+    )
+)
+HTTP_REQUESTS = REGISTRY.register(
+    Counter("rag_http_requests_total", "HTTP requests by route and status.", ("route", "status"))
+)
+INDEX_CHUNKS = REGISTRY.register(
+    Gauge("rag_index_chunks", "Chunks in each loaded collection's index.", ("collection",))
+)
+INDEX_BYTES = REGISTRY.register(
+    Gauge(
+        "rag_index_resident_bytes",
+        "Estimated resident size of each loaded collection.",
+        ("collection",),
+    )
+)
+MODEL_BYTES = REGISTRY.register(
+    Gauge("rag_model_memory_bytes", "Parameter memory of loaded reranker models.", ("model",))
+)
+
+# `stats` keys filled by `query_system`, mapped to stage labels.
+_RETRIEVAL_STAGES = (
+    ("embed_ms", "embed"),
+    ("ann_ms", "ann"),
+    ("sparse_ms", "bm25"),
+    ("fusion_ms", "fusion"),
+)
+
+
+def record_query(stats: Dict, collection: str = "default", error: Optional[str] = None) -> None:
+    """Record one query from the `stats` dict `query_system` fills."""
+    if error is not None:
+        QUERY_ERRORS.inc(error=error)
+    else:
+        QUERIES.inc(collection=collection)
+    retrieval = stats.get("retrieval", {})
+    for key, stage in _RETRIEVAL_STAGES:
+        if key in retrieval:
+            STAGE_SECONDS.observe(retrieval[key] / 1000, stage=stage)
+    if stats.get("rerank"):
+        STAGE_SECONDS.observe(sum(s["ms"] for s in stats["rerank"]) / 1000, stage="rerank")
+    if "total_ms" in stats:
+        STAGE_SECONDS.observe(stats["total_ms"] / 1000, stage="total")
+    if "cache" in stats:
+        result = "hit" if stats["cache"]["hit"] else "miss"
+        CACHE_LOOKUPS.inc(cache="semantic", result=result)
+    if "adaptive" in stats:
+        RERANK_DECISIONS.inc(action=stats["adaptive"]["action"])
+    for source, count in stats.get("candidates", {}).items():
+        CANDIDATES.inc(count, source=source)
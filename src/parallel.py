@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """Map a configured worker count to a concrete one (0/None means all cores)."""
+    if not workers or workers < 0:
+        return os.cpu_count() or 1
+    return int(workers)
+
+
+def ingest_settings(cfg: Dict[str, Any]) -> Dict[str, int]:
+    """Read the `ingest` config block shared by the FAISS and BM25 builds."""
+    ingest_cfg = cfg.get("ingest", {}) or {}
+    return {
+        "max_sentences": int(ingest_cfg.get("max_sentences", 3)),
+        "overlap": int(ingest_cfg.get("overlap", 1)),
+        "workers": resolve_workers(ingest_cfg.get("workers", 1)),
+        "batch_size": max(1, int(ingest_cfg.get("batch_size", 64))),
+    }
+
+
+def _apply_batch(func: Callable[[T], R], batch: Sequence[T]) -> List[R]:
+    return [func(item) for item in batch]
+
+
+def parallel_map(
+    func: Callable[[T], R], items: Sequence[T], workers: int = 1, batch_size: int = 64
+) -> List[R]:
+    """Apply `func` to every item, preserving input order.
+
+    Items are grouped into work units of `batch_size` so that inter-process
+    overhead is paid per unit rather than per item. `func` must be picklable
+    (a module-level function or a `functools.partial` of one) when `workers > 1`.
+    """
+    if workers <= 1 or len(items) <= batch_size:
+        return [func(item) for item in items]
+    units = [items[i : i + batch_size] for i in range(0, len(items), batch_size)]
+    results: List[R] = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(units))) as pool:
+        # Executor.map yields in submission order, so output order matches input order.
+        for unit_result in pool.map(partial(_apply_batch, func), units):
+            results.extend(unit_result)
+    return results
@@ -3,112 +3,363 @@ import os
 import json
 import yaml
 import numpy as np
-import faiss
 import logging
 import time
-from typing import Dict, Any, Tuple, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple, List
 from dotenv import load_dotenv
 
-from src.voyage_client import VoyageClient
+from src.adaptive_rerank import adaptive_settings, decide
+from src.embedding_providers import make_embedder
+from src.chunking import chunk_search_text
 from src.cross_encoder_reranker import CrossEncoderReranker
 from src.colbert_reranker import ColBERTReranker
-from src.sparse_retriever import SparseRetriever
-
-
-def load_index(cfg: Dict[str, Any]) -> Tuple[faiss.Index, List[Dict]]:
-    logger = logging.getLogger(__name__)
-    index_path = os.path.join(cfg["index_dir"], "voyage.faiss")
-    meta_path = os.path.join(cfg["index_dir"], "meta.jsonl")
-    index = faiss.read_index(index_path)
-    with open(meta_path, "r") as fh:
-        meta = [json.loads(line) for line in fh]
-    logger.info(f"Index loaded: {cfg['index_dir']} num_chks={len(meta)}")
-    return index, meta
-
-
-def reciprocal_rank_fusion(
-    results_list: List[List[Tuple[str, float]]], k: int = 60
-) -> Dict[str, float]:
-    fused_scores: Dict[str, float] = {}
-    for results in results_list:
-        for i, (doc_id, _score) in enumerate(results):
-            rank = i + 1
-            fused_scores[doc_id] = fused_scores.get(doc_id, 0.0) + 1.0 / (k + rank)
-    return dict(sorted(fused_scores.items(), key=lambda item: item[1], reverse=True))
-
-
-def query_system(query: str, cfg: Dict[str, Any]) -> List[Tuple[float, Dict]]:
-    retrieval_top_m = int(cfg.get("retrieval", {}).get("top_m", 50))
-
-    start_time = time.time()
-    query_embedding = voyage_client.embed([query])[0]
-    D, indices = index.search(np.array([query_embedding]), k=retrieval_top_m)
-    logger.info(f"ANN search took: {(time.time() - start_time) * 1000:.2f} ms")
-
-    dense_results: List[Tuple[str, float]] = []
-    for i in indices[0]:
-        if i != -1:
-            dense_results.append((meta[i]["doc_id"], 1.0))
-
-    sparse_retriever = SparseRetriever(index_dir=cfg["bm25_index_path"])
-    sparse_results = sparse_retriever.search(query, top_k=retrieval_top_m)
-
-    fused_results = reciprocal_rank_fusion([dense_results, sparse_results])
-    fused_doc_ids = list(fused_results.keys())
-
-    all_docs: Dict[str, Dict] = {}
-    for item in meta:
-        if item["doc_id"] not in all_docs:
-            all_docs[item["doc_id"]] = {
-                "doc_id": item["doc_id"],
-                "text": item["text"],
-                "title": item["title"],
-            }
+from src.collection_registry import DEFAULT_COLLECTION, CollectionRegistry, collection_config
+from src import metrics
+from src.fusion import fuse
+from src.index_manager import IndexManager, IndexState, load_index, sparse_rows_for  # noqa: F401
+from src.metadata_filter import FilterSpec, filtered_search
+
+
+def fusion_settings(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """`fusion:` block with defaults; weights are ordered [dense, sparse]."""
+    fusion_cfg = cfg.get("fusion", {}) or {}
+    return {
+        "method": fusion_cfg.get("method", "rrf"),
+        "k": int(fusion_cfg.get("k", 60)),
+        "weights": [float(w) for w in fusion_cfg.get("weights", [1.0, 1.0])],
+        "normalize": fusion_cfg.get("normalize", "minmax"),
+    }
+
+
+def aggregate_by_doc(scored: List[Tuple[float, Dict]]) -> List[Tuple[float, Dict]]:
+    """Keep only the best-scoring chunk of each document (input must be sorted by score)."""
+    seen = set()
+    out: List[Tuple[float, Dict]] = []
+    for score, chunk in scored:
+        if chunk["doc_id"] not in seen:
+            seen.add(chunk["doc_id"])
+            out.append((score, chunk))
+    return out
+
+
+def _finalize(scored: List[Tuple[float, Dict]], cfg: Dict[str, Any], k: int):
+    if (cfg.get("retrieval", {}) or {}).get("aggregate", "chunk") == "doc":
+        scored = aggregate_by_doc(scored)
+    return scored[:k]
 
-    docs_to_rerank: List[Tuple[str, str]] = []
-    for doc_id in fused_doc_ids:
-        if doc_id in all_docs:
-            docs_to_rerank.append((all_docs[doc_id]["doc_id"], all_docs[doc_id]["text"]))
 
+def rerank_stages(cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Reranker stages to run, cheapest first; empty when reranking is disabled.
+
+    `reranker.cascade` lists stages explicitly (each with `type`, `model` and the
+    number of survivors to `keep`). Otherwise a single stage is derived from
+    `reranker.type` or the RERANKER env override, which also bypasses the cascade.
+    """
     reranker_cfg = cfg.get("reranker", {}) or {}
-    reranker_enabled = bool(reranker_cfg.get("enabled", False))
+    if not reranker_cfg.get("enabled", False):
+        return []
     env_choice = os.getenv("RERANKER", "").strip().lower()
-    cfg_choice = reranker_cfg.get("type")
-    choice = env_choice or (cfg_choice or ("crossencoder" if reranker_enabled else "none"))
-
-    if choice == "colbert" and reranker_enabled:
-        reranker_k = int(reranker_cfg.get("reranker_k", 10))
-        colbert_model = reranker_cfg.get("colbert_model", "colbert-ir/colbertv2.0")
-        device = reranker_cfg.get("device") or cfg.get("device") or None
-        passages = [text for (_doc_id, text) in docs_to_rerank]
-        if passages:
-            cb_reranker = ColBERTReranker(model_name=colbert_model, device=device)
-            scores = cb_reranker.score(query, passages)
-            scored = list(zip(scores, [all_docs[doc_id] for (doc_id, _text) in docs_to_rerank]))
-            reranked_chunks: List[Tuple[float, Dict]] = sorted(
-                scored, key=lambda x: x[0], reverse=True
-            )[:reranker_k]
-            final_chunks = reranked_chunks
+    cascade = reranker_cfg.get("cascade") or []
+    if cascade and not env_choice:
+        return [dict(stage) for stage in cascade]
+    choice = env_choice or reranker_cfg.get("type") or "crossencoder"
+    if choice == "colbert":
+        return [
+            {
+                "type": "colbert",
+                "model": reranker_cfg.get("colbert_model", "colbert-ir/colbertv2.0"),
+            }
+        ]
+    if choice == "crossencoder":
+        model = reranker_cfg.get("cross_encoder_model", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+        return [{"type": "crossencoder", "model": model}]
+    return []
+
+
+_rerankers: Dict[Tuple[str, str, Optional[str]], Any] = {}
+
+
+def get_reranker(stage: Dict[str, Any], cfg: Dict[str, Any]):
+    """Load a reranker model once per (type, model, device) and reuse it across queries."""
+    reranker_cfg = cfg.get("reranker", {}) or {}
+    device = stage.get("device") or reranker_cfg.get("device") or cfg.get("device") or None
+    key = (stage["type"], stage["model"], device)
+    if key not in _rerankers:
+        if stage["type"] == "colbert":
+            _rerankers[key] = ColBERTReranker(model_name=stage["model"], device=device)
+        elif stage["type"] == "crossencoder":
+            _rerankers[key] = CrossEncoderReranker(stage["model"])
         else:
-            final_chunks = []
-    elif choice == "crossencoder" and reranker_enabled:
-        reranker_k = int(reranker_cfg.get("reranker_k", 10))
-        cross_encoder_model = reranker_cfg.get(
-            "cross_encoder_model", "cross-encoder/ms-marco-MiniLM-L-6-v2"
+            raise ValueError(f"Unknown reranker type: {stage['type']}")
+    return _rerankers[key]
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def filter_settings(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    filters_cfg = cfg.get("filters", {}) or {}
+    return {"exact_max_rows": int(filters_cfg.get("exact_max_rows", 20000))}
+
+
+def _ann_search(
+    state: IndexState,
+    query_embedding: np.ndarray,
+    top_m: int,
+    row_mask: Optional[np.ndarray],
+    exact_max_rows: int,
+):
+    """FAISS search, restricted to `row_mask` rows when a filter is active.
+
+    Selective filters (at most `exact_max_rows` rows) are scored exactly from the
+    stored vectors; an ID selector inside IVF/HNSW would mostly visit excluded
+    vectors and could return fewer than `top_m` hits.
+    """
+    if row_mask is None:
+        D, indices = state.index.search(query_embedding, k=top_m)
+        return D[0], indices[0]
+    return filtered_search(
+        state.index, state.vectors, query_embedding, row_mask, top_m, exact_max_rows
+    )
+
+
+def _embed_query(state: IndexState, query: str) -> Tuple[np.ndarray, float]:
+    """Query embedding in the index's space (reduced if the index is); returns it and ms."""
+    start = time.perf_counter()
+    query_embedding = voyage_client.embed([query])
+    if state.reducer is not None:
+        query_embedding = state.reducer.apply(query_embedding)
+    return np.asarray(query_embedding, dtype="float32"), _elapsed_ms(start)
+
+
+def _dense_branch(
+    state: IndexState,
+    query_embedding: np.ndarray,
+    top_m: int,
+    row_mask: Optional[np.ndarray] = None,
+    exact_max_rows: int = 0,
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Search FAISS with an embedded query; returns meta rows, scores and elapsed ms."""
+    start = time.perf_counter()
+    D, ids = _ann_search(state, query_embedding, top_m, row_mask, exact_max_rows)
+    found = ids >= 0
+    return ids[found], D[found], _elapsed_ms(start)
+
+
+def _cache_key(cfg: Dict[str, Any]) -> str:
+    """Settings that shape final results; semantic-cache entries only match on equal keys."""
+    settings = {name: cfg.get(name) for name in ("retrieval", "fusion", "reranker")}
+    settings["stages"] = rerank_stages(cfg)
+    return json.dumps(settings, sort_keys=True, default=str)
+
+
+def _sparse_branch(
+    state: IndexState, query: str, top_m: int, row_mask: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    """BM25 search mapped onto meta rows; returns rows, scores and elapsed ms."""
+    start = time.perf_counter()
+    position_mask = None
+    if row_mask is not None:
+        position_mask = (state.sparse_row_map >= 0) & row_mask[state.sparse_row_map]
+    sparse_pos, sparse_scores = state.sparse_retriever.search_ids(
+        query, top_k=top_m, mask=position_mask
+    )
+    sparse_rows = state.sparse_row_map[sparse_pos]
+    known = sparse_rows >= 0
+    return sparse_rows[known], sparse_scores[known], _elapsed_ms(start)
+
+
+def query_system(
+    query: str,
+    cfg: Dict[str, Any],
+    stats: Optional[Dict[str, Any]] = None,
+    filters: Optional[FilterSpec] = None,
+    collection: Optional[str] = None,
+) -> List[Tuple[float, Dict]]:
+    """Hybrid retrieval + reranking for one query.
+
+    Dense (embed + ANN) and sparse (BM25) retrieval run concurrently unless
+    `retrieval.parallel` is false. If `stats` is given it is filled with
+    per-branch retrieval timings, candidate counts and per-rerank-stage latency.
+
+    `filters` (field -> value or list of values) restricts both retrievers to
+    matching chunks before scoring; see `MetadataFilter.mask`. Invalid filters raise
+    FilterError.
+
+    `collection` selects a named collection (default: the top-level index); its
+    config overrides apply on top of `cfg`. Unknown names raise KeyError. The
+    index state is read once up front, so a hot reload mid-query does not mix
+    versions.
+
+    Every query (including failures) is recorded in `src.metrics`; `stats`
+    additionally gets the end-to-end `total_ms`.
+    """
+    stats = stats if stats is not None else {}
+    collection = collection or DEFAULT_COLLECTION
+    start = time.perf_counter()
+    error = None
+    try:
+        return _run_query(query, collection_config(cfg, collection), stats, filters, collection)
+    except Exception as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        stats["total_ms"] = _elapsed_ms(start)
+        metrics.record_query(stats, collection=collection, error=error)
+
+
+def _run_query(
+    query: str,
+    cfg: Dict[str, Any],
+    stats: Dict[str, Any],
+    filters: Optional[FilterSpec],
+    collection: str,
+) -> List[Tuple[float, Dict]]:
+    state = collections.get(collection)
+    retrieval_cfg = cfg.get("retrieval", {}) or {}
+    retrieval_top_m = int(retrieval_cfg.get("top_m", 50))
+
+    row_mask = state.metadata_filter.mask(filters)
+    if row_mask is not None:
+        stats["filter"] = {"fields": sorted(filters), "rows": int(row_mask.sum())}
+        if not row_mask.any():
+            return []
+
+    # Paraphrase hits skip BM25, fusion and reranking; filtered queries always run in full.
+    cache = state.semantic_cache if row_mask is None else None
+    exact_max_rows = filter_settings(cfg)["exact_max_rows"]
+    retrieval_start = time.perf_counter()
+    parallel = retrieval_cfg.get("parallel", True)
+    if parallel:
+        # BM25 does not need the embedding; run it while the embed request is in flight.
+        sparse_future = _retrieval_pool.submit(
+            _sparse_branch, state, query, retrieval_top_m, row_mask
         )
-        passages = [text for (_doc_id, text) in docs_to_rerank]
-        if passages:
-            ce_reranker = CrossEncoderReranker(cross_encoder_model)
-            scores = ce_reranker.score(query, passages)
-            scored = list(zip(scores, [all_docs[doc_id] for (doc_id, _text) in docs_to_rerank]))
-            reranked_chunks = sorted(scored, key=lambda x: x[0], reverse=True)[:reranker_k]
-            final_chunks = reranked_chunks
-        else:
-            final_chunks = []
+    query_embedding, embed_ms = _embed_query(state, query)
+    if cache is not None:
+        cache_key = _cache_key(cfg)
+        cached = cache.lookup(query_embedding[0], cache_key)
+        stats["cache"] = {"hit": cached is not None}
+        if cached is not None:
+            if parallel:
+                sparse_future.cancel()  # frees the worker if BM25 has not started yet
+            stats["cache"]["similarity"] = round(cached[0], 4)
+            stats["retrieval"] = {"embed_ms": embed_ms, "total_ms": _elapsed_ms(retrieval_start)}
+            return cached[1]
+    dense_rows, dense_scores, ann_ms = _dense_branch(
+        state, query_embedding, retrieval_top_m, row_mask, exact_max_rows
+    )
+    if parallel:
+        sparse_rows, sparse_scores, sparse_ms = sparse_future.result()
     else:
-        fallback_top_k = int(cfg.get("retrieval", {}).get("top_k", 20))
-        final_chunks = [(1.0, all_docs[doc_id]) for doc_id in fused_doc_ids[:fallback_top_k]]
+        sparse_rows, sparse_scores, sparse_ms = _sparse_branch(
+            state, query, retrieval_top_m, row_mask
+        )
+    stats["retrieval"] = {
+        "embed_ms": embed_ms,
+        "ann_ms": ann_ms,
+        "dense_ms": round(embed_ms + ann_ms, 2),
+        "sparse_ms": sparse_ms,
+        "total_ms": _elapsed_ms(retrieval_start),
+    }
+    logger.info(
+        "Retrieval took %.2f ms (embed %.2f ms, ANN %.2f ms, BM25 %.2f ms)",
+        stats["retrieval"]["total_ms"],
+        embed_ms,
+        ann_ms,
+        sparse_ms,
+    )
+
+    fusion_start = time.perf_counter()
+    fused_rows, fused_scores = fuse(
+        [dense_rows, sparse_rows],
+        [dense_scores, sparse_scores],
+        top_k=retrieval_top_m,
+        **fusion_settings(cfg),
+    )
+    candidates: List[Dict] = [state.meta[row] for row in fused_rows]
+    stats["retrieval"]["fusion_ms"] = _elapsed_ms(fusion_start)
+    stats["candidates"] = {
+        "dense": len(dense_rows),
+        "sparse": len(sparse_rows),
+        "fused": len(candidates),
+    }
 
+    stages = rerank_stages(cfg)
+    stats["rerank"] = []
+    fallback_top_k = int(cfg.get("retrieval", {}).get("top_k", 20))
+    rerank_top_n = None
+    adaptive = adaptive_settings(cfg)
+    if stages and adaptive["enabled"]:
+        decision = decide(dense_rows, sparse_rows, fused_scores, adaptive)
+        stats["adaptive"] = decision
+        if decision["action"] == "skip":
+            # Same result count as a reranked response, in fused order.
+            stages, fallback_top_k = [], int(cfg["reranker"].get("reranker_k", 10))
+        elif decision["action"] == "shrink":
+            rerank_top_n = decision["top_n"]
+    if not stages:
+        fused = [(float(score), chunk) for score, chunk in zip(fused_scores, candidates)]
+        results = _finalize(fused, cfg, fallback_top_k)
+    else:
+        results = _rerank_cascade(query, candidates, stages, cfg, stats, rerank_top_n)
+    if cache is not None:
+        cache.store(query_embedding[0], results, cache_key)
+    return results
+
+
+def _rerank_cascade(
+    query: str,
+    candidates: List[Dict],
+    stages: List[Dict[str, Any]],
+    cfg: Dict[str, Any],
+    stats: Dict[str, Any],
+    rerank_top_n: Optional[int] = None,
+) -> List[Tuple[float, Dict]]:
+    """Run the reranker stages over fused candidates; returns the final scored chunks.
+
+    `rerank_top_n` overrides `reranker.rerank_top_n` (fused candidates sent to the
+    first stage), e.g. when the adaptive policy shrinks the rerank.
+    """
+    reranker_cfg = cfg.get("reranker", {}) or {}
+    reranker_k = int(reranker_cfg.get("reranker_k", 10))
+    if rerank_top_n is None:
+        rerank_top_n = int(reranker_cfg.get("rerank_top_n", 0) or 0)
+    if rerank_top_n > 0:
+        candidates = candidates[:rerank_top_n]
+    final_chunks: List[Tuple[float, Dict]] = []
+    for stage_no, stage in enumerate(stages):
+        is_last = stage_no == len(stages) - 1
+        stage_start = time.perf_counter()
+        scored: List[Tuple[float, Dict]] = []
+        if candidates:
+            passages = [chunk_search_text(chunk) for chunk in candidates]
+            scores = get_reranker(stage, cfg).score(query, passages)
+            scored = sorted(zip(scores, candidates), key=lambda x: x[0], reverse=True)
+        if is_last:
+            final_chunks = _finalize(scored, cfg, reranker_k)
+            kept = len(final_chunks)
+        else:
+            candidates = [chunk for _score, chunk in scored[: int(stage.get("keep", reranker_k))]]
+            kept = len(candidates)
+        stage_stats = {
+            "type": stage["type"],
+            "model": stage["model"],
+            "candidates": len(scored),
+            "kept": kept,
+            "ms": round((time.perf_counter() - stage_start) * 1000, 2),
+        }
+        stats["rerank"].append(stage_stats)
+        logger.info(
+            "Rerank stage %s (%s): %s -> %s candidates in %.2f ms",
+            stage_no + 1,
+            stage["type"],
+            stage_stats["candidates"],
+            kept,
+            stage_stats["ms"],
+        )
     return final_chunks
 
 
@@ -119,7 +370,37 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-index, meta = load_index(cfg)
-voyage_client = VoyageClient(
-    os.getenv("VOYAGE_API_KEY"), model=cfg.get("embedding", {}).get("model", "voyage-context-3")
-)
+index_manager = IndexManager(cfg)
+index_manager.current()
+collections = CollectionRegistry(cfg, default=index_manager)
+_retrieval_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sparse-retrieval")
+voyage_client = make_embedder(cfg)
+
+
+def model_memory_bytes(reranker) -> int:
+    """Parameter bytes of a loaded reranker's torch model (0 if not loaded yet)."""
+    for attr in ("model", "colbert"):
+        module = getattr(reranker, attr, None)
+        module = module if hasattr(module, "parameters") else getattr(module, "model", None)
+        if hasattr(module, "parameters"):
+            return int(sum(p.numel() * p.element_size() for p in module.parameters()))
+    return 0
+
+
+def _collect_gauges() -> None:
+    loaded = {
+        name: coll for name, coll in collections.metrics()["collections"].items() if coll["loaded"]
+    }
+    metrics.INDEX_BYTES.replace(
+        ({"collection": name}, coll["resident_bytes"]) for name, coll in loaded.items()
+    )
+    metrics.INDEX_CHUNKS.replace(
+        ({"collection": name}, coll["chunks"]) for name, coll in loaded.items()
+    )
+    metrics.MODEL_BYTES.replace(
+        ({"model": f"{kind}:{model}"}, model_memory_bytes(reranker))
+        for (kind, model, _device), reranker in list(_rerankers.items())
+    )
+
+
+metrics.REGISTRY.add_collector(_collect_gauges)
@@ -0,0 +1,138 @@
+"""Opt-in per-request profiling: a structured stage trace and optional cProfile output.
+
+`query_system` already fills a `stats` dict with branch timings, candidate
+counts and per-rerank-stage latency; `stage_trace` turns it into an ordered list
+of stages. `profiled_query` runs one query with that trace and, in `cprofile`
+mode, under `cProfile`, returning the top functions by cumulative time.
+
+cProfile only sees the calling thread: with `retrieval.parallel` the BM25 branch
+runs on a pool thread and shows up as a wait on its future (its own time is in
+the trace). Only one profiler can be active per process, so a request that asks
+for cProfile while another is being profiled gets the stage trace alone.
+
+When `profiling.allow_request` is true (off by default; enable it on trusted
+deployments only), requests opt in with `?profile=1` or the `X-Profile` header
+(`cprofile` adds the profiler output). `profiling.sample_rate` traces a random
+fraction of the rest, whose traces are logged instead of returned.
+"""
+
+import cProfile
+import io
+import pstats
+import random
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+HEADER = "X-Profile"
+MODES = ("trace", "cprofile")
+
+_OFF = {"", "0", "false", "no", "off"}
+_profiler_lock = threading.Lock()
+
+
+def profiling_settings(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    prof_cfg = cfg.get("profiling", {}) or {}
+    return {
+        "allow_request": bool(prof_cfg.get("allow_request", False)),
+        "sample_rate": float(prof_cfg.get("sample_rate", 0.0) or 0.0),
+        "cprofile_top": int(prof_cfg.get("cprofile_top", 30)),
+    }
+
+
+def parse_mode(value: Optional[str]) -> Optional[str]:
+    """Map a `profile` param/header value to a mode: None (off), `trace` or `cprofile`."""
+    if value is None or value.strip().lower() in _OFF:
+        return None
+    return "cprofile" if value.strip().lower() == "cprofile" else "trace"
+
+
+def should_sample(sample_rate: float, rand: Callable[[], float] = random.random) -> bool:
+    return sample_rate > 0 and rand() < sample_rate
+
+
+def stage_trace(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Ordered stage timings and candidate counts from a `query_system` stats dict."""
+    retrieval = stats.get("retrieval", {})
+    candidates = stats.get("candidates", {})
+    stages: List[Dict[str, Any]] = []
+    if "embed_ms" in retrieval:
+        stages.append({"stage": "embed", "ms": retrieval["embed_ms"]})
+    if "ann_ms" in retrieval:
+        stages.append({"stage": "ann", "ms": retrieval["ann_ms"], "out": candidates.get("dense")})
+    if "sparse_ms" in retrieval:
+        stages.append(
+            {"stage": "bm25", "ms": retrieval["sparse_ms"], "out": candidates.get("sparse")}
+        )
+    if "fusion_ms" in retrieval:
+        stages.append(
+            {
+                "stage": "fusion",
+                "ms": retrieval["fusion_ms"],
+                "in": candidates.get("dense", 0) + candidates.get("sparse", 0),
+                "out": candidates.get("fused"),
+            }
+        )
+    for rerank in stats.get("rerank", []):
+        stages.append(
+            {
+                "stage": f"rerank:{rerank['type']}",
+                "model": rerank["model"],
+                "ms": rerank["ms"],
+                "in": rerank["candidates"],
+                "out": rerank["kept"],
+            }
+        )
+    trace: Dict[str, Any] = {
+        "total_ms": stats.get("total_ms"),
+        # Wall time of embed + ANN + BM25; less than their sum when the branches overlap.
+        "retrieval_ms": retrieval.get("total_ms"),
+        "stages": stages,
+    }
+    for key in ("cache", "filter", "adaptive"):
+        if key in stats:
+            trace[key] = stats[key]
+    return trace
+
+
+def profile_call(func: Callable, *args, top: int = 30, **kwargs) -> Tuple[Any, Optional[str]]:
+    """Run `func` under cProfile; returns (result, top functions by cumulative time).
+
+    The text is None if another call is already being profiled.
+    """
+    if not _profiler_lock.acquire(blocking=False):
+        return func(*args, **kwargs), None
+    try:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            profiler.disable()
+    finally:
+        _profiler_lock.release()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+    return result, out.getvalue()
+
+
+def profiled_query(
+    query_func: Callable,
+    query: str,
+    cfg: Dict[str, Any],
+    mode: str = "trace",
+    top: int = 30,
+    **kwargs,
+) -> Tuple[Any, Dict[str, Any]]:
+    """Call `query_func(query, cfg, stats=..., **kwargs)`; returns (results, trace)."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown profile mode {mode!r}; expected one of {MODES}")
+    stats: Dict[str, Any] = {}
+    if mode == "cprofile":
+        results, text = profile_call(query_func, query, cfg, stats=stats, top=top, **kwargs)
+    else:
+        results, text = query_func(query, cfg, stats=stats, **kwargs), None
+    trace = stage_trace(stats)
+    trace["mode"] = mode
+    if mode == "cprofile":
+        trace["cprofile"] = text if text is not None else "skipped: profiler busy"
+    return results, trace
@@ -0,0 +1,138 @@
+"""Query-result cache keyed by embedding similarity instead of exact text.
+
+Paraphrases ("what is colbert" / "explain ColBERT") embed close together, so a
+new query whose embedding is within `threshold` cosine similarity of a cached
+one reuses that query's final (reranked) results. Embeddings live in a small
+flat inner-product FAISS index; entries expire after `ttl_seconds` and the least
+recently hit ones are evicted beyond `max_entries`.
+
+Results are only reused under the same retrieval settings: each entry carries a
+settings key and neighbours with a different key are ignored.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+# Neighbours checked per lookup; the nearest may be expired or cached under other settings.
+_LOOKUP_K = 4
+
+
+def _copy_results(results: List[Tuple[float, Dict]]) -> List[Tuple[float, Dict]]:
+    """Fresh chunk dicts, so callers mutating a response never change later hits."""
+    return [(score, dict(chunk)) for score, chunk in results]
+
+
+def semantic_cache_settings(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    cache_cfg = cfg.get("semantic_cache", {}) or {}
+    return {
+        "enabled": bool(cache_cfg.get("enabled", False)),
+        "threshold": float(cache_cfg.get("threshold", 0.95)),
+        "max_entries": int(cache_cfg.get("max_entries", 1024)),
+        "ttl_seconds": float(cache_cfg.get("ttl_seconds", 3600)),
+    }
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        dim: int,
+        threshold: float = 0.95,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600,
+    ):
+        self.dim = dim
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        # id -> (stored_at, settings key, results); order is least recently hit first.
+        self._entries: "OrderedDict[int, Tuple[float, str, List[Tuple[float, Dict]]]]" = (
+            OrderedDict()
+        )
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any], dim: int) -> Optional["SemanticCache"]:
+        settings = semantic_cache_settings(cfg)
+        if not settings["enabled"]:
+            return None
+        return cls(
+            dim,
+            threshold=settings["threshold"],
+            max_entries=settings["max_entries"],
+            ttl_seconds=settings["ttl_seconds"],
+        )
+
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        vec = np.array(embedding, dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vec)
+        return vec
+
+    def _remove(self, ids: List[int]) -> None:
+        for entry_id in ids:
+            del self._entries[entry_id]
+        self._index.remove_ids(faiss.IDSelectorBatch(np.asarray(ids, dtype="int64")))
+
+    def lookup(
+        self, embedding: np.ndarray, key: str = ""
+    ) -> Optional[Tuple[float, List[Tuple[float, Dict]]]]:
+        """(similarity, cached results) of the closest live entry above the threshold."""
+        vec = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            hit, expired = None, []
+            if self._index.ntotal:
+                sims, ids = self._index.search(vec, min(_LOOKUP_K, self._index.ntotal))
+                for sim, entry_id in zip(sims[0], ids[0].tolist()):
+                    if entry_id < 0 or sim < self.threshold:
+                        break
+                    stored_at, entry_key, _results = self._entries[entry_id]
+                    if now - stored_at > self.ttl_seconds:
+                        expired.append(entry_id)
+                    elif entry_key == key:
+                        hit = float(sim), entry_id
+                        break
+            if expired:
+                self._counts["expirations"] += len(expired)
+                self._remove(expired)
+            if hit is None:
+                self._counts["misses"] += 1
+                return None
+            self._counts["hits"] += 1
+            self._entries.move_to_end(hit[1])
+            return hit[0], _copy_results(self._entries[hit[1]][2])
+
+    def store(
+        self, embedding: np.ndarray, results: List[Tuple[float, Dict]], key: str = ""
+    ) -> None:
+        vec = self._normalize(embedding)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vec, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = (time.time(), key, _copy_results(results))
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                self._counts["evictions"] += overflow
+                self._remove(list(self._entries)[:overflow])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index.reset()
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"]
+            return {
+                **self._counts,
+                "entries": len(self._entries),
+                "hit_rate": round(self._counts["hits"] / lookups, 4) if lookups else 0.0,
+            }
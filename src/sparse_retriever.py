@@ -1,55 +1,111 @@
 import pickle
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.bm25_wand import BM25WandIndex
+from src.tokenizer import Vocabulary
+
+
+def whitespace_tokenize(text: str) -> List[str]:
+    """Tokenizer of BM25 indexes built before `src.tokenizer` (no saved vocabulary)."""
+    return text.split(" ")
+
+
+BM25_ENGINES = ("wand", "exhaustive")
+
+
+def top_k_positions(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Positions of the `top_k` highest scores > 0, ties broken by lower position."""
+    n = min(top_k, len(scores))
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    kth = scores[np.argpartition(-scores, n - 1)[:n]].min()
+    cand = np.flatnonzero(scores >= kth)
+    top = cand[np.lexsort((cand, -scores[cand]))][:n]
+    return top[scores[top] > 0]
 
 
 class SparseRetriever:
-    def __init__(self, index_dir: str):
+    def __init__(self, index_dir: str, engine: str = "exhaustive"):
         """
         Initializes the SparseRetriever by loading a saved BM25 index.
 
         Args:
             index_dir: Path to the directory containing the BM25 index files.
+            engine: `exhaustive` scores every document with `get_scores`; `wand`
+                builds an inverted index and prunes with Block-Max WAND (same results).
         """
+        if engine not in BM25_ENGINES:
+            raise ValueError(f"Unknown BM25 engine: {engine}")
         self.index_dir = Path(index_dir)
+        self.engine = engine
         self._load_index()
+        self.wand = BM25WandIndex.from_bm25(self.bm25) if engine == "wand" else None
 
     def _load_index(self):
-        """Loads the BM25 index and doc IDs from pickle files."""
+        """Loads the BM25 index and its chunk IDs (doc IDs for older builds) from pickle files."""
         index_path = self.index_dir / "bm25_index.pkl"
         with open(index_path, "rb") as f:
             self.bm25 = pickle.load(f)
 
-        ids_path = self.index_dir / "bm25_doc_ids.pkl"
+        ids_path = self.index_dir / "bm25_chunk_ids.pkl"
+        if not ids_path.exists():
+            ids_path = self.index_dir / "bm25_doc_ids.pkl"
         with open(ids_path, "rb") as f:
-            self.doc_ids = pickle.load(f)
+            self.chunk_ids = pickle.load(f)
 
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        # Indexes built with src.tokenizer store int token ids plus the tokenizer settings.
+        self.tokenizer, self.vocab = Vocabulary.load(str(self.index_dir)) or (None, None)
+
+    def tokenize(self, query: str) -> List:
+        """Query terms exactly as the index was built (token ids, or raw strings for old builds)."""
+        if self.vocab is None:
+            return whitespace_tokenize(query)
+        return self.vocab.encode(self.tokenizer.tokenize(query))
+
+    def search_ids(
+        self, query: str, top_k: int = 5, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Performs a BM25 search for a given query.
+        Performs a BM25 search and returns positions in the BM25 corpus.
 
         Args:
             query: The search query string.
             top_k: The number of top results to return.
+            mask: Optional boolean array over corpus positions; only set positions
+                are scored and returned.
 
         Returns:
-            A list of tuples, where each tuple contains a doc_id and its BM25 score.
+            (indices, scores) arrays, best first, restricted to scores > 0.
         """
-        # Simple whitespace tokenizer for the query
-        tokenized_query = query.split(" ")
-
-        # Get scores for all documents
-        doc_scores = self.bm25.get_scores(tokenized_query)
+        tokenized_query = self.tokenize(query)
+        if self.wand is not None:
+            return self.wand.search(tokenized_query, top_k, mask=mask)
+        if mask is None:
+            doc_scores = np.asarray(self.bm25.get_scores(tokenized_query))
+            top = top_k_positions(doc_scores, top_k)
+            return top, doc_scores[top]
+        positions = np.flatnonzero(mask)
+        if len(positions) * 4 < len(mask):
+            # Few survivors: score only those instead of the whole corpus.
+            doc_scores = np.asarray(self.bm25.get_batch_scores(tokenized_query, positions.tolist()))
+        else:
+            doc_scores = np.asarray(self.bm25.get_scores(tokenized_query))[positions]
+        top = top_k_positions(doc_scores, top_k)
+        return positions[top], doc_scores[top]
 
-        # Get the top k results
-        top_n_indices = sorted(range(len(doc_scores)), key=lambda i: doc_scores[i], reverse=True)[
-            :top_k
-        ]
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Performs a BM25 search for a given query.
 
-        results = []
-        for i in top_n_indices:
-            # Only include results with a score > 0
-            if doc_scores[i] > 0:
-                results.append((self.doc_ids[i], doc_scores[i]))
+        Args:
+            query: The search query string.
+            top_k: The number of top results to return.
 
-        return results
+        Returns:
+            A list of tuples, where each tuple contains a chunk_id and its BM25 score.
+        """
+        indices, scores = self.search_ids(query, top_k)
+        return [(self.chunk_ids[i], float(score)) for i, score in zip(indices, scores)]
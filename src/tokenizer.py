@@ -0,0 +1,130 @@
+"""Shared BM25 tokenizer and persisted integer vocabulary.
+
+Build and query must tokenize identically, so the tokenizer settings are saved
+next to the vocabulary and restored from there at query time (config only
+affects new builds).
+"""
+
+import json
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+VOCAB_NAME = "bm25_vocab.json"
+STEMMERS = ("none", "light", "snowball")
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def light_stem(token: str) -> str:
+    """English plural stripping (Harman's S-stemmer): cheap and conservative."""
+    if len(token) > 3 and token.endswith("ies") and not token.endswith(("eies", "aies")):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("es") and not token.endswith(("aes", "ees", "oes")):
+        return token[:-1]
+    if len(token) > 2 and token.endswith("s") and not token.endswith(("us", "ss")):
+        return token[:-1]
+    return token
+
+
+def _snowball_stem() -> Callable[[str], str]:
+    try:
+        import snowballstemmer
+    except ImportError as exc:
+        raise ImportError(
+            "bm25.tokenizer.stemmer=snowball requires `pip install snowballstemmer`"
+        ) from exc
+    return snowballstemmer.stemmer("english").stemWord
+
+
+class Tokenizer:
+    """NFKC-normalize, optionally lowercase, split on word characters, optionally stem.
+
+    Punctuation never ends up inside a token, so "FAISS," and "faiss" are the same
+    term. Stemming goes through an LRU cache: token frequencies are Zipfian, so a
+    small cache absorbs nearly all calls.
+    """
+
+    def __init__(self, lowercase: bool = True, stemmer: str = "none", cache_size: int = 100_000):
+        if stemmer not in STEMMERS:
+            raise ValueError(f"Unknown stemmer: {stemmer}")
+        self.lowercase = lowercase
+        self.stemmer = stemmer
+        self.cache_size = cache_size
+        self._stem: Optional[Callable[[str], str]] = None
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> "Tokenizer":
+        tok_cfg = (cfg.get("bm25", {}) or {}).get("tokenizer", {}) or {}
+        return cls(
+            lowercase=bool(tok_cfg.get("lowercase", True)),
+            stemmer=tok_cfg.get("stemmer", "none"),
+        )
+
+    def settings(self) -> Dict[str, Any]:
+        return {"lowercase": self.lowercase, "stemmer": self.stemmer}
+
+    def __getstate__(self):
+        # The cached stem function is rebuilt lazily in worker processes.
+        return {**self.__dict__, "_stem": None}
+
+    def _stem_fn(self) -> Callable[[str], str]:
+        if self._stem is None:
+            base = light_stem if self.stemmer == "light" else _snowball_stem()
+            self._stem = lru_cache(maxsize=self.cache_size)(base)
+        return self._stem
+
+    def tokenize(self, text: str) -> List[str]:
+        text = unicodedata.normalize("NFKC", text)
+        if self.lowercase:
+            text = text.casefold()
+        tokens = _TOKEN_RE.findall(text)
+        if self.stemmer != "none":
+            stem = self._stem_fn()
+            tokens = [stem(token) for token in tokens]
+        return tokens
+
+
+class Vocabulary:
+    """Token <-> integer id mapping; ids are assigned in first-seen order."""
+
+    def __init__(self, tokens: Sequence[str] = ()):
+        self.tokens: List[str] = list(tokens)
+        self.ids: Dict[str, int] = {token: i for i, token in enumerate(self.tokens)}
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    @classmethod
+    def build(cls, tokenized_docs: Iterable[Sequence[str]]) -> "Vocabulary":
+        vocab = cls()
+        for tokens in tokenized_docs:
+            for token in tokens:
+                if token not in vocab.ids:
+                    vocab.ids[token] = len(vocab.tokens)
+                    vocab.tokens.append(token)
+        return vocab
+
+    def encode(self, tokens: Sequence[str]) -> List[int]:
+        """Map tokens to ids, dropping tokens outside the vocabulary."""
+        ids = self.ids
+        return [ids[token] for token in tokens if token in ids]
+
+    def save(self, index_dir: str, tokenizer: Tokenizer) -> str:
+        path = os.path.join(index_dir, VOCAB_NAME)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump({"tokenizer": tokenizer.settings(), "tokens": self.tokens}, fh)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional[Tuple[Tokenizer, "Vocabulary"]]:
+        """Tokenizer and vocabulary saved with a BM25 index, or None for older builds."""
+        path = os.path.join(index_dir, VOCAB_NAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as fh:
+            payload = json.load(fh)
+        return Tokenizer(**payload["tokenizer"]), cls(payload["tokens"])
@@ -1,7 +1,95 @@
+import json
+import os
+import pickle
 import sys
 from pathlib import Path
 
+import pytest
+
 # Ensure project root is importable so tests can import `src` and root modules
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def build_tiny_index():
+    """Publish a version holding a flat FAISS index and BM25, one chunk per text."""
+    import faiss
+    import numpy as np
+    from rank_bm25 import BM25Okapi
+
+    from src.index_versions import BM25_DIR, begin_build, finish_build
+
+    versioned = {"versioning": {"enabled": True, "keep": 2}}
+
+    def build(index_root, texts, seed=0):
+        chunks = [
+            {"doc_id": f"d{i}", "chunk_id": f"d{i}::0", "title": f"t{i}", "text": text}
+            for i, text in enumerate(texts)
+        ]
+        out_dir, version = begin_build(index_root, versioned)
+        vecs = np.random.default_rng(seed).standard_normal((len(texts), 8)).astype("float32")
+        index = faiss.IndexFlatIP(8)
+        index.add(vecs)
+        faiss.write_index(index, os.path.join(out_dir, "voyage.faiss"))
+        with open(os.path.join(out_dir, "meta.jsonl"), "w") as fh:
+            fh.writelines(json.dumps(chunk) + "\n" for chunk in chunks)
+
+        bm25_dir = os.path.join(out_dir, BM25_DIR)
+        os.makedirs(bm25_dir)
+        with open(os.path.join(bm25_dir, "bm25_index.pkl"), "wb") as fh:
+            pickle.dump(BM25Okapi([text.split() for text in texts]), fh)
+        with open(os.path.join(bm25_dir, "bm25_chunk_ids.pkl"), "wb") as fh:
+            pickle.dump([chunk["chunk_id"] for chunk in chunks], fh)
+        finish_build(index_root, version, versioned, {"kind": "faiss"})
+
+    return build
+
+
+@pytest.fixture(scope="session")
+def pipeline(tmp_path_factory):
+    """`src.pipeline` imported over a tiny stub-embedded corpus (index version, config.yaml).
+
+    The module loads config.yaml from the working directory and its reranker
+    imports need sentence-transformers and ColBERT, so tests skip without them.
+    """
+    pytest.importorskip("sentence_transformers")
+    pytest.importorskip("colbert")
+    import yaml
+
+    from src import index_build
+
+    root = tmp_path_factory.mktemp("pipeline")
+    docs = [
+        ("bm25", "BM25 ranks documents by term frequency. It saturates repeated terms."),
+        ("faiss", "FAISS searches dense vectors. It supports flat and IVF indexes."),
+        ("rrf", "Reciprocal rank fusion merges ranked lists. It needs no score calibration."),
+        ("colbert", "ColBERT scores late interactions. Each query token finds its best match."),
+        ("chunks", "Documents are split into chunks. Chunks overlap by a sentence."),
+        ("cache", "A semantic cache reuses results. Paraphrases hit the same entry."),
+    ]
+    with open(root / "docs.jsonl", "w") as fh:
+        for doc_id, text in docs:
+            fh.write(json.dumps({"doc_id": doc_id, "title": doc_id, "text": text}) + "\n")
+    cfg = {
+        "index_dir": str(root / "index"),
+        "bm25_index_path": str(root / "index_bm25"),
+        "data_path": str(root / "docs.jsonl"),
+        "versioning": {"enabled": True, "keep": 2, "watch_seconds": 0},
+        "bm25": {"engine": "exhaustive"},
+        "embedding": {"provider": "stub", "dim": 16},
+        "ingest": {"max_sentences": 1, "overlap": 0},
+        "faiss": {"type": "flat"},
+        "retrieval": {"top_m": 20, "top_k": 8},
+        "reranker": {"enabled": False},
+    }
+    index_build.main(cfg, str(root))  # a versioned build includes BM25
+    with open(root / "config.yaml", "w") as fh:
+        yaml.safe_dump(cfg, fh)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(root)
+        from src import pipeline
+
+    return pipeline
@@ -0,0 +1,37 @@
+from src.adaptive_rerank import adaptive_settings, decide, evaluate_policy
+
+
+def _settings(**overrides):
+    cfg = {"reranker": {"adaptive": {"enabled": True, "overlap_k": 4, **overrides}}}
+    return adaptive_settings(cfg)
+
+
+def test_decide_uses_overlap_and_margin():
+    dense, sparse = [1, 2, 3, 4, 9], [2, 1, 4, 7, 8]  # 3 of the top 4 shared
+    close, clear = [0.50, 0.49], [0.50, 0.20]
+    settings = _settings(skip_overlap=0.9, shrink_overlap=0.5, shrink_top_n=15)
+    assert decide(dense, sparse, close, settings) == {
+        "action": "shrink",
+        "overlap": 0.75,
+        "margin": 0.02,
+        "top_n": 15,
+    }
+    assert decide(dense, sparse, close, _settings(skip_overlap=0.75))["action"] == "skip"
+    assert decide(dense, sparse, clear, _settings(skip_margin=0.5))["action"] == "skip"
+    assert decide(dense, sparse, clear, _settings())["action"] == "full"  # all rules off
+
+
+def test_evaluate_policy_trades_agreement_for_saved_time():
+    records = [
+        {"overlap": 0.9, "margin": 0.1, "full_ms": 10.0, "skip": 1.0, "shrink": {}},
+        {"overlap": 0.6, "margin": 0.1, "full_ms": 10.0, "skip": 0.5, "shrink": {5: {}}},
+        {"overlap": 0.1, "margin": 0.1, "full_ms": 20.0, "skip": 0.2, "shrink": {}},
+    ]
+    records[1]["shrink"][5] = {"agreement": 0.9, "ms": 2.0}
+    report = evaluate_policy(
+        records, _settings(skip_overlap=0.8, shrink_overlap=0.5, shrink_top_n=5)
+    )
+    assert report["actions"] == {"full": 0.3333, "shrink": 0.3333, "skip": 0.3333}
+    assert report["mean_agreement"] == round((1.0 + 0.9 + 1.0) / 3, 4)
+    assert report["rerank_ms"] == 22.0 and report["saved_fraction"] == 0.45
+    assert evaluate_policy(records, _settings())["saved_fraction"] == 0.0
@@ -0,0 +1,79 @@
+import json
+import threading
+from types import SimpleNamespace
+
+from src.agentic_rag import AgenticRAG, is_near_duplicate
+
+
+class StubClient:
+    """Decomposes into fixed sub-questions (after `wait_for`, if given) and answers "ok"."""
+
+    def __init__(self, sub_questions, wait_for=None):
+        self.sub_questions = sub_questions
+        self.wait_for = wait_for
+        self.overlapped = None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        if "response_format" in kwargs:
+            if self.wait_for is not None:
+                self.overlapped = self.wait_for.wait(timeout=5)
+            content = json.dumps({"questions": self.sub_questions})
+        else:
+            content = "ok"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _retriever(calls, started=None):
+    def query_func(query, cfg):
+        calls.append(query)
+        if started is not None:
+            started.set()
+        return [(1.0, {"doc_id": query, "chunk_id": f"{query}::0", "text": query})]
+
+    return query_func
+
+
+def test_near_duplicate():
+    assert is_near_duplicate("what is  BM25?", "What is BM25", 0.0)
+    assert is_near_duplicate("What is the BM25 formula", "What is BM25 formula?", 0.8)
+    assert not is_near_duplicate("What is FAISS?", "What is BM25?", 0.8)
+
+
+def test_original_query_retrieved_during_decomposition():
+    calls, started = [], threading.Event()
+    query = "Compare BM25 and FAISS"
+    client = StubClient(["compare bm25 and faiss?", "What is BM25?"], wait_for=started)
+    agent = AgenticRAG({}, query_func=_retriever(calls, started), client=client)
+
+    result = agent.run(query)
+
+    assert client.overlapped is True
+    # The repeat of the original question is not retrieved a second time.
+    assert calls == [query, "What is BM25?"]
+    assert [c["doc_id"] for c in result["retrieved_contexts"]] == [query, "What is BM25?"]
+    assert result["final_answer"] == "ok"
+
+
+def test_speculative_retrieval_can_be_disabled():
+    calls = []
+    cfg = {"agentic": {"speculative_retrieval": False}}
+    client = StubClient(["Compare BM25 and FAISS", "What is BM25?"])
+    AgenticRAG(cfg, query_func=_retriever(calls), client=client).run("Compare BM25 and FAISS")
+    assert calls == ["Compare BM25 and FAISS", "What is BM25?"]
+
+
+def test_unparseable_decomposition_is_not_cached():
+    calls = []
+    client = StubClient(["What is BM25?"])
+    agent = AgenticRAG(
+        {"llm_cache": {"enabled": True}}, query_func=_retriever(calls), client=client
+    )
+    client.sub_questions = None  # {"questions": null}: no list to parse
+
+    assert agent.decompose_query("Explain BM25?") == ["Explain BM25?"]
+    client.sub_questions = ["What is BM25?"]
+    assert agent.decompose_query("explain bm25") == ["What is BM25?"]
+    # The good reply is cached for every variant of the question.
+    client.sub_questions = ["changed"]
+    assert agent.decompose_query("Explain  BM25!") == ["What is BM25?"]
@@ -1,7 +1,10 @@
 import json
+import time
+from types import SimpleNamespace
 from typing import List, Tuple, Dict
 
 from apps.api import create_app
+from src.metadata_filter import FilterError
 
 
 def test_health_endpoint():
@@ -32,3 +35,130 @@ def test_search_endpoint_mocked():
     assert "results" in payload
     assert len(payload["results"]) == 2
     assert payload["results"][0]["doc_id"] == "d1"
+
+
+def test_search_endpoint_passes_filters():
+    seen = {}
+
+    def query_func(q, cfg, filters=None):
+        if "bogus" in filters:
+            raise FilterError("Unfilterable field(s): bogus")
+        seen["filters"] = filters
+        return []
+
+    client = create_app(query_func=query_func).test_client()
+    resp = client.post("/search", json={"query": "test", "filters": {"doc_id": ["d1"]}})
+    assert resp.status_code == 200
+    assert seen["filters"] == {"doc_id": ["d1"]}
+
+    resp = client.post("/search", json={"query": "test", "filters": {"bogus": "x"}})
+    assert resp.status_code == 400
+    resp = client.post("/search", json={"query": "test", "filters": ["d1"]})
+    assert resp.status_code == 400
+
+
+def test_search_endpoint_only_maps_filter_errors_to_400():
+    def query_func(q, cfg, filters=None):
+        raise ValueError("bug in the pipeline")
+
+    app = create_app(query_func=query_func)
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+    resp = app.test_client().post("/search", json={"query": "q", "filters": {"doc_id": "d1"}})
+    assert resp.status_code == 500
+
+
+class StubStreamingLLM:
+    """Chat completions stand-in: slow JSON decomposition, streamed answer in three deltas."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, stream=False, **kwargs):
+        ns = SimpleNamespace
+        if "response_format" in kwargs:
+            time.sleep(0.1)  # retrieval for the original query finishes first
+            content = json.dumps({"questions": ["What is BM25?"]})
+            return ns(choices=[ns(message=ns(content=content))])
+        assert stream
+        return iter(ns(choices=[ns(delta=ns(content=t))]) for t in ["BM25 ", "ranks ", "terms."])
+
+
+def _sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_answer_endpoint_streams_retrieval_then_tokens():
+    from src.agentic_rag import AgenticRAG
+
+    def query_func(q, cfg):
+        return [(1.0, {"doc_id": q, "chunk_id": f"{q}::0", "title": "T", "text": q})]
+
+    agent = AgenticRAG({}, query_func=query_func, client=StubStreamingLLM())
+    client = create_app(query_func=query_func, agent=agent).test_client()
+
+    resp = client.post("/answer", json={"query": "Explain BM25"})
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream" and resp.is_streamed
+    events = _sse_events(resp.get_data(as_text=True))
+    assert [e for e, _ in events] == [
+        "retrieval",
+        "sub_queries",
+        "retrieval",
+        "token",
+        "token",
+        "token",
+        "done",
+    ]
+    assert events[0][1]["query"] == "Explain BM25"
+    assert events[0][1]["results"][0]["doc_id"] == "Explain BM25"
+    assert events[1][1] == ["What is BM25?"]
+    assert events[-1][1] == {"answer": "BM25 ranks terms.", "contexts": 2}
+
+    assert client.get("/answer").status_code == 400
+
+
+def _answer_client(query_func=None, llm=None, cfg=None):
+    from src.agentic_rag import AgenticRAG
+
+    def default_query_func(q, cfg):
+        return [(1.0, {"doc_id": q, "chunk_id": f"{q}::0", "title": "T", "text": q})]
+
+    query_func = query_func or default_query_func
+    agent = AgenticRAG(cfg or {}, query_func=query_func, client=llm or StubStreamingLLM())
+    return create_app(query_func=query_func, agent=agent).test_client()
+
+
+def test_answer_endpoint_emits_error_event_when_retrieval_fails():
+    def query_func(q, cfg):
+        raise RuntimeError("index unavailable")
+
+    resp = _answer_client(query_func=query_func).post("/answer", json={"query": "Explain BM25"})
+    events = _sse_events(resp.get_data(as_text=True))
+    assert events[-1] == ("error", {"error": "index unavailable"})
+    assert "token" not in [e for e, _ in events]
+
+
+def test_answer_endpoint_emits_error_event_when_synthesis_fails():
+    class FailingLLM(StubStreamingLLM):
+        def create(self, model, messages, stream=False, **kwargs):
+            if stream:
+                raise RuntimeError("rate limited")
+            return super().create(model, messages, **kwargs)
+
+    resp = _answer_client(llm=FailingLLM()).post("/answer", json={"query": "Explain BM25"})
+    events = [e for e, _ in _sse_events(resp.get_data(as_text=True))]
+    assert events[-1] == "error" and "retrieval" in events and "token" not in events
+
+
+def test_answer_endpoint_cached_answer_is_one_token_event():
+    cfg = {"llm_cache": {"enabled": True, "synthesis": True}}
+    client = _answer_client(cfg=cfg)
+    first = _sse_events(client.post("/answer", json={"query": "Explain BM25"}).get_data(True))
+    again = _sse_events(client.post("/answer", json={"query": "Explain BM25"}).get_data(True))
+    assert [e for e, _ in first].count("token") == 3
+    assert [d for e, d in again if e == "token"] == [{"text": "BM25 ranks terms."}]
+    assert again[-1] == first[-1] == ("done", {"answer": "BM25 ranks terms.", "contexts": 2})
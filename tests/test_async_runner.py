@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+from eval.async_runner import AsyncJudge, JudgmentCache, evaluate_questions
+
+
+class StubOpenAI:
+    """Stands in for `AsyncOpenAI`: replies "8" (or queued `replies`) after a short delay."""
+
+    def __init__(self, replies=()):
+        self.replies = list(replies)
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        message = SimpleNamespace(content=self.replies.pop(0) if self.replies else "8")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _answer(question):
+    return [f"context for {question}", "shared context"], f"answer to {question}"
+
+
+def _run(questions, cache, client, concurrency=3):
+    async def go():
+        judge = AsyncJudge(model="judge", cache=cache, concurrency=concurrency, client=client)
+        return await evaluate_questions(_answer, questions, judge, app_concurrency=2), judge
+
+    return asyncio.run(go())
+
+
+def test_bounded_concurrency_and_in_order_results(tmp_path):
+    client = StubOpenAI()
+    questions = [f"q{i}" for i in range(6)]
+    results, judge = _run(questions, JudgmentCache(str(tmp_path / "j.db")), client)
+
+    assert [r["question"] for r in results] == questions
+    assert results[0]["metrics"] == {
+        "groundedness": 0.8,
+        "context_relevance_avg": 0.8,
+        "answer_relevance": 0.8,
+    }
+    assert client.max_in_flight == 3
+    # Per question: groundedness, answer relevance and two context relevances
+    # (relevance prompts include the question, so the shared context is judged each time).
+    assert client.calls == 6 * 4 and judge.stats["cache_hits"] == 0
+
+
+def test_cache_persists_across_runs(tmp_path):
+    path = str(tmp_path / "j.db")
+    first = StubOpenAI()
+    _run(["q"], JudgmentCache(path), first)
+    second = StubOpenAI()
+    results, judge = _run(["q"], JudgmentCache(path), second)
+    assert second.calls == 0 and judge.stats["cache_hits"] == first.calls
+    assert results[0]["metrics"]["groundedness"] == 0.8
+    assert len(JudgmentCache(path)) == first.calls
+
+
+def test_identical_prompts_in_flight_share_one_request():
+    client = StubOpenAI()
+
+    async def go():
+        judge = AsyncJudge(model="judge", client=client)
+        scores = await asyncio.gather(*(judge.relevance("q", "t") for _ in range(5)))
+        return scores, judge
+
+    scores, judge = asyncio.run(go())
+    assert scores == [0.8] * 5
+    assert client.calls == 1 and judge.stats["deduplicated"] == 4
+
+
+def test_replies_without_a_score_are_not_cached(tmp_path):
+    path = str(tmp_path / "j.db")
+
+    async def relevance(client):
+        judge = AsyncJudge(model="judge", cache=JudgmentCache(path), client=client)
+        return await judge.relevance("q", "t")
+
+    first = StubOpenAI(replies=["", "The score"])
+    assert asyncio.run(relevance(first)) == 0.0 and len(JudgmentCache(path)) == 0
+    assert asyncio.run(relevance(first)) == 0.0 and first.calls == 2
+    second = StubOpenAI()
+    assert asyncio.run(relevance(second)) == 0.8 and second.calls == 1
+    assert len(JudgmentCache(path)) == 1
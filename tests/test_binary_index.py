@@ -0,0 +1,28 @@
+import os
+
+import numpy as np
+
+from src.binary_index import BINARY_INDEX_NAME, binarize, load_binary_index
+from src.index_build import build_faiss
+
+
+def test_binarize_packs_sign_bits():
+    vecs = np.array([[1, -1, 2, -3, 0.5, 0.5, -0.1, 4]], dtype="float32")
+    assert binarize(vecs).tolist() == [[0b10101101]]
+
+
+def test_binary_index_rescoring_finds_exact_match(tmp_path):
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((500, 64)).astype("float32")
+    idx_dir = str(tmp_path / "idx")
+    os.makedirs(idx_dir)
+    np.save(os.path.join(idx_dir, "vectors.npy"), vecs)
+    cfg = {"type": "binary_flat", "rescore_factor": 20}
+    build_faiss(idx_dir, vecs, cfg)
+    assert os.path.exists(os.path.join(idx_dir, BINARY_INDEX_NAME))
+
+    index = load_binary_index(idx_dir, cfg)
+    scores, ids = index.search(vecs[[3, 42]] * 2.0, 5)
+    assert ids[:, 0].tolist() == [3, 42]
+    np.testing.assert_allclose(scores[:, 0], 1.0, rtol=1e-5)
+    assert np.all(np.diff(scores, axis=1) <= 0)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from src.bm25_wand import BM25WandIndex
+from src.sparse_retriever import top_k_positions
+
+
+def synthetic_corpus(num_docs, vocab, doc_len, seed=0):
+    """Docs of Zipf-distributed tokens, so a few terms are common and most are rare."""
+    rng = np.random.default_rng(seed)
+    ranks = np.arange(1, vocab + 1)
+    probs = (1.0 / ranks) / (1.0 / ranks).sum()
+    lengths = rng.integers(doc_len // 2, doc_len * 3 // 2, num_docs)
+    tokens = rng.choice(vocab, size=int(lengths.sum()), p=probs)
+    corpus, start = [], 0
+    for length in lengths:
+        corpus.append([f"t{t}" for t in tokens[start : start + length]])
+        start += length
+    return corpus
+
+
+def sample_queries(corpus, num_queries, terms, seed=1):
+    """Queries drawn from document text, so they mix common and rare terms."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for doc in rng.choice(len(corpus), num_queries):
+        doc_tokens = corpus[doc]
+        picks = rng.choice(len(doc_tokens), min(terms, len(doc_tokens)), replace=False)
+        queries.append([doc_tokens[i] for i in picks])
+    return queries
+
+
+@pytest.fixture(scope="module")
+def corpus_and_index():
+    corpus = synthetic_corpus(num_docs=3000, vocab=2000, doc_len=30)
+    bm25 = BM25Okapi(corpus)
+    return corpus, bm25, BM25WandIndex.from_bm25(bm25, block_size=16)
+
+
+@pytest.mark.parametrize("terms,top_k", [(2, 5), (6, 50), (12, 10)])
+def test_matches_exhaustive_scoring(corpus_and_index, terms, top_k):
+    corpus, bm25, wand = corpus_and_index
+    queries = sample_queries(corpus, 25, terms, seed=terms)
+    queries.append(queries[0] + queries[0][:1] + ["unknown-term"])  # repeated + OOV tokens
+    for query in queries:
+        scores = np.asarray(bm25.get_scores(query))
+        expected = top_k_positions(scores, top_k)
+        ids, wand_scores = wand.search(query, top_k)
+        assert ids.tolist() == expected.tolist()
+        assert wand_scores.tolist() == scores[expected].tolist()
+
+
+def test_mask_restricts_results(corpus_and_index):
+    corpus, bm25, wand = corpus_and_index
+    mask = np.random.default_rng(0).random(len(corpus)) < 0.1
+    for query in sample_queries(corpus, 10, 5):
+        scores = np.where(mask, np.asarray(bm25.get_scores(query)), 0.0)
+        ids, _ = wand.search(query, 20, mask=mask)
+        assert ids.tolist() == top_k_positions(scores, 20).tolist()
@@ -0,0 +1,32 @@
+import json
+
+from scripts import build_bm25_index
+from src.sparse_retriever import SparseRetriever
+
+
+def test_bm25_rows_map_to_chunk_ids(tmp_path):
+    docs = [
+        {"doc_id": "a", "title": "A", "text": "Alpha opens. Bravo follows. Charlie closes."},
+        {"doc_id": "b", "title": "B", "text": "Delta starts. Echo ends."},
+    ]
+    with open(tmp_path / "docs.jsonl", "w") as fh:
+        fh.writelines(json.dumps(doc) + "\n" for doc in docs)
+    cfg = {
+        "data_path": str(tmp_path / "docs.jsonl"),
+        "bm25_index_path": str(tmp_path / "index_bm25"),
+        "ingest": {"max_sentences": 1, "overlap": 0},
+    }
+
+    build_bm25_index.main(cfg, str(tmp_path))
+
+    retriever = SparseRetriever(index_dir=cfg["bm25_index_path"])
+    assert retriever.chunk_ids == [
+        "a::chunk_0000",
+        "a::chunk_0001",
+        "a::chunk_0002",
+        "b::chunk_0000",
+        "b::chunk_0001",
+    ]
+    # A term from one sentence scores that chunk, not the document's first chunk.
+    assert retriever.search("charlie", top_k=1)[0][0] == "a::chunk_0002"
+    assert retriever.search("echo", top_k=1)[0][0] == "b::chunk_0001"
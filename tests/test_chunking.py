@@ -1,4 +1,4 @@
-from src.chunking import simple_sentence_split, make_chunks_with_context
+from src.chunking import chunk_documents, simple_sentence_split, make_chunks_with_context
 
 
 def test_simple_sentence_split_basic():
@@ -19,3 +19,14 @@ def test_make_chunks_with_context_sliding_window():
     assert chunks[0]["doc_id"] == "d1"
     assert chunks[0]["title"] == "T"
     assert chunks[0]["text"].startswith("One")
+
+
+def test_chunk_documents_parallel_matches_serial():
+    docs = [
+        {"doc_id": f"d{i}", "title": f"T{i}", "text": " ".join(f"S{j}." for j in range(i % 7 + 1))}
+        for i in range(40)
+    ]
+    serial = chunk_documents(docs, max_sentences=2, overlap=1, workers=1)
+    parallel = chunk_documents(docs, max_sentences=2, overlap=1, workers=2, batch_size=3)
+    assert parallel == serial
+    assert serial[0]["chunk_id"] == "d0::chunk_0000"
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from apps.api import create_app
+from src.collection_registry import CollectionRegistry, collection_config
+
+
+def _cfg(tmp_path, budget_mb=0):
+    return {
+        "index_dir": str(tmp_path / "index"),
+        "bm25_index_path": str(tmp_path / "index_bm25"),
+        "collections": {
+            "root": str(tmp_path / "collections"),
+            "memory_budget_mb": budget_mb,
+            "items": {"a": {}, "b": {"faiss": {"type": "flat"}}},
+        },
+    }
+
+
+def test_collection_config_defaults_and_overrides(tmp_path):
+    cfg = _cfg(tmp_path)
+    assert collection_config(cfg, None) is cfg
+    assert collection_config(cfg, "default") is cfg
+    b = collection_config(cfg, "b")
+    assert b["index_dir"] == str(tmp_path / "collections" / "b" / "index")
+    assert b["faiss"] == {"type": "flat"}
+    with pytest.raises(KeyError):
+        collection_config(cfg, "missing")
+    cfg["collections"]["items"]["c"] = {"embedding": {"model": "other"}}
+    with pytest.raises(ValueError):
+        collection_config(cfg, "c")
+
+
+def test_lazy_load_and_lru_eviction(tmp_path, build_tiny_index):
+    cfg = _cfg(tmp_path)
+    for name in ("a", "b"):
+        sub = collection_config(cfg, name)
+        build_tiny_index(sub["index_dir"], [f"{name} alpha", "beta"])
+    registry = CollectionRegistry(cfg)
+    assert not registry.metrics()["collections"]["a"]["loaded"]
+
+    state_a = registry.get("a")
+    assert [m["text"] for m in state_a.meta] == ["a alpha", "beta"]
+    metrics = registry.metrics()["collections"]["a"]
+    assert metrics["loaded"] and metrics["loads"] == 1 and metrics["resident_bytes"] > 0
+
+    # Budget fits one collection: loading b evicts a, which reloads on demand.
+    registry.budget_bytes = state_a.resident_bytes + 1
+    registry.get("b")
+    metrics = registry.metrics()["collections"]
+    assert not metrics["a"]["loaded"] and metrics["a"]["evictions"] == 1
+    assert metrics["b"]["loaded"]
+    assert [m["text"] for m in state_a.meta] == ["a alpha", "beta"]  # old reference still usable
+
+    # Victims are unloaded after the registry lock is released.
+    unload_b = registry._managers["b"].unload
+    locked_during_unload = []
+
+    def unload():
+        locked_during_unload.append(registry._lock.locked())
+        unload_b()
+
+    registry._managers["b"].unload = unload
+    registry.get("a")
+    metrics = registry.metrics()["collections"]
+    assert metrics["a"]["loads"] == 2 and not metrics["b"]["loaded"]
+    assert locked_during_unload == [False]
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_collection_search_endpoint():
+    seen = {}
+
+    def query_func(q, cfg, collection=None, filters=None):
+        if collection == "b":
+            raise KeyError("chunk_id")  # a pipeline bug, not an unknown collection
+        seen["collection"] = collection
+        return [(1.0, {"doc_id": "d1", "chunk_id": "d1::0", "title": "T", "text": "x"})]
+
+    class Registry:
+        def names(self):
+            return ["default", "a", "b"]
+
+        def metrics(self):
+            return {"collections": {"a": {"loaded": True}}}
+
+    app = create_app(query_func=query_func, collections=Registry())
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+    client = app.test_client()
+    resp = client.post(
+        "/collections/a/search", data=json.dumps({"query": "q"}), content_type="application/json"
+    )
+    assert resp.status_code == 200
+    assert seen["collection"] == "a"
+    assert resp.get_json()["results"][0]["chunk_id"] == "d1::0"
+    assert client.post("/collections/missing/search", json={"query": "q"}).status_code == 404
+    assert client.post("/collections/b/search", json={"query": "q"}).status_code == 500
+    assert client.get("/collections").get_json() == {"collections": {"a": {"loaded": True}}}
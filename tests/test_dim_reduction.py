@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from src.dim_reduction import DimReducer, train_reducer
+from src.index_build import build_faiss
+
+
+@pytest.mark.parametrize("method", ["pca", "truncate"])
+def test_reducer_roundtrip_applies_identically(tmp_path, method):
+    vecs = np.random.default_rng(0).standard_normal((300, 32)).astype("float32")
+    reducer = train_reducer(vecs, {"embedding": {"reduction": {"method": method, "dim": 8}}})
+    reducer.save(str(tmp_path))
+
+    loaded = DimReducer.load(str(tmp_path))
+    assert (loaded.method, loaded.in_dim, loaded.out_dim) == (method, 32, 8)
+    np.testing.assert_allclose(loaded.apply(vecs[:5]), reducer.apply(vecs[:5]), rtol=1e-5)
+
+
+def test_no_reducer_configured():
+    vecs = np.zeros((10, 16), dtype="float32")
+    assert train_reducer(vecs, {"embedding": {"dim": 16}}) is None
+    assert DimReducer.load("/nonexistent") is None
+
+
+def _project(reducer, vecs):
+    """The reducer's linear map without normalization."""
+    return reducer.pca.apply(vecs) if reducer.method == "pca" else vecs[:, : reducer.out_dim]
+
+
+def _cosine_topk(queries, vecs, k):
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    vecs = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+    return np.argsort(-(queries @ vecs.T), axis=1)[:, :k]
+
+
+@pytest.mark.parametrize("method", ["pca", "truncate"])
+def test_flat_index_over_reduced_vectors_matches_exact_cosine(tmp_path, method):
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((2000, 32)).astype("float32")
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    queries = vecs[:50] + 0.1 * rng.standard_normal((50, 32)).astype("float32")
+    reducer = train_reducer(vecs, {"embedding": {"reduction": {"method": method, "dim": 8}}})
+
+    index = build_faiss(str(tmp_path), reducer.apply(vecs), {"type": "flat"})
+    _, served = index.search(reducer.apply(queries), 10)
+
+    exact = _cosine_topk(_project(reducer, queries), _project(reducer, vecs), 10)
+    recall = np.mean([len(set(s) & set(e)) / 10 for s, e in zip(served, exact)])
+    assert recall >= 0.99
@@ -0,0 +1,111 @@
+import json
+import pickle
+
+import faiss
+import numpy as np
+
+from src import distributed_build as dist
+
+
+class HashEmbedder:
+    calls = 0
+
+    def embed(self, texts):
+        HashEmbedder.calls += 1
+        rows = []
+        for t in texts:
+            rng = np.random.default_rng(sum(t.encode("utf-8")))
+            rows.append(rng.standard_normal(8))
+        return np.array(rows, dtype="float32")
+
+
+def _corpus(tmp_path, num_docs=30, faiss_cfg=None):
+    data_path = tmp_path / "docs.jsonl"
+    with open(data_path, "w") as fh:
+        for i in range(num_docs):
+            text = " ".join(f"Doc {i} sentence {j}." for j in range(i % 5 + 1))
+            fh.write(json.dumps({"doc_id": f"d{i:03d}", "title": f"T{i}", "text": text}) + "\n")
+    return {
+        "data_path": str(data_path),
+        "index_dir": str(tmp_path / "index"),
+        "embedding": {"model": "stub", "batch_size": 4},
+        "faiss": faiss_cfg or {"type": "flat"},
+        "distributed": {"num_shards": 3},
+    }
+
+
+def _run_phases(cfg, root):
+    plan = dist.run_plan(cfg, root)
+    for spec in plan["shards"]:
+        dist.run_embed_shard(cfg, root, spec["shard"])
+    dist.run_train(cfg, root)
+    for spec in plan["shards"]:
+        dist.run_add_shard(cfg, root, spec["shard"])
+    return dist.run_merge(cfg, root)
+
+
+def test_distributed_phases_merge_in_corpus_order(tmp_path, monkeypatch):
+    cfg = {**_corpus(tmp_path), "versioning": {"enabled": True}}
+    monkeypatch.setattr(dist, "make_embedder", lambda cfg: HashEmbedder())
+
+    index_dir = _run_phases(cfg, str(tmp_path))
+
+    with open(f"{index_dir}/meta.jsonl") as fh:
+        meta = [json.loads(line) for line in fh]
+    assert [m["doc_id"] for m in meta] == sorted(m["doc_id"] for m in meta)
+    assert len({m["doc_id"] for m in meta}) == 30
+    index = faiss.read_index(f"{index_dir}/voyage.faiss")
+    vectors = np.load(f"{index_dir}/vectors.npy")
+    assert index.ntotal == len(meta) == len(vectors)
+    # Row i of the merged index is chunk i of the metadata.
+    _, ids = index.search(vectors[7:8], 1)
+    assert ids[0][0] == 7
+    # BM25 over the merged chunks is published in the same version.
+    with open(f"{index_dir}/bm25/bm25_chunk_ids.pkl", "rb") as fh:
+        assert pickle.load(fh) == [m["chunk_id"] for m in meta]
+    assert not (tmp_path / "index" / ".build_work").exists()
+
+
+def test_ivf_shards_merge_with_contiguous_ids(tmp_path, monkeypatch):
+    cfg = _corpus(tmp_path, faiss_cfg={"type": "ivf_pq", "nlist": 2, "m": 2, "nbits": 4})
+    monkeypatch.setattr(dist, "make_embedder", lambda cfg: HashEmbedder())
+
+    index_dir = _run_phases(cfg, str(tmp_path))
+
+    index = faiss.read_index(f"{index_dir}/voyage.faiss")
+    vectors = np.load(f"{index_dir}/vectors.npy")
+    ivf = faiss.extract_index_ivf(index)
+    assert isinstance(index, faiss.IndexIVFPQ) and index.ntotal == len(vectors)
+    # Every row is listed once, in the inverted list its (normalized) vector assigns to.
+    normalized = vectors.copy()
+    faiss.normalize_L2(normalized)
+    _, assigned = ivf.quantizer.search(normalized, 1)
+    seen = []
+    for list_no in range(ivf.nlist):
+        size = ivf.invlists.list_size(list_no)
+        ids = faiss.rev_swig_ptr(ivf.invlists.get_ids(list_no), size).tolist()
+        assert all(assigned[i][0] == list_no for i in ids)
+        seen.extend(ids)
+    assert sorted(seen) == list(range(len(vectors)))
+
+
+def test_stale_shard_output_is_re_embedded(tmp_path, monkeypatch):
+    cfg = {**_corpus(tmp_path), "distributed": {"num_shards": 1, "keep_work_dir": True}}
+    monkeypatch.setattr(dist, "make_embedder", lambda cfg: HashEmbedder())
+    root = str(tmp_path)
+
+    dist.run_plan(cfg, root)
+    HashEmbedder.calls = 0
+    first = dist.run_embed_shard(cfg, root, 0)
+    embedded = HashEmbedder.calls
+    assert dist.run_embed_shard(cfg, root, 0) == first and HashEmbedder.calls == embedded
+
+    # Another embedding model invalidates the shard.
+    other_model = {**cfg, "embedding": {**cfg["embedding"], "model": "other"}}
+    dist.run_embed_shard(other_model, root, 0)
+    assert HashEmbedder.calls == 2 * embedded
+
+    # So does a new corpus, even when the shard layout could match.
+    _corpus(tmp_path, num_docs=10)
+    dist.run_plan(cfg, root)
+    assert dist.run_embed_shard(cfg, root, 0) < first
@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.embed_checkpoint import embed_with_checkpoints
+
+
+class FlakyEmbedder:
+    def __init__(self, fail_on_call=None):
+        self.calls = 0
+        self.fail_on_call = fail_on_call
+
+    def embed(self, texts):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("simulated API error")
+        return np.array([[float(len(t)), float(t.count("x"))] for t in texts], dtype="float32")
+
+
+def test_embed_resumes_from_last_completed_segment(tmp_path):
+    texts = [f"chunk {'x' * i}" for i in range(25)]
+    chunk_ids = [f"d::chunk_{i:04d}" for i in range(25)]
+    ckpt_dir = str(tmp_path / "ckpt")
+
+    flaky = FlakyEmbedder(fail_on_call=5)
+    with pytest.raises(RuntimeError):
+        embed_with_checkpoints(
+            flaky.embed, texts, chunk_ids, ckpt_dir, "m", batch_size=2, segment_size=4
+        )
+    manifest = json.loads((tmp_path / "ckpt" / "manifest.json").read_text())
+    # Calls 1-4 produced two full segments (8 chunks); the fifth call died.
+    assert [s["end"] for s in manifest["segments"]] == [4, 8]
+    assert manifest["segments"][1]["first_chunk_id"] == "d::chunk_0004"
+
+    resumed = FlakyEmbedder()
+    vecs = embed_with_checkpoints(
+        resumed.embed, texts, chunk_ids, ckpt_dir, "m", batch_size=2, segment_size=4
+    )
+    assert resumed.calls == 9  # ceil(17 remaining / 2)
+    np.testing.assert_array_equal(vecs, FlakyEmbedder().embed(texts))
+
+
+def test_embed_checkpoint_discarded_when_corpus_changes(tmp_path):
+    ckpt_dir = str(tmp_path / "ckpt")
+    texts = ["a", "b", "c", "d"]
+    ids = ["1", "2", "3", "4"]
+    embed_with_checkpoints(FlakyEmbedder().embed, texts, ids, ckpt_dir, "m", 2, 2)
+
+    changed = FlakyEmbedder()
+    vecs = embed_with_checkpoints(changed.embed, ["a", "b", "c", "dx"], ids, ckpt_dir, "m", 2, 2)
+    assert changed.calls == 2
+    assert vecs[3, 1] == 1.0
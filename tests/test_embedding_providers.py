@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from src.embedding_providers import StubEmbedder, embedding_model_id, make_embedder
+from src.voyage_client import VoyageClient
+
+
+def test_stub_embedder_is_deterministic_and_shares_words():
+    emb = make_embedder({"embedding": {"provider": "stub", "dim": 64}})
+    assert isinstance(emb, StubEmbedder)
+    a, b, c = emb.embed(["FAISS ivf index", "faiss IVF", "colbert late interaction"])
+    assert np.allclose(np.linalg.norm([a, b, c], axis=1), 1.0)
+    assert a @ b > a @ c
+    assert np.array_equal(StubEmbedder(dim=64).embed(["FAISS ivf index"])[0], a)
+
+
+def test_provider_selection():
+    emb = make_embedder({"embedding": {"provider": "voyage", "model": "voyage-2"}})
+    assert isinstance(emb, VoyageClient) and emb.model == "voyage-2"
+    with pytest.raises(ValueError):
+        make_embedder({"embedding": {"provider": "nope"}})
+
+
+def test_model_id_is_provider_qualified():
+    local = {"embedding": {"provider": "local", "model": "voyage-2", "local": {"model": "m"}}}
+    assert embedding_model_id(local) == "local:m"
+    assert embedding_model_id({"embedding": {"provider": "voyage", "model": "voyage-2"}}) == (
+        "voyage-2"
+    )
+    assert embedding_model_id({"embedding": {"provider": "stub", "dim": 64}}) == "stub:64:0"
+
+
+def test_local_provider_batches_through_sentence_transformers(monkeypatch):
+    pytest.importorskip("sentence_transformers")
+    import src.local_embedder as local_embedder
+
+    class FakeModel:
+        def __init__(self, name, device=None):
+            self.name = name
+
+        def get_sentence_embedding_dimension(self):
+            return 8
+
+        def encode(self, texts, batch_size, **kwargs):
+            self.batch_size = batch_size
+            return np.ones((len(texts), 8))
+
+    monkeypatch.setattr(local_embedder, "SentenceTransformer", FakeModel)
+    cfg = {"embedding": {"provider": "local", "local": {"model": "m", "batch_size": 4}}}
+    emb = make_embedder(cfg)
+    out = emb.embed(["a", "b", "c"])
+    assert out.shape == (3, 8) and out.dtype == np.float32
+    assert emb.model.name == "m" and emb.model.batch_size == 4
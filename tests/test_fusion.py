@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from src.fusion import fuse
+
+
+def dict_rrf(results_list, k=60):
+    """The pipeline's previous fusion: dict accumulate, then sort everything."""
+    fused_scores = {}
+    for results in results_list:
+        for i, (doc_id, _score) in enumerate(results):
+            fused_scores[doc_id] = fused_scores.get(doc_id, 0.0) + 1.0 / (k + i + 1)
+    return dict(sorted(fused_scores.items(), key=lambda item: item[1], reverse=True))
+
+
+def ranked_lists(corpus_size, candidates, retrievers, seed=0):
+    """Lists that share a hot head of ids so fusion sees realistic overlap."""
+    rng = np.random.default_rng(seed)
+    hot = rng.choice(corpus_size, candidates, replace=False)
+    lists = []
+    for _ in range(retrievers):
+        pool = np.concatenate([hot, rng.choice(corpus_size, candidates, replace=False)])
+        ids = rng.permutation(np.unique(pool))[:candidates]
+        lists.append((ids.astype(np.int64), np.sort(rng.random(candidates))[::-1]))
+    return lists
+
+
+def test_rrf_matches_dict_fusion_order():
+    lists = ranked_lists(corpus_size=5000, candidates=1200, retrievers=3)
+    id_lists = [ids for ids, _ in lists]
+    expected = dict_rrf([[(int(i), 0.0) for i in ids] for ids in id_lists])
+
+    ids, scores = fuse(id_lists)
+    assert ids.tolist() == list(expected)
+    np.testing.assert_allclose(scores, list(expected.values()))
+
+    top_ids, _ = fuse(id_lists, top_k=50)
+    assert top_ids.tolist() == list(expected)[:50]
+
+
+def test_weights_and_missing_ids():
+    dense = np.array([1, 2, -1])
+    sparse = np.array([2, 3])
+    ids, scores = fuse([dense, sparse], weights=[2.0, 1.0], k=0)
+    assert ids.tolist() == [1, 2, 3]
+    np.testing.assert_allclose(scores, [2.0, 1.0 + 1.0, 0.5])
+
+
+def test_combsum_and_combmnz():
+    ids_a, scores_a = np.array([10, 11, 12]), np.array([0.9, 0.5, 0.1])
+    ids_b, scores_b = np.array([12, 13]), np.array([30.0, 10.0])
+    ids, scores = fuse([ids_a, ids_b], [scores_a, scores_b], method="combsum")
+    assert ids.tolist() == [10, 12, 11, 13]
+    np.testing.assert_allclose(scores, [1.0, 1.0, 0.5, 0.0])
+
+    ids, _ = fuse([ids_a, ids_b], [scores_a, scores_b], method="combmnz")
+    assert ids[0] == 12
+
+    with pytest.raises(ValueError):
+        fuse([ids_a], method="combsum")
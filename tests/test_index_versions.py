@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+
+from src.index_manager import IndexManager
+from src.bm25_build import rebuild_bm25_version
+from src.index_versions import (
+    BM25_DIR,
+    CURRENT_NAME,
+    abort_build,
+    begin_build,
+    finish_build,
+    list_versions,
+    read_current,
+    read_manifest,
+    resolve_index_dir,
+    version_dir,
+)
+
+VERSIONED = {"versioning": {"enabled": True, "keep": 2}}
+
+
+def test_publish_resolve_and_prune(tmp_path):
+    root = str(tmp_path)
+    # No CURRENT: the root itself is the (flat) index directory.
+    assert resolve_index_dir(root) == root
+    out_dir, version = begin_build(root, {})
+    assert (out_dir, version) == (root, None)
+
+    published = []
+    for i in range(3):
+        out_dir, version = begin_build(root, VERSIONED)
+        with open(os.path.join(out_dir, "voyage.faiss"), "wb") as fh:
+            fh.write(b"x" * i)
+        # Unpublished versions are invisible to readers.
+        assert version not in list_versions(root)
+        finish_build(root, version, VERSIONED, {"kind": "faiss"})
+        published.append(version)
+        assert read_current(root) == version
+
+    assert list_versions(root) == published[-2:]
+    manifest = read_manifest(resolve_index_dir(root))
+    assert manifest["version"] == published[-1]
+    assert manifest["files"] == {"voyage.faiss": 2}
+    assert not os.path.exists(os.path.join(root, CURRENT_NAME + ".tmp"))
+
+
+def test_unpublished_versions_are_cleaned_up(tmp_path):
+    root = str(tmp_path)
+    _, failed = begin_build(root, VERSIONED)
+    abort_build(root, failed)
+    assert not os.path.exists(version_dir(root, failed))
+
+    # A build killed before publishing leaves a directory without a manifest.
+    _, crashed = begin_build(root, VERSIONED)
+    versions = []
+    for _ in range(2):
+        assert os.path.isdir(version_dir(root, crashed))
+        _, version = begin_build(root, VERSIONED)
+        finish_build(root, version, VERSIONED, {"kind": "faiss"})
+        versions.append(version)
+    # Pruned once `keep` newer versions are published; a newer, running build is kept.
+    assert not os.path.exists(version_dir(root, crashed))
+    _, running = begin_build(root, VERSIONED)
+    _, version = begin_build(root, VERSIONED)
+    finish_build(root, version, VERSIONED, {"kind": "faiss"})
+    assert os.path.isdir(version_dir(root, running))
+    assert list_versions(root) == [versions[-1], version]
+
+
+def test_manager_swaps_state_and_keeps_old_one_usable(tmp_path, build_tiny_index):
+    index_root = str(tmp_path / "index")
+    cfg = {"index_dir": index_root, "bm25_index_path": str(tmp_path / "bm25"), **VERSIONED}
+    build_tiny_index(index_root, ["alpha beta", "beta gamma", "gamma delta"], seed=0)
+
+    manager = IndexManager(cfg)
+    old = manager.current()
+    assert manager.reload_if_changed() is False
+
+    build_tiny_index(index_root, ["epsilon zeta", "zeta eta", "eta theta", "theta iota"], 1)
+    assert manager.reload_if_changed() is True
+    new = manager.current()
+    assert new is not old
+    assert new.version == manager.pointer()
+    # Dense and BM25 come from the same version, so every BM25 row maps to a chunk.
+    assert new.bm25_dir == os.path.join(resolve_index_dir(index_root), BM25_DIR)
+    assert len(new.meta) == 4 and (new.sparse_row_map >= 0).all()
+
+    # A request holding the old state still completes against the old version.
+    positions, _ = old.sparse_retriever.search_ids("alpha", top_k=2)
+    assert [old.meta[old.sparse_row_map[p]]["text"] for p in positions] == ["alpha beta"]
+    assert old.index.search(np.ones((1, 8), dtype="float32"), 3)[1].shape == (1, 3)
+
+    # A broken publish is logged and the current state keeps serving.
+    with open(os.path.join(index_root, CURRENT_NAME), "w") as fh:
+        fh.write("missing\n")
+    assert manager.reload_if_changed() is False
+    assert manager.current() is new
+
+
+def test_bm25_rebuild_publishes_a_version_with_the_current_dense_files(tmp_path, build_tiny_index):
+    index_root = str(tmp_path / "index")
+    cfg = {"index_dir": index_root, "bm25_index_path": str(tmp_path / "bm25"), **VERSIONED}
+    build_tiny_index(index_root, ["alpha beta", "beta gamma", "gamma delta"])
+    dense_version = read_current(index_root)
+    manager = IndexManager(cfg)
+    old = manager.current()
+
+    out_dir = rebuild_bm25_version(index_root, cfg)
+
+    assert read_current(index_root) != dense_version
+    manifest = read_manifest(out_dir)
+    assert manifest["dense_version"] == dense_version and manifest["bm25"]["num_chunks"] == 3
+    assert "bm25/bm25_index.pkl" in manifest["files"]
+    old_faiss = os.path.join(version_dir(index_root, dense_version), "voyage.faiss")
+    assert os.path.samefile(os.path.join(out_dir, "voyage.faiss"), old_faiss)
+
+    assert manager.reload_if_changed() is True
+    new = manager.current()
+    assert new.meta == old.meta and new.sparse_row_map.tolist() == [0, 1, 2]
+    positions, _ = new.sparse_retriever.search_ids("gamma delta", top_k=1)
+    assert new.meta[new.sparse_row_map[positions[0]]]["text"] == "gamma delta"
@@ -0,0 +1,30 @@
+import json
+import math
+from pathlib import Path
+
+import pytest
+
+from eval.ir_metrics import evaluate_ranking, load_qrels, mean_metrics, ndcg_at_k
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_metrics_on_a_graded_ranking():
+    relevant = {"a": 2, "b": 1, "z": 0}
+    metrics = evaluate_ranking(["x", "b", "a", "z"], relevant, [1, 3])
+    assert metrics["mrr@3"] == 0.5
+    assert metrics["recall@1"] == 0.0 and metrics["recall@3"] == 1.0
+    dcg = 1 / math.log2(3) + 3 / math.log2(4)
+    assert metrics["ndcg@3"] == pytest.approx(dcg / (3 + 1 / math.log2(3)))
+    assert ndcg_at_k(["a", "b"], relevant, 2) == 1.0
+    assert mean_metrics([{"m": 1.0}, {"m": 0.0}]) == {"m": 0.5}
+
+
+def test_shipped_qrels_reference_corpus_docs():
+    qrels = load_qrels(str(ROOT / "eval" / "qrels.jsonl"))
+    with open(ROOT / "data" / "sample_docs.jsonl") as fh:
+        doc_ids = {json.loads(line)["doc_id"] for line in fh if line.strip()}
+    assert len({q["qid"] for q in qrels}) == len(qrels) >= 40
+    for item in qrels:
+        assert item["query"] and set(item["relevant"]) <= doc_ids
+        assert max(item["relevant"].values()) == 2
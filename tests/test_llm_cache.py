@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+from src.llm_cache import LLMCache, llm_cache_settings, request_key
+
+
+class StubClient:
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=f"reply {self.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _messages(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_request_key_covers_model_prompt_and_params():
+    key = request_key("m", _messages("q"), temperature=0.0)
+    assert key == request_key("m", _messages("q"), temperature=0.0)
+    assert key != request_key("m", _messages("q"), temperature=0.1)
+    assert key != request_key("other", _messages("q"), temperature=0.0)
+    assert key != request_key("m", _messages("q2"), temperature=0.0)
+
+
+def test_lru_eviction_and_metrics():
+    cache = LLMCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"  # "b" is now least recently used
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.metrics() == {
+        "hits": 3,
+        "disk_hits": 0,
+        "misses": 1,
+        "evictions": 1,
+        "entries": 2,
+        "hit_rate": 0.75,
+    }
+
+
+def test_disk_entries_survive_restart_and_expire(tmp_path, monkeypatch):
+    path = str(tmp_path / "llm.sqlite")
+    LLMCache(path=path).put("k", "stored")
+    reopened = LLMCache(path=path, ttl_seconds=60)
+    assert reopened.get("k") == "stored"
+    assert reopened.metrics()["disk_hits"] == 1
+
+    import src.llm_cache as llm_cache
+
+    later = llm_cache.time.time() + 120
+    monkeypatch.setattr(llm_cache.time, "time", lambda: later)
+    assert LLMCache(path=path, ttl_seconds=60).get("k") is None
+
+
+def test_complete_calls_client_once_per_key():
+    cache, client = LLMCache(), StubClient()
+    first = cache.complete(client, "m", _messages("Q?"), temperature=0.0)
+    again = cache.complete(client, "m", _messages("Q?"), temperature=0.0)
+    assert first == again == "reply 1" and client.calls == 1
+
+    # Requests hashed under the same key_messages share the entry.
+    shared = cache.complete(
+        client, "m", _messages("q"), key_messages=_messages("Q?"), temperature=0.0
+    )
+    assert shared == "reply 1" and client.calls == 1
+
+
+def test_complete_stores_only_accepted_replies():
+    cache, client = LLMCache(), StubClient()
+    assert cache.complete(client, "m", _messages("q"), accept=lambda r: False) == "reply 1"
+    assert cache.complete(client, "m", _messages("q"), accept=lambda r: True) == "reply 2"
+    assert cache.complete(client, "m", _messages("q")) == "reply 2" and client.calls == 2
+
+
+def test_disabled_by_default():
+    assert llm_cache_settings({})["enabled"] is False
+    assert LLMCache.from_config({}) is None
+    assert LLMCache.from_config({"llm_cache": {"enabled": True}}) is not None
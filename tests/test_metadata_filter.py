@@ -0,0 +1,109 @@
+import faiss
+import numpy as np
+import pytest
+
+from src.binary_index import BinaryRescoreIndex, binarize
+from src.metadata_filter import (
+    MetadataFilter,
+    exact_search_rows,
+    filtered_search,
+    search_params,
+)
+
+
+def _meta(n_docs=50, chunks_per_doc=4):
+    return [
+        {"doc_id": f"d{d}", "title": "even" if d % 2 == 0 else "odd", "chunk_id": f"d{d}::{c}"}
+        for d in range(n_docs)
+        for c in range(chunks_per_doc)
+    ]
+
+
+def test_mask_or_within_field_and_across_fields():
+    meta = _meta()
+    mf = MetadataFilter(meta, fields=["doc_id", "title"])
+    assert mf.mask(None) is None
+
+    mask = mf.mask({"doc_id": ["d1", "d2", "d3"], "title": "odd"})
+    expected = [m["doc_id"] in ("d1", "d3") for m in meta]
+    assert mask.tolist() == expected
+    assert mf.mask({"title": ["even", "odd"]}).all()
+    assert not mf.mask({"doc_id": "missing"}).any()
+    with pytest.raises(ValueError):
+        mf.mask({"text": "x"})
+
+
+@pytest.mark.parametrize("value", [None, {"d1": 1}, ["d1", None], [["d1"]]])
+def test_mask_rejects_non_scalar_values(value):
+    with pytest.raises(ValueError):
+        MetadataFilter(_meta(), fields=["doc_id"]).mask({"doc_id": value})
+
+
+def test_selector_and_exact_search_agree_with_brute_force():
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((200, 16)).astype("float32")
+    faiss.normalize_L2(vecs)
+    mask = np.zeros(200, dtype=bool)
+    mask[rng.choice(200, 30, replace=False)] = True
+    query = rng.standard_normal((1, 16)).astype("float32")
+    faiss.normalize_L2(query)
+
+    allowed = np.flatnonzero(mask)
+    truth = allowed[np.argsort(-(vecs[allowed] @ query[0]), kind="stable")][:5]
+
+    _, rows = exact_search_rows(vecs, query[0], allowed, 5)
+    assert rows.tolist() == truth.tolist()
+
+    index = faiss.IndexFlatIP(16)
+    index.add(vecs)
+    _, ids = index.search(query, 5, params=search_params(index, mask))
+    assert ids[0].tolist() == truth.tolist()
+
+
+def _indexes(vecs):
+    d = vecs.shape[1]
+    flat = faiss.IndexFlatIP(d)
+    ivf = faiss.IndexIVFFlat(faiss.IndexFlatIP(d), d, 8, faiss.METRIC_INNER_PRODUCT)
+    ivf.train(vecs)
+    ivf.nprobe = 8
+    hnsw = faiss.IndexHNSWFlat(d, 16, faiss.METRIC_INNER_PRODUCT)
+    for index in (flat, ivf, hnsw):
+        index.add(vecs)
+    codes = binarize(vecs)
+    binary_flat = faiss.IndexBinaryFlat(d)
+    binary_ivf = faiss.IndexBinaryIVF(faiss.IndexBinaryFlat(d), d, 8)
+    binary_ivf.train(codes)
+    binary_ivf.nprobe = 8
+    for index in (binary_flat, binary_ivf):
+        index.add(codes)
+    return {
+        "flat": flat,
+        "ivf": ivf,
+        "hnsw": hnsw,
+        "binary_flat": BinaryRescoreIndex(binary_flat, vecs, rescore_factor=1000),
+        "binary_ivf": BinaryRescoreIndex(binary_ivf, vecs, rescore_factor=1000),
+    }
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw", "binary_flat", "binary_ivf"])
+@pytest.mark.parametrize("with_vectors", [True, False])
+def test_filtered_search_every_index_type(index_type, with_vectors):
+    rng = np.random.default_rng(1)
+    vecs = rng.standard_normal((2000, 16)).astype("float32")
+    faiss.normalize_L2(vecs)
+    query = vecs[:1] + 0.1 * rng.standard_normal((1, 16)).astype("float32")
+    mask = np.zeros(2000, dtype=bool)
+    mask[rng.choice(2000, 12, replace=False)] = True
+    allowed = np.flatnonzero(mask)
+    truth = allowed[np.argsort(-(vecs[allowed] @ query[0]), kind="stable")][:5]
+
+    index = _indexes(vecs)[index_type]
+    vectors = vecs if with_vectors or index_type.startswith("binary") else None
+    # exact_max_rows=0: only indexes without selector support take the exact path.
+    _, rows = filtered_search(index, vectors, query, mask, 5, exact_max_rows=0)
+
+    assert set(rows.tolist()) <= set(allowed.tolist())
+    if index_type == "hnsw" and vectors is None:
+        assert len(rows) == 5  # post-filtered approximate search
+    else:
+        assert rows.tolist() == truth.tolist()
@@ -0,0 +1,51 @@
+import pytest
+
+from apps.api import create_app
+from src import metrics
+
+
+def test_histogram_and_counter_text_format():
+    registry = metrics.Registry()
+    hist = registry.register(metrics.Histogram("t_seconds", "Help.", ("stage",), buckets=(0.1, 1)))
+    counter = registry.register(metrics.Counter("t_total", "Help.", ("kind",)))
+    for value in (0.05, 0.5, 3.0):
+        hist.observe(value, stage='a"b')
+    counter.inc(kind="x")
+    counter.inc(2, kind="x")
+    text = registry.render()
+
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{stage="a\\"b",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="a\\"b",le="1"} 2' in text
+    assert 't_seconds_bucket{stage="a\\"b",le="+Inf"} 3' in text
+    assert 't_seconds_sum{stage="a\\"b"} 3.55' in text
+    assert 't_seconds_count{stage="a\\"b"} 3' in text
+    assert 't_total{kind="x"} 3' in text
+    with pytest.raises(ValueError):
+        counter.inc(other="y")
+
+
+def test_record_query_maps_stats_to_stages():
+    before = metrics.STAGE_SECONDS.count(stage="bm25")
+    hits = metrics.CACHE_LOOKUPS.value(cache="semantic", result="hit")
+    stats = {
+        "retrieval": {"embed_ms": 40.0, "ann_ms": 2.0, "sparse_ms": 5.0, "fusion_ms": 0.3},
+        "rerank": [{"ms": 80.0}, {"ms": 20.0}],
+        "candidates": {"dense": 50, "sparse": 50, "fused": 90},
+        "cache": {"hit": True},
+        "total_ms": 150.0,
+    }
+    metrics.record_query(stats)
+    assert metrics.STAGE_SECONDS.count(stage="bm25") == before + 1
+    assert metrics.CACHE_LOOKUPS.value(cache="semantic", result="hit") == hits + 1
+
+
+def test_metrics_endpoint():
+    client = create_app(query_func=lambda q, cfg: []).test_client()
+    client.post("/search", json={"query": "q"})
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.content_type.startswith("text/plain; version=0.0.4")
+    body = resp.get_data(as_text=True)
+    assert 'rag_http_requests_total{route="/search",status="200"}' in body
+    assert "# TYPE rag_stage_duration_seconds histogram" in body
@@ -0,0 +1,158 @@
+import copy
+import threading
+
+import pytest
+
+
+class StubReranker:
+    """Scores passages by word overlap with the query and records every call."""
+
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    def score(self, query, passages):
+        self.calls.append((self.name, len(passages)))
+        words = set(query.lower().split())
+        return [float(len(words & set(p.lower().split()))) for p in passages]
+
+
+@pytest.fixture
+def rerankers(pipeline, monkeypatch):
+    """Replace model loading with stub rerankers; returns the (stage type, passages) calls."""
+    calls = []
+    monkeypatch.delenv("RERANKER", raising=False)
+    monkeypatch.setattr(
+        pipeline, "get_reranker", lambda stage, cfg: StubReranker(stage["type"], calls)
+    )
+    return calls
+
+
+def _cfg(pipeline, **sections):
+    cfg = copy.deepcopy(pipeline.cfg)
+    for name, values in sections.items():
+        cfg[name] = {**(cfg.get(name) or {}), **values}
+    return cfg
+
+
+def _adaptive(pipeline, monkeypatch, decision):
+    """Config with one crossencoder stage where the adaptive policy always decides `decision`."""
+    monkeypatch.setattr(pipeline, "decide", lambda *args: decision)
+    return _cfg(
+        pipeline,
+        reranker={
+            "enabled": True,
+            "type": "crossencoder",
+            "reranker_k": 3,
+            "rerank_top_n": 0,
+            "adaptive": {"enabled": True},
+        },
+    )
+
+
+def test_adaptive_skip_returns_reranker_k_fused_results(pipeline, rerankers, monkeypatch):
+    cfg = _adaptive(pipeline, monkeypatch, {"action": "skip"})
+    stats = {}
+    results = pipeline.query_system("how does BM25 rank documents", cfg, stats)
+
+    assert rerankers == [] and stats["rerank"] == []
+    assert len(results) == 3
+    fused = pipeline.query_system("how does BM25 rank documents", pipeline.cfg)
+    assert [c["chunk_id"] for _s, c in results] == [c["chunk_id"] for _s, c in fused[:3]]
+
+
+def test_adaptive_shrink_caps_first_stage_candidates(pipeline, rerankers, monkeypatch):
+    cfg = _adaptive(pipeline, monkeypatch, {"action": "shrink", "top_n": 4})
+    stats = {}
+    results = pipeline.query_system("how does BM25 rank documents", cfg, stats)
+
+    assert rerankers == [("crossencoder", 4)]
+    assert stats["rerank"][0]["candidates"] == 4 and len(results) == 3
+
+
+def test_fusion_keeps_top_m_candidates(pipeline):
+    stats = {}
+    pipeline.query_system("how does BM25 rank documents", pipeline.cfg, stats)
+    assert stats["candidates"]["fused"] > 3
+
+    cfg = _cfg(pipeline, retrieval={"top_m": 3})
+    results = pipeline.query_system("how does BM25 rank documents", cfg, stats)
+    assert stats["candidates"]["fused"] == len(results) == 3
+
+
+def test_aggregate_doc_keeps_best_chunk_per_document(pipeline):
+    chunks = pipeline.query_system("BM25 ranks documents", pipeline.cfg)
+    assert len({c["doc_id"] for _s, c in chunks}) < len(chunks)
+
+    cfg = _cfg(pipeline, retrieval={"aggregate": "doc"})
+    docs = pipeline.query_system("BM25 ranks documents", cfg)
+    doc_ids = [c["doc_id"] for _s, c in docs]
+    assert len(doc_ids) == len(set(doc_ids))
+    # Each document is represented by its highest-ranked chunk, in fused order.
+    first_chunk = {}
+    for _score, chunk in chunks:
+        first_chunk.setdefault(chunk["doc_id"], chunk["chunk_id"])
+    assert [c["chunk_id"] for _s, c in docs] == [first_chunk[d] for d in doc_ids]
+
+
+def _cascade(pipeline, **reranker):
+    cascade = [
+        {"type": "crossencoder", "model": "small", "keep": 4},
+        {"type": "colbert", "model": "large"},
+    ]
+    settings = {"enabled": True, "cascade": cascade, "reranker_k": 3, "rerank_top_n": 6}
+    return _cfg(pipeline, reranker={**settings, **reranker})
+
+
+def test_rerank_stages(pipeline, monkeypatch):
+    monkeypatch.delenv("RERANKER", raising=False)
+    assert pipeline.rerank_stages({"reranker": {"enabled": False, "type": "colbert"}}) == []
+    cfg = _cascade(pipeline)
+    assert [s["model"] for s in pipeline.rerank_stages(cfg)] == ["small", "large"]
+
+    # The env override picks a single stage and bypasses the cascade.
+    monkeypatch.setenv("RERANKER", "crossencoder")
+    assert pipeline.rerank_stages(_cascade(pipeline, cross_encoder_model="ce")) == [
+        {"type": "crossencoder", "model": "ce"}
+    ]
+
+
+def test_cascade_runs_stages_in_order_with_keep_and_top_n(pipeline, rerankers):
+    stats = {}
+    results = pipeline.query_system("how does BM25 rank documents", _cascade(pipeline), stats)
+
+    # rerank_top_n caps the first stage; its `keep` sizes the second.
+    assert rerankers == [("crossencoder", 6), ("colbert", 4)]
+    assert [(s["model"], s["candidates"], s["kept"]) for s in stats["rerank"]] == [
+        ("small", 6, 4),
+        ("large", 4, 3),
+    ]
+    scores = [score for score, _chunk in results]
+    assert len(results) == 3 and scores == sorted(scores, reverse=True)
+
+
+def test_env_override_bypasses_cascade(pipeline, rerankers, monkeypatch):
+    monkeypatch.setenv("RERANKER", "colbert")
+    stats = {}
+    pipeline.query_system("how does BM25 rank documents", _cascade(pipeline), stats)
+    assert rerankers == [("colbert", 6)] and len(stats["rerank"]) == 1
+
+
+def test_parallel_retrieval_matches_sequential(pipeline):
+    for query in ("how does BM25 rank documents", "dense vectors in FAISS"):
+        runs = []
+        for parallel in (True, False):
+            stats = {}
+            cfg = _cfg(pipeline, retrieval={"parallel": parallel})
+            results = pipeline.query_system(query, cfg, stats)
+            runs.append(([(s, c["chunk_id"]) for s, c in results], stats["candidates"]))
+        assert runs[0] == runs[1]
+
+
+def test_sparse_branch_error_propagates(pipeline, monkeypatch):
+    def broken(*args):
+        raise RuntimeError(f"bm25 failed in {threading.current_thread().name}")
+
+    monkeypatch.setattr(pipeline, "_sparse_branch", broken)
+    with pytest.raises(RuntimeError, match="bm25 failed in sparse-retrieval"):
+        pipeline.query_system("how does BM25 rank documents", pipeline.cfg)
@@ -0,0 +1,68 @@
+import yaml
+
+from apps.api import create_app
+from src import profiling
+
+
+def _fake_query(query, cfg, stats=None, **kwargs):
+    if stats is not None:
+        stats["retrieval"] = {
+            "embed_ms": 30.0,
+            "ann_ms": 1.5,
+            "sparse_ms": 4.0,
+            "fusion_ms": 0.2,
+            "total_ms": 32.0,
+        }
+        stats["candidates"] = {"dense": 50, "sparse": 40, "fused": 75}
+        stats["rerank"] = [
+            {"type": "crossencoder", "model": "m", "candidates": 75, "kept": 10, "ms": 60.0}
+        ]
+        stats["total_ms"] = 93.0
+    return [(0.9, {"doc_id": "d1", "chunk_id": "c1", "title": "t", "text": "x"})]
+
+
+def test_stage_trace_orders_stages_with_candidate_counts():
+    stats = {}
+    _fake_query("q", {}, stats=stats)
+    trace = profiling.stage_trace(stats)
+    assert [s["stage"] for s in trace["stages"]] == [
+        "embed",
+        "ann",
+        "bm25",
+        "fusion",
+        "rerank:crossencoder",
+    ]
+    assert trace["stages"][3]["in"] == 90 and trace["stages"][3]["out"] == 75
+    assert trace["stages"][4]["out"] == 10
+    assert trace["total_ms"] == 93.0
+
+
+def test_profiled_query_modes():
+    _results, trace = profiling.profiled_query(_fake_query, "q", {}, mode="cprofile", top=5)
+    assert "function calls" in trace["cprofile"]
+    assert profiling.parse_mode("0") is None and profiling.parse_mode("yes") == "trace"
+    assert not profiling.should_sample(0.0) and profiling.should_sample(0.5, rand=lambda: 0.1)
+
+
+def _client(tmp_path, monkeypatch, allow_request):
+    with open(tmp_path / "config.yaml", "w") as fh:
+        yaml.safe_dump({"profiling": {"allow_request": allow_request}}, fh)
+    monkeypatch.chdir(tmp_path)
+    return create_app(query_func=_fake_query).test_client()
+
+
+def test_request_profiling_is_off_by_default(tmp_path, monkeypatch):
+    assert profiling.profiling_settings({})["allow_request"] is False
+    client = _client(tmp_path, monkeypatch, allow_request=False)
+    response = client.post("/search?profile=1", json={"query": "q"}, headers={"X-Profile": "1"})
+    assert "profile" not in response.get_json()
+
+
+def test_search_returns_profile_only_when_requested(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch, allow_request=True)
+    plain = client.post("/search", json={"query": "q"}).get_json()
+    assert "profile" not in plain
+    by_param = client.post("/search?profile=1", json={"query": "q"}).get_json()
+    assert by_param["profile"]["mode"] == "trace" and len(by_param["results"]) == 1
+    by_header = client.post("/search", json={"query": "q"}, headers={"X-Profile": "cprofile"})
+    assert "cprofile" in by_header.get_json()["profile"]
@@ -0,0 +1,52 @@
+import numpy as np
+
+from src.semantic_cache import SemanticCache
+
+
+def _unit(*values):
+    vec = np.array(values, dtype="float32")
+    return vec / np.linalg.norm(vec)
+
+
+def test_paraphrase_hits_and_distinct_query_misses():
+    cache = SemanticCache(dim=3, threshold=0.95)
+    results = [(0.9, {"chunk_id": "c1"})]
+    assert cache.lookup(_unit(1, 0, 0)) is None
+    cache.store(_unit(1, 0, 0), results)
+
+    hit = cache.lookup(_unit(1, 0.1, 0))
+    assert hit is not None and hit[0] > 0.95 and hit[1] == results
+    assert cache.lookup(_unit(0, 1, 0)) is None
+    # Same query under different retrieval settings is a miss.
+    assert cache.lookup(_unit(1, 0, 0), key="other") is None
+
+    metrics = cache.metrics()
+    assert metrics["hits"] == 1 and metrics["misses"] == 3 and metrics["hit_rate"] == 0.25
+
+
+def test_lru_and_ttl_eviction():
+    cache = SemanticCache(dim=3, threshold=0.99, max_entries=2)
+    a, b, c = _unit(1, 0, 0), _unit(0, 1, 0), _unit(0, 0, 1)
+    cache.store(a, [(1.0, {"chunk_id": "a"})])
+    cache.store(b, [(1.0, {"chunk_id": "b"})])
+    assert cache.lookup(a) is not None  # a is now most recently used
+    cache.store(c, [(1.0, {"chunk_id": "c"})])
+    assert cache.lookup(b) is None
+    assert cache.lookup(a) is not None and cache.lookup(c) is not None
+    assert cache.metrics()["evictions"] == 1
+
+    cache.ttl_seconds = -1
+    assert cache.lookup(a) is None
+    assert cache.metrics()["expirations"] == 1 and cache.metrics()["entries"] == 1
+
+
+def test_callers_cannot_mutate_cached_results():
+    cache = SemanticCache(dim=3, threshold=0.95)
+    results = [(0.9, {"chunk_id": "c1"})]
+    cache.store(_unit(1, 0, 0), results)
+    results[0][1]["chunk_id"] = "changed before the hit"
+
+    hit = cache.lookup(_unit(1, 0, 0))
+    assert hit is not None and hit[1] == [(0.9, {"chunk_id": "c1"})]
+    hit[1][0][1]["text"] = "added by a caller"
+    assert cache.lookup(_unit(1, 0, 0))[1] == [(0.9, {"chunk_id": "c1"})]
@@ -0,0 +1,45 @@
+import pickle
+
+from rank_bm25 import BM25Okapi
+
+from src.sparse_retriever import SparseRetriever
+from src.tokenizer import Tokenizer, Vocabulary, light_stem
+
+
+def test_normalizes_case_punctuation_and_unicode():
+    tok = Tokenizer()
+    assert tok.tokenize("FAISS, faiss; Faiss!") == ["faiss"] * 3
+    assert tok.tokenize("ﬁne-tuning IVF_PQ") == ["fine", "tuning", "ivf_pq"]
+    assert Tokenizer(lowercase=False).tokenize("BM25 Okapi.") == ["BM25", "Okapi"]
+
+
+def test_light_stemmer_and_pickling():
+    assert [light_stem(w) for w in ["queries", "indexes", "vectors", "class", "corpus"]] == [
+        "query",
+        "indexe",
+        "vector",
+        "class",
+        "corpus",
+    ]
+    tok = Tokenizer(stemmer="light")
+    assert tok.tokenize("Rerankers rerank") == ["reranker", "rerank"]
+    clone = pickle.loads(pickle.dumps(tok))
+    assert clone.tokenize("Rerankers") == ["reranker"]
+
+
+def test_retriever_uses_saved_tokenizer_and_vocab(tmp_path):
+    texts = ["FAISS, the vector library.", "BM25 ranks documents.", "Rerankers rescore queries!"]
+    tok = Tokenizer(stemmer="light")
+    tokenized = [tok.tokenize(t) for t in texts]
+    vocab = Vocabulary.build(tokenized)
+    with open(tmp_path / "bm25_index.pkl", "wb") as fh:
+        pickle.dump(BM25Okapi([vocab.encode(t) for t in tokenized]), fh)
+    with open(tmp_path / "bm25_chunk_ids.pkl", "wb") as fh:
+        pickle.dump(["a", "b", "c"], fh)
+    vocab.save(str(tmp_path), tok)
+
+    retriever = SparseRetriever(str(tmp_path), engine="wand")
+    assert retriever.tokenizer.settings() == {"lowercase": True, "stemmer": "light"}
+    assert retriever.search("faiss vectors", top_k=1)[0][0] == "a"
+    assert retriever.search("reranker query", top_k=1)[0][0] == "c"
+    assert retriever.search("unseen words", top_k=3) == []